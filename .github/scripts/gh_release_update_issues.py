@@ -4,23 +4,60 @@
 Comment GitHub issues linked to Pull Requests mentioned in a given release.
 
 Usage:
-    python gh_release_update_issues.py <release_url> [--dry-run]
+    python gh_release_update_issues.py <release_url> [--from-tag FROM_TAG] [--dry-run] [-w|--workers WORKERS]
+                                       [--state-file STATE_FILE]
 
 Arguments:
     release-url: The URL of the release to comment on
+    --from-tag: Backfill every release from this tag to the release URL tag (both included), posting a single
+                comment per issue listing all its releases
     --dry-run: Run without actually updating issues
+    -w, --workers: Number of concurrent comment requests (default: 4)
+    --state-file: JSON file recording commented issues, so an interrupted run resumes where it stopped
+
+Issues already commented for a release (found in the state file or in the comments posted with the same token)
+are skipped for that release, so an interrupted run or backfill resumes where it stopped when re-run.
+
+Set SCRIPT_TRACE=1 (or SCRIPT_TRACE_FILE=trace.json) to time the API calls and main steps, see tracing.py.
 
 Examples:
     python gh_release_update_issues.py https://github.com/owner/repo/releases/tag/v1.0.0
     python gh_release_update_issues.py https://github.com/owner/repo/releases/tag/v1.0.0 --dry-run
+    python gh_release_update_issues.py https://github.com/owner/repo/releases/tag/v1.0.0 --state-file state.json
+    python gh_release_update_issues.py https://github.com/owner/repo/releases/tag/v1.4.0 --from-tag v1.0.0 --state-file backfill.json
 """
 
 import re
-import subprocess
+import os
+import sys
 import json
 import argparse
+import threading
+import time
 from collections import defaultdict
-from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Tuple, Dict, NamedTuple, Optional, Set
+from urllib.parse import quote
+
+from github_api import TRANSIENT_STATUSES, GitHubApiError, get_client
+from tracing import report_at_exit, traced
+
+# Estimated nodes per GraphQL request (GitHub rejects queries above 500,000 and times out well before on big ones)
+GRAPHQL_MAX_NODES = 10000
+GRAPHQL_PAGE_SIZE = 100
+GRAPHQL_WORKERS = 4
+# Concurrent comment requests, the client spaces them to stay under GitHub's secondary rate limit
+COMMENT_WORKERS = 4
+# Comments failing with a server or connection error are posted again, if still missing, after a delay doubled on each attempt
+COMMENT_RETRIES = 2
+COMMENT_RETRY_SECONDS = 2.0
+# Lowercase fragments of the errors GitHub returns for queries that are too large or too slow
+GRAPHQL_SIZE_ERRORS = ('exceeds the maximum', 'complexity', 'timeout', 'timed out', 'something went wrong')
+
+class ReleasePRs(NamedTuple):
+    name: str
+    url: str
+    pr_numbers: List[int]
 
 def parse_release_url(release_url: str) -> Tuple[str, str, str]:
     """Extract owner, repo name, and tag from a GitHub release URL.
@@ -33,6 +70,7 @@ def parse_release_url(release_url: str) -> Tuple[str, str, str]:
         raise ValueError(f"Cannot parse release URL: {release_url}")
     return match.group(1), match.group(2), match.group(3)
 
+@traced()
 def extract_pr_numbers(release_notes: str) -> List[int]:
     return [int(n) for n in re.findall(r'/pull/(\d+)', release_notes)]
 
@@ -44,23 +82,103 @@ def build_issue_comment(repo: str, release_name: str, release_link: str, pr_numb
 
     return f":shipit: Pull Request(s) linked to this issue released in [{release_name}]({release_link}):\n\n"+ "\n".join(pr_links)
 
+@traced()
 def gh_fetch_release(repo: str, release_tag: str) -> Tuple[str, str]:
-    result = subprocess.run(
-        ['gh', 'release', 'view', release_tag, '--repo', repo, '--json', 'name,body'],
-        capture_output=True, text=True, check=True
-    )
-    data = json.loads(result.stdout)
+    data = get_client().rest('GET', f'repos/{repo}/releases/tags/{quote(release_tag, safe="")}')
     return data['name'], data['body']
 
+@traced()
+def gh_fetch_releases_between(repo: str, from_tag: str, to_tag: str) -> List[Tuple[str, str, str]]:
+    """Fetch every published release from `from_tag` to `to_tag` (both included), paging through the release list only as far as needed.
+
+    Returns:
+        List of (name, URL, body) of each release, oldest first.
+    """
+    releases: List[Tuple[str, str, str]] = []
+    in_range = from_tag_seen = False
+    # Releases are listed newest first
+    for release in get_client().paginate(f'repos/{repo}/releases', {'per_page': 100}):
+        if release['draft']:
+            continue
+        if release['tag_name'] == to_tag:
+            if from_tag_seen:
+                raise ValueError(f"Release {from_tag} is newer than release {to_tag}")
+            in_range = True
+        if in_range:
+            releases.append((release['name'] or release['tag_name'], release['html_url'], release['body'] or ''))
+        if release['tag_name'] == from_tag:
+            if in_range:
+                return list(reversed(releases))
+            # Only reversed if `to_tag` comes later in the list
+            from_tag_seen = True
+    raise ValueError(f"Release not found: {from_tag if in_range else to_tag}")
+
 def gh_comment_issue(repo: str, issue_number: int, comment: str) -> None:
-    """Use GitHub CLI to comment on an issue.
+    """Use the GitHub API to comment on an issue.
     """
-    subprocess.run([
-        'gh', 'issue', 'comment', str(issue_number), '--body', comment, '--repo', repo
-    ], check=True)
+    get_client().rest('POST', f'repos/{repo}/issues/{issue_number}/comments', {'body': comment})
+
+def _is_query_too_large(error: GitHubApiError) -> bool:
+    """Whether a GraphQL request failed because of its size (node limit, complexity or timeout)."""
+    message = str(error).lower()
+    return error.status in (502, 504) or any(marker in message for marker in GRAPHQL_SIZE_ERRORS)
+
+@traced()
+def gh_graphql_batched(owner: str, repo_name: str, fragments: Dict[str, str], node_cost: int) -> Dict[str, Optional[dict]]:
+    """Resolve many aliased repository fields in a few concurrent GraphQL calls.
+
+    Fragments are split into chunks whose estimated node count (`node_cost` per fragment) stays under
+    GRAPHQL_MAX_NODES. When GitHub rejects a chunk as too large it is split in halves, and the smaller
+    size is used for every chunk sent afterwards.
+
+    Args:
+        fragments: Dict mapping each alias to a repository field, e.g. {'pr_1': 'pullRequest(number: 1) { title }'}
+        node_cost: Estimated nodes per fragment
 
+    Returns:
+        Dict mapping each alias to its data, None when the field could not be resolved.
+    """
+    chunk_size = max(1, GRAPHQL_MAX_NODES // node_cost)
+
+    def fetch(chunk: List[Tuple[str, str]]) -> Dict[str, Optional[dict]]:
+        query = """
+        query ($owner: String!, $repo: String!) {
+            repository(owner: $owner, name: $repo) {
+                %s
+            }
+        }
+        """ % "\n".join(f'{alias}: {fragment}' for alias, fragment in chunk)
+        repo_data = get_client().graphql(query, {'owner': owner, 'repo': repo_name})['repository']
+        return {alias: repo_data.get(alias) for alias, _ in chunk}
+
+    def fetch_adaptive(chunk: List[Tuple[str, str]]) -> Dict[str, Optional[dict]]:
+        nonlocal chunk_size
+        if len(chunk) > chunk_size:
+            results = fetch_adaptive(chunk[:chunk_size])
+            results.update(fetch_adaptive(chunk[chunk_size:]))
+            return results
+        try:
+            return fetch(chunk)
+        except GitHubApiError as e:
+            if len(chunk) == 1 or not _is_query_too_large(e):
+                raise
+            print(f"::notice::GraphQL request for {len(chunk)} fields too large, splitting it: {e}")
+            chunk_size = min(chunk_size, len(chunk) // 2)
+            return fetch_adaptive(chunk)
+
+    items = list(fragments.items())
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results: Dict[str, Optional[dict]] = {}
+    with ThreadPoolExecutor(max_workers=GRAPHQL_WORKERS) as executor:
+        for chunk_results in executor.map(fetch_adaptive, chunks):
+            results.update(chunk_results)
+    return results
+
+@traced()
 def gh_fetch_linked_issues_batched(owner: str, repo_name: str, pr_numbers: List[int]) -> Dict[int, List[int]]:
-    """Batch-fetch linked issues for all PRs in a single GraphQL call.
+    """Batch-fetch linked issues for all PRs in a few concurrent GraphQL calls.
+
+    PRs with more linked issues than fit in one page are fetched again from their cursor until complete.
 
     Returns:
         Dict mapping each PR number to its list of linked issue numbers.
@@ -68,40 +186,143 @@ def gh_fetch_linked_issues_batched(owner: str, repo_name: str, pr_numbers: List[
     if not pr_numbers:
         return {}
 
-    tmpl = 'pr_%d: pullRequest(number: %d) { closingIssuesReferences(first: 100) { nodes { number } } }'
-    pr_fragments = "\n".join(tmpl % (pr, pr) for pr in pr_numbers)
-    query = """
-    query ($owner: String!, $repo: String!) {
-        repository(owner: $owner, name: $repo) {
-            %s
-        }
-    }
-    """ % pr_fragments
+    pr_issues_map: Dict[int, List[int]] = {pr_number: [] for pr_number in pr_numbers}
+    cursors: Dict[int, Optional[str]] = dict.fromkeys(pr_issues_map)  # PRs with linked issues left to fetch
 
     try:
-        result = subprocess.run(
-            [
-                'gh', 'api', 'graphql',
-                '-F', f'owner={owner}',
-                '-F', f'repo={repo_name}',
-                '-f', f'query={query}',
-            ],
-            capture_output=True, text=True, check=True,
-        )
-        data = json.loads(result.stdout)
-        repo_data = data['data']['repository']
-
-        pr_issues_map: Dict[int, List[int]] = {}
-        for pr_number in pr_numbers:
-            nodes = repo_data.get(f'pr_{pr_number}', {}).get('closingIssuesReferences', {}).get('nodes', [])
-            pr_issues = [node['number'] for node in nodes]
-            pr_issues_map[pr_number] = pr_issues
+        while cursors:
+            fragments = {}
+            for pr_number, cursor in cursors.items():
+                after = f', after: {json.dumps(cursor)}' if cursor else ''
+                fragments[f'pr_{pr_number}'] = (
+                    'pullRequest(number: %d) { closingIssuesReferences(first: %d%s) '
+                    '{ pageInfo { hasNextPage endCursor } nodes { number } } }' % (pr_number, GRAPHQL_PAGE_SIZE, after)
+                )
+            # Each PR costs its own node plus a page of linked issues
+            results = gh_graphql_batched(owner, repo_name, fragments, 1 + GRAPHQL_PAGE_SIZE)
+
+            cursors = {}
+            for pr_number in list(pr_issues_map):
+                pr_data = results.get(f'pr_{pr_number}', False)
+                if pr_data is False:
+                    continue
+                references = (pr_data or {}).get('closingIssuesReferences') or {}
+                pr_issues_map[pr_number] += [node['number'] for node in references.get('nodes', [])]
+                page_info = references.get('pageInfo') or {}
+                if page_info.get('hasNextPage'):
+                    cursors[pr_number] = page_info['endCursor']
         return pr_issues_map
 
-    except subprocess.CalledProcessError as e:
-        print(f"::error::Error batch-fetching linked issues: {e.stderr}")
+    except GitHubApiError as e:
+        print(f"::error::Error batch-fetching linked issues: {e}")
         raise
 
+def is_release_comment(comment: Dict[str, Any], release_url: str) -> bool:
+    """Whether a comment is a comment posted by this script, with the same token, mentioning a release.
+
+    Comments of other authors quoting a release comment are not counted.
+    """
+    return bool(comment.get('viewerDidAuthor')) and comment.get('body', '').startswith(':shipit:') \
+        and f']({release_url})' in comment.get('body', '')
+
+@traced()
+def gh_fetch_commented_releases(owner: str, repo_name: str, issue_releases: Dict[int, List[str]]) -> Dict[int, Set[str]]:
+    """Batch-fetch the comments of many issues and find the releases they were already commented for.
+
+    Comments are fetched from the latest backwards, issues are fetched again from their cursor until every
+    release is found or all their comments are checked.
+
+    Args:
+        issue_releases: Dict mapping each issue number to the URLs of the releases to look for
+
+    Returns:
+        Dict mapping each issue number to the URLs of the releases it was already commented for.
+    """
+    if not issue_releases:
+        return {}
+
+    commented: Dict[int, Set[str]] = {issue_number: set() for issue_number in issue_releases}
+    cursors: Dict[int, Optional[str]] = dict.fromkeys(issue_releases)  # Issues with comments left to check
+
+    try:
+        while cursors:
+            fragments = {}
+            for issue_number, cursor in cursors.items():
+                before = f', before: {json.dumps(cursor)}' if cursor else ''
+                fragments[f'issue_{issue_number}'] = (
+                    'issue(number: %d) { comments(last: %d%s) '
+                    '{ pageInfo { hasPreviousPage startCursor } nodes { body viewerDidAuthor } } }'
+                    % (issue_number, GRAPHQL_PAGE_SIZE, before)
+                )
+            # Each issue costs its own node plus a page of comments
+            results = gh_graphql_batched(owner, repo_name, fragments, 1 + GRAPHQL_PAGE_SIZE)
+
+            cursors = {}
+            for issue_number, release_urls in issue_releases.items():
+                issue_data = results.get(f'issue_{issue_number}', False)
+                if issue_data is False:
+                    continue
+                comments = (issue_data or {}).get('comments') or {}
+                commented[issue_number].update(
+                    release_url for release_url in release_urls
+                    if any(is_release_comment(comment, release_url) for comment in comments.get('nodes', []))
+                )
+                page_info = comments.get('pageInfo') or {}
+                if page_info.get('hasPreviousPage') and len(commented[issue_number]) < len(set(release_urls)):
+                    cursors[issue_number] = page_info['startCursor']
+        return commented
+
+    except GitHubApiError as e:
+        print(f"::error::Error batch-fetching issue comments: {e}")
+        raise
+
+class CommentState:
+    """Issues commented per release, saved to a JSON file after every comment so that interrupted runs resume.
+
+    Without a file path the state is only kept in memory.
+    """
+
+    def __init__(self, file_path: Optional[str] = None):
+        self.file_path = file_path
+        self.commented: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        if file_path and os.path.exists(file_path):
+            with open(file_path, 'r') as f:
+                self.commented = json.load(f).get('commented', {})
+            print(f"📋 Loaded state from {file_path}")
+
+    def is_commented(self, release_url: str, issue_number: int) -> bool:
+        return issue_number in self.commented.get(release_url, [])
+
+    def mark_commented(self, release_urls: List[str], issue_number: int) -> None:
+        with self._lock:
+            for release_url in release_urls:
+                self.commented.setdefault(release_url, []).append(issue_number)
+            self._save()
+
+    def _save(self) -> None:
+        if not self.file_path:
+            return
+        # Written to a temporary file first, so an interrupted run never leaves a truncated state
+        tmp_path = f'{self.file_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'commented': self.commented}, f, indent=2)
+        os.replace(tmp_path, self.file_path)
+
+@traced()
+def find_commented_releases(owner: str, repo_name: str, issue_releases: Dict[int, List[ReleasePRs]], state: CommentState) -> Dict[int, Set[str]]:
+    """Return the URLs of the releases each issue was already commented for, from the state file first, then from GitHub."""
+    commented: Dict[int, Set[str]] = {}
+    remaining: Dict[int, List[str]] = {}
+    for issue_number, releases in issue_releases.items():
+        commented[issue_number] = {release.url for release in releases if state.is_commented(release.url, issue_number)}
+        unknown = [release.url for release in releases if release.url not in commented[issue_number]]
+        if unknown:
+            remaining[issue_number] = unknown
+    for issue_number, release_urls in gh_fetch_commented_releases(owner, repo_name, remaining).items():
+        commented[issue_number] |= release_urls
+    return commented
+
 def map_issues_to_prs(pr_issues_map: Dict[int, List[int]]) -> Dict[int, List[int]]:
     """Invert a PR->issues map into an issue->PRs map."""
     issue_pr_map: Dict[int, List[int]] = defaultdict(list)
@@ -110,12 +331,87 @@ def map_issues_to_prs(pr_issues_map: Dict[int, List[int]]) -> Dict[int, List[int
             issue_pr_map[issue_number].append(pr_number)
     return dict(issue_pr_map)
 
-def comment_issues(repo: str, issue_pr_map: Dict[int, List[int]], release_name: str, release_url: str, dry_run: bool) -> None:
-    for issue_number, linked_prs in issue_pr_map.items():
-        comment = build_issue_comment(repo, release_name, release_url, linked_prs)
+@traced()
+def map_issues_to_releases(releases: List[ReleasePRs], pr_issues_map: Dict[int, List[int]]) -> Dict[int, List[ReleasePRs]]:
+    """Merge the issue->PRs maps of many releases into an issue->releases map, keeping only the PRs linked to each issue.
+
+    Args:
+        releases: Releases with every PR of their notes, oldest first
+        pr_issues_map: Dict mapping each PR number of every release to its linked issue numbers
+    """
+    issue_releases: Dict[int, List[ReleasePRs]] = defaultdict(list)
+    for release in releases:
+        release_pr_issues = {pr_number: pr_issues_map.get(pr_number, []) for pr_number in release.pr_numbers}
+        for issue_number, linked_prs in map_issues_to_prs(release_pr_issues).items():
+            issue_releases[issue_number].append(release._replace(pr_numbers=linked_prs))
+    return dict(issue_releases)
+
+def build_release_comment(repo: str, releases: List[ReleasePRs]) -> str:
+    """Build the comment of an issue linked to PRs of one release, or a single consolidated comment for many releases."""
+    if len(releases) == 1:
+        return build_issue_comment(repo, releases[0].name, releases[0].url, releases[0].pr_numbers)
+
+    sections = []
+    for release in releases:
+        pr_links = [f"  * https://github.com/{repo}/pull/{pr_number}" for pr_number in release.pr_numbers]
+        sections.append(f"* [{release.name}]({release.url}):\n" + "\n".join(pr_links))
+    return ":shipit: Pull Request(s) linked to this issue released in:\n\n" + "\n".join(sections)
+
+@traced()
+def comment_issues(repo: str, issue_releases: Dict[int, List[ReleasePRs]], dry_run: bool,
+                   workers: int = COMMENT_WORKERS, state: Optional[CommentState] = None) -> Dict[int, str]:
+    """Comment every issue once for all its releases, posting up to `workers` comments concurrently.
+
+    The shared client paces the comments and waits out rate limits, failed comments don't stop the others.
+    A comment failing with a server or connection error may still have been posted: the comments of the
+    issue are checked before posting it again. Commented issues are recorded in `state`, if any.
+
+    Returns:
+        Dict mapping each issue number to its outcome: "commented", "dry run", "skipped" or "failed: <error>".
+    """
+    outcomes: Dict[int, str] = {}
+    comments: List[Tuple[int, str]] = []
+    for issue_number, releases in issue_releases.items():
+        comment = build_release_comment(repo, releases)
         print(f"{'Dry run - ' if dry_run else ''}Commenting on issue {issue_number}:\n{comment}\n")
-        if not dry_run and comment:
-            gh_comment_issue(repo, issue_number, comment)
+        if dry_run:
+            outcomes[issue_number] = 'dry run'
+        elif not comment:
+            outcomes[issue_number] = 'skipped'
+        else:
+            comments.append((issue_number, comment))
+
+    owner, repo_name = repo.split('/', 1)
+
+    def post(issue_comment: Tuple[int, str]) -> str:
+        issue_number, comment = issue_comment
+        release_urls = [release.url for release in issue_releases[issue_number]]
+        for attempt in range(COMMENT_RETRIES + 1):
+            try:
+                gh_comment_issue(repo, issue_number, comment)
+                break
+            except GitHubApiError as e:
+                if attempt == COMMENT_RETRIES or (e.status is not None and e.status not in TRANSIENT_STATUSES):
+                    return f'failed: {e}'
+                delay = COMMENT_RETRY_SECONDS * 2 ** attempt
+                print(f"::warning::Commenting on issue {issue_number} failed: {e}, checking its comments in {delay:.1f}s")
+            time.sleep(delay)
+            try:
+                commented = gh_fetch_commented_releases(owner, repo_name, {issue_number: release_urls})[issue_number]
+            except GitHubApiError as e:
+                return f'failed: {e}'
+            if commented == set(release_urls):
+                print(f"📋 Issue {issue_number} was commented despite the error")
+                break
+        if state:
+            state.mark_commented(release_urls, issue_number)
+        return 'commented'
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for (issue_number, _), outcome in zip(comments, executor.map(post, comments)):
+            outcomes[issue_number] = outcome
+            print(f"{'✅' if outcome == 'commented' else '❌'} Issue {issue_number}: {outcome}")
+    return outcomes
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -125,26 +421,72 @@ def parse_args():
         'release_url',
         help='Release URL (e.g. https://github.com/owner/repo/releases/tag/v1.0.0)'
     )
+    parser.add_argument(
+        '--from-tag',
+        help='Backfill every release from this tag to the release URL tag (both included), with one comment per issue'
+    )
     parser.add_argument(
         '--dry-run',
         action='store_true',
         help='Run without actually commenting issues'
     )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=COMMENT_WORKERS,
+        help=f'Number of concurrent comment requests (default: {COMMENT_WORKERS})'
+    )
+    parser.add_argument(
+        '--state-file',
+        help='JSON file recording commented issues, a re-run with the same file skips them without any request'
+    )
     return parser.parse_args()
 
 if __name__ == '__main__':
+    report_at_exit()
     args = parse_args()
 
     owner, repo_name, release_tag = parse_release_url(args.release_url)
     repo = f"{owner}/{repo_name}"
     print(f"📋 Release URL: {args.release_url}")
 
-    release_name, release_notes = gh_fetch_release(repo, release_tag)
-    print(f"📋 Release Name: {release_name}")
+    if args.from_tag:
+        releases = [
+            ReleasePRs(name, url, extract_pr_numbers(body))
+            for name, url, body in gh_fetch_releases_between(repo, args.from_tag, release_tag)
+        ]
+        print(f"📋 Releases from {args.from_tag} to {release_tag}: {[release.name for release in releases]}")
+    else:
+        release_name, release_notes = gh_fetch_release(repo, release_tag)
+        print(f"📋 Release Name: {release_name}")
+        releases = [ReleasePRs(release_name, args.release_url, extract_pr_numbers(release_notes))]
 
-    pr_numbers = extract_pr_numbers(release_notes)
+    pr_numbers = list(dict.fromkeys(pr_number for release in releases for pr_number in release.pr_numbers))
     print(f"📋 PR Numbers parsed from release notes: {pr_numbers}")
     pr_issues_map = gh_fetch_linked_issues_batched(owner, repo_name, pr_numbers)
     print(f"📋 PRs with linked issues: {[pr for pr, issues in pr_issues_map.items() if issues]}\n")
-    issue_pr_map = map_issues_to_prs(pr_issues_map)
-    comment_issues(repo, issue_pr_map, release_name, args.release_url, args.dry_run)
+    issue_releases = map_issues_to_releases(releases, pr_issues_map)
+
+    # Re-runs only comment the issues for the releases they were not commented for yet
+    state = CommentState(args.state_file)
+    commented_releases = find_commented_releases(owner, repo_name, issue_releases, state)
+    already_commented = []
+    pending_issue_releases: Dict[int, List[ReleasePRs]] = {}
+    for issue_number, issue_release_list in issue_releases.items():
+        pending = [release for release in issue_release_list if release.url not in commented_releases[issue_number]]
+        if pending:
+            pending_issue_releases[issue_number] = pending
+        else:
+            already_commented.append(issue_number)
+    if already_commented:
+        print(f"📋 Issues already commented for {'these releases' if args.from_tag else 'this release'}, skipping: {sorted(already_commented)}\n")
+
+    outcomes = comment_issues(repo, pending_issue_releases, args.dry_run, args.workers, None if args.dry_run else state)
+    outcomes.update(dict.fromkeys(already_commented, 'already commented'))
+
+    failed = [issue_number for issue_number, outcome in outcomes.items() if outcome.startswith('failed')]
+    commented = sum(1 for outcome in outcomes.values() if outcome == 'commented')
+    print(f"\n📋 Commented {commented} of {len(outcomes)} issues ({len(already_commented)} already commented)")
+    if failed:
+        print(f"::error::Failed to comment issues: {failed}")
+        sys.exit(1)
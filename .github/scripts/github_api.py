@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+
+"""
+Shared GitHub API client for the workflow scripts.
+
+Requests go through pooled keep-alive connections instead of spawning a `gh` process (and a new TLS
+connection) per call. The client is safe to share between threads.
+
+Rate limits are handled for every thread at once: when GitHub answers with a primary or secondary rate
+limit, all requests wait for the time given by its headers before being retried. Transient errors are
+retried with jittered exponential backoff, and content-creating requests (POST and PATCH) are spaced by
+WRITE_INTERVAL to stay under the secondary rate limit. Idempotent writes, like setting or removing a label
+with PUT and DELETE, are not spaced: they create no content and a repeated one changes nothing.
+
+When HTTP_CACHE_DIR is set, GET responses are kept in the on-disk cache of http_cache.py and revalidated
+with conditional requests, so unchanged resources come back as 304 Not Modified without counting against
+the rate limit.
+
+Configuration is read from the environment, like gh and GitHub Actions do:
+    GH_TOKEN, GITHUB_TOKEN: API token (GH_ENTERPRISE_TOKEN, GITHUB_ENTERPRISE_TOKEN for other hosts),
+                            falling back to `gh auth token` when none is set
+    GITHUB_API_URL: REST API root (default: https://api.github.com), e.g. http://127.0.0.1:8080 for a local stand-in server
+    GITHUB_GRAPHQL_URL: GraphQL endpoint (default: <GITHUB_API_URL>/graphql)
+    GH_REPO, GITHUB_REPOSITORY: Default OWNER/REPO, falling back to the origin remote of the local repository
+    HTTP_CACHE_DIR: Response cache directory, the cache is disabled when unset (see http_cache.py)
+
+Example:
+    from github_api import get_client
+
+    client = get_client()
+    pr = client.rest("GET", f"repos/{client.repository}/pulls/1234")
+    data = client.graphql("query { viewer { login } }")
+"""
+
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import subprocess
+import threading
+import time
+from typing import Any, Iterator, NamedTuple, Optional
+from urllib.parse import urlencode, urlsplit
+
+from http_cache import ResponseCache, open_default_cache
+from tracing import run_subprocess, span
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_TIMEOUT = 30
+# Idle connections kept open per host
+DEFAULT_POOL_SIZE = 8
+USER_AGENT = "bitwarden-android-workflow-scripts"
+API_VERSION = "2022-11-28"
+DEFAULT_RETRIES = 3
+# Backoff before retrying a transient error, doubled on each attempt and randomized
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+# Wait after a secondary rate limit without Retry-After header, GitHub asks for at least a minute
+SECONDARY_RATE_LIMIT_SECONDS = 60.0
+# Rate limits resetting later than this fail the request instead of blocking the workflow
+MAX_RATE_LIMIT_WAIT_SECONDS = 900.0
+# Minimum delay between content-creating requests, GitHub allows about 80 per minute, so batch jobs
+# creating content (comments, added labels) are bound to about 80 requests per minute
+WRITE_INTERVAL = 60 / 80
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+# Errors raised when a pooled connection was closed by the server while idle, the request is retried once
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+LINK_NEXT = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+class GitHubApiError(Exception):
+    """Raised when a GitHub API request fails, `status` is None when no HTTP response was received."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class Response(NamedTuple):
+    status: int
+    headers: http.client.HTTPMessage
+    data: Any
+
+def get_token(host: str) -> Optional[str]:
+    """Look up an API token for a host the way gh does: environment variables first, then `gh auth token`."""
+    names = ["GH_TOKEN", "GITHUB_TOKEN"]
+    if host not in ("api.github.com", "github.com"):
+        names = ["GH_ENTERPRISE_TOKEN", "GITHUB_ENTERPRISE_TOKEN"] + names
+    for name in names:
+        if os.environ.get(name):
+            return os.environ[name]
+
+    gh_host = "github.com" if host == "api.github.com" else host
+    try:
+        result = run_subprocess(
+            ["gh", "auth", "token", "--hostname", gh_host],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+def get_repository() -> Optional[str]:
+    """Get the current OWNER/REPO from the environment, or from the origin remote of the local repository."""
+    repository = os.environ.get("GH_REPO") or os.environ.get("GITHUB_REPOSITORY")
+    if not repository:
+        try:
+            result = run_subprocess(
+                ["git", "remote", "get-url", "origin"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            repository = result.stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    # Accepts OWNER/REPO, HOST/OWNER/REPO and remote URLs
+    match = re.search(r'([^/:]+)/([^/:]+?)(?:\.git)?/?$', repository)
+    return f"{match.group(1)}/{match.group(2)}" if match else None
+
+class GitHubClient:
+    """GitHub REST and GraphQL client reusing keep-alive connections across requests and threads."""
+
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        graphql_url: Optional[str] = None,
+        token: Optional[str] = None,
+        repository: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        write_interval: float = WRITE_INTERVAL,
+        cache: Optional[ResponseCache] = None
+    ):
+        self.api_url = (api_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.graphql_url = graphql_url or os.environ.get("GITHUB_GRAPHQL_URL") or f"{self.api_url}/graphql"
+        self.token = token if token is not None else get_token(urlsplit(self.api_url).hostname or "")
+        self._repository = repository
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.write_interval = write_interval
+        self.cache = cache
+        self.request_count = 0
+        self.retry_count = 0
+        self._pools: dict[tuple[str, str], queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+        # Monotonic times before which no request, and no content-creating request, may be sent
+        self._resume_at = 0.0
+        self._next_write_at = 0.0
+
+    @property
+    def repository(self) -> str:
+        """The default OWNER/REPO, resolved on first use."""
+        if self._repository is None:
+            self._repository = get_repository()
+            if self._repository is None:
+                raise GitHubApiError("Cannot determine the repository, set GH_REPO or GITHUB_REPOSITORY")
+        return self._repository
+
+    @property
+    def owner(self) -> str:
+        return self.repository.split("/")[0]
+
+    @property
+    def repo_name(self) -> str:
+        return self.repository.split("/")[1]
+
+    def _pool(self, key: tuple[str, str]) -> queue.LifoQueue:
+        with self._lock:
+            return self._pools.setdefault(key, queue.LifoQueue())
+
+    def _acquire(self, key: tuple[str, str]) -> tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection to (scheme, host) and whether it was reused, or a new one."""
+        try:
+            return self._pool(key).get_nowait(), True
+        except queue.Empty:
+            scheme, netloc = key
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            return connection_class(netloc, timeout=self.timeout), False
+
+    def _release(self, key: tuple[str, str], connection: http.client.HTTPConnection) -> None:
+        pool = self._pool(key)
+        if pool.qsize() < self.pool_size:
+            pool.put_nowait(connection)
+        else:
+            connection.close()
+
+    def _wait_turn(self, write: bool) -> None:
+        """Wait for rate limits to reset and, for content-creating requests, for the next write slot."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._resume_at)
+            if write:
+                start = max(start, self._next_write_at)
+                self._next_write_at = start + self.write_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _pause(self, seconds: float) -> None:
+        """Hold every request of the client for a number of seconds."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+            self.retry_count += 1
+
+    def _backoff(self, attempt: int, minimum: float = 0.0) -> float:
+        """Return a randomized exponential backoff delay for a retry attempt (starting at 0)."""
+        return minimum + random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def _retry_delay(self, status: int, headers: http.client.HTTPMessage, message: str, attempt: int, idempotent: bool) -> Optional[float]:
+        """Return how long to wait before retrying an error response, None if it should not be retried.
+
+        Rate limited requests were not processed and are always retried. Transient server errors are only
+        retried for idempotent requests, as the server may have processed a write (e.g. posted a comment).
+        """
+        if status in (403, 429):
+            retry_after = headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return int(retry_after) + random.uniform(0, 1)
+            reset = headers.get("X-RateLimit-Reset")
+            if headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+                return max(0.0, int(reset) - time.time()) + random.uniform(1, 2)
+            if status == 429 or "rate limit" in message.lower():
+                return self._backoff(attempt, SECONDARY_RATE_LIMIT_SECONDS)
+            return None
+        if status in TRANSIENT_STATUSES and idempotent:
+            return self._backoff(attempt)
+        return None
+
+    def _send(self, key: tuple[str, str], method: str, target: str, payload: Optional[bytes], headers: dict) -> tuple[http.client.HTTPResponse, bytes]:
+        """Send a request on a pooled connection, retrying once on a fresh one if the pooled one went stale."""
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request(method, target, body=payload, headers=headers)
+                response = connection.getresponse()
+                raw = response.read()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+        with self._lock:
+            self.request_count += 1
+        return response, raw
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        params: Optional[dict] = None,
+        query: bool = False
+    ) -> Response:
+        """Send a request and return its response with the decoded JSON data.
+
+        Rate limited responses are retried up to `retries` times, transient error responses and connection
+        errors only for idempotent requests. GET requests are revalidated against the response cache, if any.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the API root (e.g. "repos/owner/repo/pulls/1") or an absolute URL
+            body: JSON body, if any
+            params: Query string parameters, if any
+            query: Whether the request only reads data despite its method (e.g. a GraphQL query)
+
+        Raises:
+            GitHubApiError: On connection errors and error responses
+        """
+        url = urlsplit(path if path.startswith(("http://", "https://")) else f"{self.api_url}/{path.lstrip('/')}")
+        target = url.path or "/"
+        query_string = "&".join(part for part in (url.query, urlencode(params or {})) if part)
+        if query_string:
+            target += f"?{query_string}"
+
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": USER_AGENT,
+            "X-GitHub-Api-Version": API_VERSION,
+        }
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        cache_key = cached = None
+        if self.cache is not None and method == "GET":
+            cache_key = self.cache.key(method, f"{url.scheme}://{url.netloc}{target}", self.token)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.validators)
+
+        key = (url.scheme, url.netloc)
+        idempotent = query or method in IDEMPOTENT_METHODS
+        write = not idempotent
+        span_name = "github graphql" if url.geturl() == self.graphql_url else f"github {method}"
+        attempt = 0
+        while True:
+            self._wait_turn(write)
+            try:
+                with span(span_name, path=url.path) as s:
+                    response, raw = self._send(key, method, target, payload, headers)
+                    s.add_bytes(sent=len(payload or b""), received=len(raw))
+                    s.set(status=response.status)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt < self.retries and idempotent:
+                    delay = self._backoff(attempt)
+                    print(f"::warning::{method} {url.path} failed: {e}, retrying in {delay:.1f}s")
+                    self._pause(delay)
+                    attempt += 1
+                    continue
+                raise GitHubApiError(f"{method} {url.geturl()} failed: {e}") from e
+
+            if response.status == 304 and cached is not None:
+                self.cache.touch(cache_key)
+                response, raw = cached, cached.body
+                response_headers = cached.http_headers()
+            else:
+                response_headers = response.headers
+                if cache_key is not None and response.status == 200:
+                    self.cache.put(cache_key, response.status, response.headers, raw)
+
+            try:
+                data = json.loads(raw) if raw else None
+            except json.JSONDecodeError:
+                data = raw.decode(errors="replace")
+            if response.status < 400:
+                return Response(response.status, response_headers, data)
+
+            message = data.get("message") if isinstance(data, dict) else data
+            delay = self._retry_delay(response.status, response.headers, str(message), attempt, idempotent)
+            if attempt < self.retries and delay is not None and delay <= MAX_RATE_LIMIT_WAIT_SECONDS:
+                print(f"::warning::{method} {url.path} returned {response.status}: {message}, retrying in {delay:.1f}s")
+                self._pause(delay)
+                attempt += 1
+                continue
+            raise GitHubApiError(f"{method} {url.geturl()} failed with status {response.status}: {message}", response.status)
+
+    def rest(self, method: str, path: str, body: Any = None, params: Optional[dict] = None) -> Any:
+        """Send a REST request and return its decoded JSON data."""
+        return self.request(method, path, body, params).data
+
+    def paginate(self, path: str, params: Optional[dict] = None) -> Iterator[Any]:
+        """Stream the items of a paginated REST list, fetching the next page only when needed."""
+        url: Optional[str] = path
+        while url:
+            response = self.request("GET", url, params=params)
+            yield from response.data
+            match = LINK_NEXT.search(response.headers.get("Link", ""))
+            url = match.group(1) if match else None
+            params = None  # Already part of the next page URL
+
+    def graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        """Run a GraphQL query and return its data.
+
+        Errors are raised when no data is returned, and printed as warnings alongside partial data
+        (e.g. a pull request alias that does not exist).
+        """
+        payload = self.request("POST", self.graphql_url, {"query": query, "variables": variables or {}}, query=True).data
+        errors = payload.get("errors")
+        data = payload.get("data")
+        if errors:
+            message = "; ".join(error.get("message", str(error)) for error in errors)
+            if not data:
+                raise GitHubApiError(f"GraphQL query failed: {message}")
+            print(f"::warning::GraphQL query returned errors: {message}")
+        return data
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+_client: Optional[GitHubClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> GitHubClient:
+    """Return the client shared by the whole process, created from the environment on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient(cache=open_default_cache())
+        return _client
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+
+"""
+On-disk HTTP response cache with conditional request revalidation, shared by the workflow scripts.
+
+GET responses carrying an ETag or Last-Modified validator are stored on disk. When the same URL is
+requested again, the stored validators are sent as If-None-Match / If-Modified-Since headers and a
+304 Not Modified answer is served from the stored body, so unchanged resources cost an empty response
+(which GitHub does not count against the rate limit) instead of a full payload.
+
+The cache is opt-in: hosted runners start every job with an empty home directory, so a cache only pays
+off where it persists between runs (a developer machine, a self-hosted runner, or a directory restored
+with actions/cache).
+
+Cache keys are SHA-256 hashes of the method, the URL and a fingerprint of the credentials, so entries
+are never shared between tokens and no URL, token or other request header is ever written to disk.
+Entries expire after a TTL, and the least recently used ones are evicted when the cache grows over
+its size limit.
+
+Configuration (environment):
+    HTTP_CACHE_DIR: Cache directory, e.g. ~/.cache/bitwarden-android-scripts/http. The cache is disabled
+                    when it is unset or empty.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+# Response headers kept with the body, every other header is dropped
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: dict
+    body: bytes
+
+    @property
+    def validators(self) -> dict:
+        """Conditional request headers revalidating this response."""
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def http_headers(self) -> http.client.HTTPMessage:
+        message = http.client.HTTPMessage()
+        for name, value in self.headers.items():
+            message[name] = value
+        return message
+
+def default_cache_dir() -> Optional[str]:
+    """Return the cache directory from the environment, None when the cache is disabled."""
+    return os.environ.get("HTTP_CACHE_DIR") or None
+
+class ResponseCache:
+    """Thread-safe on-disk cache of GET responses, revalidated with conditional requests."""
+
+    def __init__(self, directory: str, ttl: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._size = self.evict()
+
+    @staticmethod
+    def key(method: str, url: str, credentials: Optional[str] = None) -> str:
+        """Return the cache key of a request, the credentials only contribute a one-way fingerprint."""
+        fingerprint = hashlib.sha256((credentials or "").encode()).hexdigest()
+        return hashlib.sha256(f"{method}\0{url}\0{fingerprint}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the stored response of a key, None if missing, expired or unreadable."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                return CachedResponse(meta["status"], meta["headers"], f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, status: int, headers: http.client.HTTPMessage, body: bytes) -> None:
+        """Store a response if it has a validator to revalidate it with."""
+        stored_headers = {name: headers[name] for name in STORED_HEADERS if headers.get(name)}
+        if "ETag" not in stored_headers and "Last-Modified" not in stored_headers:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps({"status": status, "headers": stored_headers}).encode() + b"\n" + body
+        # Written to a temporary file first so that readers never see a partial entry
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(data) - previous_size
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self._size = self.evict()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated, restarting its TTL and making it the most recently used."""
+        self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """Delete expired entries, then the least recently used ones until under the size limit.
+
+        Returns:
+            Total size of the remaining entries in bytes.
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".tmp") or now - stat.st_mtime > self.ttl:
+                # Expired entries, and temporary files left by interrupted writes
+                if entry.name.endswith(".tmp") and now - stat.st_mtime < 60:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+def open_default_cache() -> Optional[ResponseCache]:
+    """Open the cache configured by the environment, None when disabled or when the directory is not writable."""
+    directory = default_cache_dir()
+    if not directory:
+        return None
+    try:
+        return ResponseCache(directory)
+    except OSError:
+        return None
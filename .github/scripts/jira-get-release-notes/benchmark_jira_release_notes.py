@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+
+"""
+Benchmark the ADF to Markdown renderer of jira_release_notes.py on large synthetic documents.
+
+Measures the wall time and tracemalloc peak of render_adf_markdown() for each document shape and size.
+
+Usage:
+    python benchmark_jira_release_notes.py [--sizes 1000,10000,100000] [--repeat 3] [--output FILE]
+
+Examples:
+    python benchmark_jira_release_notes.py
+    python benchmark_jira_release_notes.py --sizes 100000,1000000 --repeat 1 --output results.json
+"""
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+from jira_release_notes import render_adf_markdown
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+# Nesting depth of the deeply nested document, per 1000 nodes of the size
+DEEP_NESTING_PER_1000 = 10
+
+def text(value, *mark_types):
+    node = {"type": "text", "text": value}
+    if mark_types:
+        node["marks"] = [{"type": mark_type} for mark_type in mark_types]
+    return node
+
+def paragraph(*content):
+    return {"type": "paragraph", "content": list(content)}
+
+def list_item(*content):
+    return {"type": "listItem", "content": list(content)}
+
+def generate_long_list(size):
+    """A single bullet list of `size` items with marked text and links."""
+    link = {"type": "link", "attrs": {"href": "https://github.com/bitwarden/android"}}
+    items = [
+        list_item(paragraph(text(f"Release note {i} "), text("fixed", "strong"), text(" see "), {**text("PR"), "marks": [link]}))
+        for i in range(size)
+    ]
+    return [{"type": "bulletList", "content": items}]
+
+def generate_nested_lists(size):
+    """Ordered lists of 10 items, each with a nested bullet list of 3 items, about `size` items in total."""
+    document = []
+    for i in range(max(1, size // 40)):
+        document.append({"type": "heading", "attrs": {"level": 2}, "content": [text(f"Section {i}")]})
+        items = []
+        for j in range(10):
+            nested = {"type": "bulletList", "content": [list_item(paragraph(text(f"Detail {k}", "em"))) for k in range(3)]}
+            items.append(list_item(paragraph(text(f"Change {j}")), nested))
+        document.append({"type": "orderedList", "attrs": {"order": 1}, "content": items})
+    return document
+
+def generate_deep_nesting(size):
+    """Bullet lists nested `size * DEEP_NESTING_PER_1000 / 1000` levels deep."""
+    node = paragraph(text("Leaf"))
+    for i in range(max(1, size * DEEP_NESTING_PER_1000 // 1000)):
+        node = {"type": "bulletList", "content": [list_item(paragraph(text(f"Level {i}")), node)]}
+    return [node]
+
+def generate_mixed(size):
+    """Every supported node type, repeated until the document has about `size` blocks."""
+    block = [
+        {"type": "heading", "attrs": {"level": 3}, "content": [text("Heading")]},
+        paragraph(text("Some "), text("bold", "strong"), text(" and "), text("code", "code"), {"type": "hardBreak"}, text("next line")),
+        {"type": "codeBlock", "attrs": {"language": "kotlin"}, "content": [text("val x = 1\nval y = 2")]},
+        {"type": "blockquote", "content": [paragraph(text("Quote"))]},
+        {"type": "taskList", "content": [{"type": "taskItem", "attrs": {"state": "DONE"}, "content": [text("Task")]}]},
+        {"type": "table", "content": [
+            {"type": "tableRow", "content": [{"type": "tableHeader", "content": [paragraph(text("Key"))]}, {"type": "tableHeader", "content": [paragraph(text("Value"))]}]},
+            {"type": "tableRow", "content": [{"type": "tableCell", "content": [paragraph(text("a"))]}, {"type": "tableCell", "content": [paragraph(text("b"))]}]},
+        ]},
+        {"type": "rule"},
+    ]
+    return block * max(1, size // len(block))
+
+DOCUMENTS = {
+    "long_list": generate_long_list,
+    "nested_lists": generate_nested_lists,
+    "deep_nesting": generate_deep_nesting,
+    "mixed": generate_mixed,
+}
+
+def measure(document, repeat):
+    """Measures the best wall time of `repeat` renders and the tracemalloc peak of one extra render."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        markdown = render_adf_markdown(document)
+        best = min(best, time.perf_counter() - start)
+
+    # Measured separately, tracing allocations slows the code down considerably
+    tracemalloc.start()
+    try:
+        render_adf_markdown(document)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": round(best, 6), "peak_bytes": peak, "output_chars": len(markdown)}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the ADF to Markdown renderer of jira_release_notes.py.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help=f"Comma separated approximate number of nodes per document (default: {','.join(map(str, DEFAULT_SIZES))})"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Number of timed runs per document, the best one is kept (default: {DEFAULT_REPEAT})"
+    )
+    parser.add_argument(
+        "--output",
+        help="Path to save the results JSON to"
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = {}
+    for size in sizes:
+        for name, generate in DOCUMENTS.items():
+            measurement = measure(generate(size), args.repeat)
+            results.setdefault(name, {})[str(size)] = measurement
+            print(f"⏱️ {name} [{size}]: {measurement['seconds']:.4f}s, peak {measurement['peak_bytes'] / 1024:.0f} KiB, "
+                  f"{measurement['output_chars']} chars")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(), "results": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
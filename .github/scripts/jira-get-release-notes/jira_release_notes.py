@@ -1,34 +1,203 @@
 #!/usr/bin/env python3
 # Requires Python 3.9+
-"""Fetch release notes from a Jira issue."""
+"""Fetch release notes from one or many Jira issues."""
 
 import argparse
 import base64
+import gzip
+import http.client
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from urllib.error import HTTPError
-from urllib.request import Request, urlopen
+from urllib.parse import urlsplit
+
+# http_cache.py and tracing.py are shared with the scripts of the parent directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from http_cache import open_default_cache  # noqa: E402
+from tracing import report_at_exit, span, traced  # noqa: E402
 
 SCRIPT_NAME = Path(__file__).name
+JIRA_BASE_URL = "https://api.atlassian.com/ex/jira"
+RELEASE_NOTES_FIELD = 'customfield_10309'
+# Issue keys per JQL search, and search results per page
+SEARCH_BATCH_SIZE = 50
+SEARCH_PAGE_SIZE = 100
+SEARCH_WORKERS = 3
+REQUEST_TIMEOUT = 30
+
+# Markdown syntax of the text marks, from the outermost to the innermost (nothing is parsed inside code)
+MARK_SYNTAX = {'strong': '**', 'em': '*', 'strike': '~~', 'code': '`'}
+LIST_TYPES = ('bulletList', 'orderedList', 'taskList', 'decisionList')
+# Nodes without a Markdown equivalent
+SKIPPED_TYPES = ('media', 'mediaSingle', 'mediaGroup', 'mediaInline', 'placeholder')
+# Stack entries besides nodes: a list item with its marker, and the end of a list
+_ITEM, _LIST_END = object(), object()
+
+def apply_marks(text, marks):
+    """Wrap text in the Markdown syntax of its marks (strong, em, strike, code and link)."""
+    mark_types = [mark.get('type') for mark in marks]
+    if len(mark_types) == 1:
+        wrap = MARK_SYNTAX.get(mark_types[0], '')
+    else:
+        wrap = ''.join(syntax for mark_type, syntax in MARK_SYNTAX.items() if mark_type in mark_types)
+    if wrap:
+        stripped = text.strip()
+        if len(stripped) == len(text):
+            text = f"{wrap}{text}{wrap[::-1]}"
+        elif stripped:
+            # Emphasis only applies when it does not start or end with whitespace
+            start = text.index(stripped)
+            text = f"{text[:start]}{wrap}{stripped}{wrap[::-1]}{text[start + len(stripped):]}"
+    if 'link' in mark_types:
+        href = (marks[mark_types.index('link')].get('attrs') or {}).get('href', '')
+        text = f"[{text}]({href})"
+    return text
+
+def list_item_marker(list_type, list_attrs, item, index):
+    """Return the Markdown marker of the item at `index` of a list."""
+    if list_type == 'orderedList':
+        return f"{int(list_attrs.get('order') or 1) + index}. "
+    if list_type == 'taskList':
+        return '- [x] ' if (item.get('attrs') or {}).get('state') == 'DONE' else '- [ ] '
+    if list_type == 'decisionList':
+        return '- '
+    return '* '
+
+@traced()
+def render_adf_markdown(content):
+    """Render Atlassian Document Format content (a node or a list of nodes) to Markdown.
+
+    The document is walked with an explicit stack and written to a single buffer, so long and deeply nested
+    documents render in linear time without hitting the recursion limit. Blocks are separated by a single
+    line break, empty paragraphs are skipped, and nodes without a Markdown equivalent (e.g. media) are dropped.
+    """
+    out = []
+    # (buffer length, content indent) right after the last list item marker: a block starting there
+    # continues the marker line instead of starting a new one
+    marker_end = None
+    # The next block needs a blank line before it, e.g. so that it does not continue a list
+    blank_line = False
+
+    def new_line(indent, blank=False):
+        nonlocal blank_line
+        if marker_end == (len(out), indent):
+            pass
+        elif out:
+            out.append(f"\n{indent.rstrip()}\n{indent}" if blank or blank_line else f"\n{indent}")
+        else:
+            out.append(indent)
+        blank_line = False
+
+    nodes = content if isinstance(content, list) else [content]
+    stack = [(node, '') for node in reversed(nodes)]
+    while stack:
+        entry = stack.pop()
+        node = entry[0]
+        if node is _ITEM:
+            _, item, indent, marker, first = entry
+            if not first:
+                # Consecutive items of a list, even after a nested list
+                blank_line = False
+            new_line(indent)
+            out.append(marker)
+            indent += ' ' * len(marker)
+            marker_end = (len(out), indent)
+            children = item.get('content')
+            if children:
+                stack.extend([(child, indent) for child in reversed(children)])
+            continue
+        if node is _LIST_END:
+            blank_line = True
+            continue
+        if not isinstance(node, dict):
+            continue
 
-def extract_text_from_content(content):
-    if isinstance(content, list):
-        texts = [extract_text_from_content(item) for item in content]
-        return '\n'.join(text for text in texts if text.strip())
+        indent = entry[1]
+        node_type = node.get('type')
+        if node_type == 'text':
+            text = node.get('text', '')
+            if '\n' in text:
+                text = text.replace('\n', f"\n{indent}")
+            marks = node.get('marks')
+            out.append(apply_marks(text, marks) if marks else text)
+            continue
 
-    if isinstance(content, dict):
-        if content.get('type') == 'text':
-            return content.get('text', '')
-        elif content.get('type') == 'paragraph':
-            return extract_text_from_content(content.get('content', []))
-        elif content.get('type') == 'bulletList':
-            return extract_text_from_content(content.get('content', []))
-        elif content.get('type') == 'listItem':
-            item_text = extract_text_from_content(content.get('content', []))
-            return f"* {item_text.strip()}"
+        children = node.get('content') or []
+        if node_type == 'paragraph':
+            for child in children:
+                if not isinstance(child, dict) or child.get('type') != 'text' or child.get('text', '').strip():
+                    new_line(indent)
+                    stack.extend([(child, indent) for child in reversed(children)])
+                    break
+            continue
 
-    return ''
+        attrs = node.get('attrs') or {}
+        if node_type in LIST_TYPES:
+            stack.append((_LIST_END,))
+            for index in range(len(children) - 1, -1, -1):
+                item = children[index]
+                if isinstance(item, dict):
+                    stack.append((_ITEM, item, indent, list_item_marker(node_type, attrs, item, index), index == 0))
+        elif node_type == 'hardBreak':
+            out.append(f"\n{indent}")
+        elif node_type == 'heading':
+            new_line(indent)
+            out.append('#' * min(max(int(attrs.get('level') or 1), 1), 6) + ' ')
+            stack.extend([(child, indent) for child in reversed(children)])
+        elif node_type == 'codeBlock':
+            code = ''.join(child.get('text', '') for child in children if isinstance(child, dict))
+            new_line(indent)
+            out.append(f"```{attrs.get('language') or ''}\n{indent}{code.replace(chr(10), chr(10) + indent)}\n{indent}```")
+        elif node_type in ('blockquote', 'panel'):
+            stack.extend([(child, indent + '> ') for child in reversed(children)])
+        elif node_type == 'rule':
+            # A blank line keeps the previous line from becoming a heading
+            new_line(indent, blank=True)
+            out.append('---')
+        elif node_type == 'table':
+            rows = [row.get('content') or [] for row in children if isinstance(row, dict)]
+            for row_index, cells in enumerate(rows):
+                # Table cells only contain simple blocks, rendered on a single line
+                cell_texts = [
+                    render_adf_markdown(cell.get('content') or []).replace('|', '\\|').replace('\n', '<br>')
+                    for cell in cells if isinstance(cell, dict)
+                ]
+                new_line(indent, blank=row_index == 0)
+                out.append(f"| {' | '.join(cell_texts)} |")
+                if row_index == 0:
+                    new_line(indent)
+                    out.append(f"|{' --- |' * len(cell_texts)}")
+            blank_line = True
+        elif node_type in ('expand', 'nestedExpand'):
+            if attrs.get('title'):
+                new_line(indent)
+                out.append(f"**{attrs['title']}**")
+            stack.extend([(child, indent) for child in reversed(children)])
+        elif node_type in ('mention', 'status'):
+            out.append(attrs.get('text') or '')
+        elif node_type == 'emoji':
+            out.append(attrs.get('text') or attrs.get('shortName') or '')
+        elif node_type == 'inlineCard':
+            out.append(f"<{attrs['url']}>" if attrs.get('url') else '')
+        elif node_type in ('blockCard', 'embedCard'):
+            if attrs.get('url'):
+                new_line(indent)
+                out.append(f"<{attrs['url']}>")
+        elif node_type == 'date':
+            if attrs.get('timestamp'):
+                out.append(datetime.fromtimestamp(int(attrs['timestamp']) / 1000, tz=timezone.utc).strftime('%Y-%m-%d'))
+        elif node_type in SKIPPED_TYPES:
+            continue
+        elif children:
+            # doc, list items outside of a list and unknown containers: render their content
+            stack.extend([(child, indent) for child in reversed(children)])
+        elif 'text' in node:
+            out.append(node['text'])
+
+    return ''.join(out).rstrip()
 
 def log_customfields_with_content(fields):
     """Log all customfield_* fields that have a 'content' key to help troubleshoot structure changes."""
@@ -41,8 +210,9 @@ def log_customfields_with_content(fields):
     if not found:
         print(f"[{SCRIPT_NAME}]   None found", file=sys.stderr)
 
+@traced()
 def parse_release_notes(response_json):
-    release_notes_field_name = 'customfield_10309'
+    release_notes_field_name = RELEASE_NOTES_FIELD
     try:
         fields = response_json.get('fields')
         if not fields:
@@ -61,51 +231,182 @@ def parse_release_notes(response_json):
             log_customfields_with_content(fields)
             return ''
 
-        release_notes = extract_text_from_content(content)
+        release_notes = render_adf_markdown(content)
         return release_notes
 
     except Exception as e:
         print(f"[{SCRIPT_NAME}] Error parsing release notes: {str(e)}", file=sys.stderr)
         return ''
 
+class JiraError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"Status code: {status}. Msg: {message}")
+        self.status = status
+
+class JiraClient:
+    """Jira Cloud REST client keeping one keep-alive connection per thread, with gzip compressed responses.
+
+    GET responses are revalidated against the response cache, if any, with conditional requests.
+    """
+
+    def __init__(self, jira_cloud_id, jira_email, jira_api_token, base_url=JIRA_BASE_URL, cache=None):
+        self.jira_cloud_id = jira_cloud_id
+        self.base_url = urlsplit(f"{base_url.rstrip('/')}/{jira_cloud_id}")
+        auth = base64.b64encode(f"{jira_email}:{jira_api_token}".encode()).decode()
+        self.headers = {
+            "Authorization": f"Basic {auth}",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "Content-Type": "application/json"
+        }
+        self.cache = cache
+        self.request_count = 0
+        self.bytes_received = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self, fresh=False):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or fresh:
+            if connection is not None:
+                connection.close()
+            connection_class = http.client.HTTPSConnection if self.base_url.scheme == 'https' else http.client.HTTPConnection
+            connection = self._local.connection = connection_class(self.base_url.netloc, timeout=REQUEST_TIMEOUT)
+        return connection
+
+    def request(self, method, path, body=None):
+        """Send a request to the Jira REST API (path relative to the cloud ID) and return its JSON response."""
+        payload = json.dumps(body).encode() if body is not None else None
+        target = f"{self.base_url.path}/{path.lstrip('/')}"
+        headers = self.headers
+        cache_key = cached = None
+        if self.cache is not None and method == "GET":
+            cache_key = self.cache.key(method, f"{self.base_url.scheme}://{self.base_url.netloc}{target}", self.headers["Authorization"])
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                headers = {**self.headers, **cached.validators}
+
+        with span(f"jira {method}", path=path.split('?')[0]) as s:
+            for fresh in (False, True):
+                connection = self._connection(fresh)
+                try:
+                    connection.request(method, target, body=payload, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # The kept-alive connection was closed by the server, retried once on a new one
+                    connection.close()
+                    if fresh:
+                        raise
+            s.add_bytes(sent=len(payload or b''), received=len(data))
+            s.set(status=response.status)
+        if response.will_close:
+            connection.close()
+            self._local.connection = None
+
+        with self._lock:
+            self.request_count += 1
+            self.bytes_received += len(data)
+        if response.status == 304 and cached is not None:
+            self.cache.touch(cache_key)
+            data = cached.body
+        elif response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if cache_key is not None and response.status == 200:
+            self.cache.put(cache_key, response.status, response.headers, data)
+        text = data.decode()
+        if response.status >= 400:
+            raise JiraError(response.status, text.replace(self.jira_cloud_id, "[REDACTED]"))
+        return json.loads(text) if text else None
+
+@traced()
+def search_issues(client, jql, fields):
+    """Return every issue matching a JQL query with only the given fields, following the result pages."""
+    issues = []
+    body = {"jql": jql, "fields": fields, "maxResults": SEARCH_PAGE_SIZE}
+    while True:
+        result = client.request("POST", "rest/api/3/search/jql", body)
+        issues += result.get('issues', [])
+        if result.get('isLast', True) or not result.get('nextPageToken'):
+            return issues
+        body["nextPageToken"] = result['nextPageToken']
+
+@traced()
+def fetch_release_notes_batch(client, issue_ids):
+    """Fetch the release notes of many issues with a few concurrent JQL searches, requesting only the release notes field.
+
+    A search rejected because of an unknown issue key is split until the unknown key is isolated.
+
+    Returns:
+        Dict mapping each issue ID to its release notes, None for issues that could not be fetched.
+    """
+    def fetch(keys):
+        jql = f"key in ({', '.join(keys)})"
+        try:
+            return {issue['key']: parse_release_notes(issue) for issue in search_issues(client, jql, [RELEASE_NOTES_FIELD])}
+        except JiraError as error:
+            if error.status != 400:
+                raise
+            if len(keys) == 1:
+                print(f"[{SCRIPT_NAME}] Error fetching Jira issue ({keys[0]}). {error}", file=sys.stderr)
+                return {}
+            middle = len(keys) // 2
+            return {**fetch(keys[:middle]), **fetch(keys[middle:])}
+
+    keys = list(dict.fromkeys(issue_id.upper() for issue_id in issue_ids))
+    batches = [keys[i:i + SEARCH_BATCH_SIZE] for i in range(0, len(keys), SEARCH_BATCH_SIZE)]
+    release_notes = {}
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+        for batch_release_notes in executor.map(fetch, batches):
+            release_notes.update(batch_release_notes)
+    return {issue_id: release_notes.get(issue_id.upper()) for issue_id in issue_ids}
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description=__doc__,
     )
-    parser.add_argument("issue_id", help="RELEASE issue ID to fetch release notes from")
+    parser.add_argument("issue_id", help="RELEASE issue ID to fetch release notes from, comma separated to fetch many issues at once (e.g. RELEASE-1,RELEASE-2)")
     parser.add_argument("jira_cloud_id", help="Atlassian Cloud ID - Can be retrieved from the `tenant_info` endpoint, e.g.: `https://<my-site-name>.atlassian.net/_edge/tenant_info`")
     parser.add_argument("jira_email", help="Email used to create the API token")
     parser.add_argument("jira_api_token", help="Jira API token - Generate one at: https://id.atlassian.com/manage-profile/security/api-tokens")
+    parser.add_argument("--json", action="store_true", help="Print a JSON object mapping each issue ID to its release notes")
+    parser.add_argument("--base-url", default=JIRA_BASE_URL, help=f"Jira API base URL (default: {JIRA_BASE_URL})")
     return parser.parse_args()
 
 def main():
+    report_at_exit()
     args = parse_args()
 
-    jira_issue_id = args.issue_id
-    jira_cloud_id = args.jira_cloud_id
-    jira_email = args.jira_email
-    jira_api_token = args.jira_api_token
-    jira_base_url = "https://api.atlassian.com/ex/jira"
+    issue_ids = [issue_id.strip() for issue_id in args.issue_id.split(",") if issue_id.strip()]
+    client = JiraClient(args.jira_cloud_id, args.jira_email, args.jira_api_token, args.base_url, open_default_cache())
 
-    auth = base64.b64encode(f"{jira_email}:{jira_api_token}".encode()).decode()
-    request = Request(
-        f"{jira_base_url}/{jira_cloud_id}/rest/api/3/issue/{jira_issue_id}",
-        headers={
-            "Authorization": f"Basic {auth}",
-            "Content-Type": "application/json"
-        }
-    )
+    if len(issue_ids) == 1 and not args.json:
+        # The whole issue is fetched, to log the other custom fields if the release notes field moved
+        jira_issue_id = issue_ids[0]
+        try:
+            response_json = client.request("GET", f"rest/api/3/issue/{jira_issue_id}")
+        except JiraError as error:
+            print(f"[{SCRIPT_NAME}] Error fetching Jira issue ({jira_issue_id}). {error}", file=sys.stderr)
+            sys.exit(1)
+
+        release_notes = parse_release_notes(response_json)
+        print(release_notes)
+        return
 
     try:
-        with urlopen(request) as response:
-            response_json = json.loads(response.read().decode())
-    except HTTPError as error:
-        error_text = error.read().decode().replace(jira_cloud_id, "[REDACTED]")
-        print(f"[{SCRIPT_NAME}] Error fetching Jira issue ({jira_issue_id}). Status code: {error.code}. Msg: {error_text}", file=sys.stderr)
+        release_notes = fetch_release_notes_batch(client, issue_ids)
+    except JiraError as error:
+        print(f"[{SCRIPT_NAME}] Error searching Jira issues ({', '.join(issue_ids)}). {error}", file=sys.stderr)
         sys.exit(1)
+    print(f"[{SCRIPT_NAME}] Fetched {len(issue_ids)} issues in {client.request_count} requests, {client.bytes_received} bytes", file=sys.stderr)
 
-    release_notes = parse_release_notes(response_json)
-    print(release_notes)
+    if args.json:
+        print(json.dumps(release_notes, indent=2))
+    else:
+        print("\n\n".join(f"## {issue_id}\n{notes or ''}" for issue_id, notes in release_notes.items()))
+    if any(notes is None for notes in release_notes.values()):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
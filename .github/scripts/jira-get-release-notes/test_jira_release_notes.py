@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+import gzip
+import io
+import json
+import re
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import jira_release_notes
+from jira_release_notes import JiraClient, JiraError, fetch_release_notes_batch, parse_release_notes, render_adf_markdown, search_issues
+
+JQL_KEYS = re.compile(r"key in \((.*)\)")
+
+
+def text(value, *marks):
+    node = {"type": "text", "text": value}
+    if marks:
+        node["marks"] = list(marks)
+    return node
+
+
+def paragraph(*content):
+    return {"type": "paragraph", "content": list(content)}
+
+
+def list_item(*content):
+    return {"type": "listItem", "content": list(content)}
+
+
+def bullet_list(*items):
+    return {"type": "bulletList", "content": list(items)}
+
+
+class JiraSearchHandler(BaseHTTPRequestHandler):
+    """Serves the issues of `server.issues` to JQL `key in (...)` searches, paged with nextPageToken offsets.
+
+    Searches naming an unknown key are rejected with a 400 like Jira does, responses are gzip compressed
+    when the client accepts it.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        keys = JQL_KEYS.fullmatch(body["jql"]).group(1).split(", ")
+        with self.server.lock:
+            self.server.searches.append((keys, body.get("nextPageToken")))
+            self.server.connections.add(self.client_address)
+        unknown = [key for key in keys if key not in self.server.issues]
+        if self.server.status:
+            status, result = self.server.status, {"errorMessages": ["Internal error"]}
+        elif unknown:
+            status, result = 400, {"errorMessages": [f"An issue with key '{unknown[0]}' does not exist for field 'key'."]}
+        else:
+            start = int(body.get("nextPageToken") or 0)
+            end = start + body["maxResults"]
+            issues = [{"key": key, "fields": {field: self.server.issues[key] for field in body["fields"]}} for key in keys[start:end]]
+            status, result = 200, {"issues": issues, "isLast": end >= len(keys)}
+            if end < len(keys):
+                result["nextPageToken"] = str(end)
+
+        data = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def release_notes_field(value):
+    return {"type": "doc", "content": [paragraph(text(value))]}
+
+
+class TestJiraReleaseNotes(unittest.TestCase):
+    def setUp(self):
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+
+    def test_single_paragraph(self):
+        """Test a single paragraph renders as a plain line"""
+        content = [paragraph(text("Fixed a crash when unlocking the vault."))]
+
+        self.assertEqual(render_adf_markdown(content), "Fixed a crash when unlocking the vault.")
+
+    def test_paragraph_text_nodes_stay_on_one_line(self):
+        """Test the text nodes of a paragraph are joined on one line, the previous renderer split them into lines"""
+        content = [paragraph(text("Fixed a crash when "), text("unlocking", {"type": "strong"}), text(" the vault."))]
+
+        self.assertEqual(render_adf_markdown(content), "Fixed a crash when **unlocking** the vault.")
+
+    def test_bullet_list(self):
+        """Test bullet lists render as `* item` lines, right after a preceding paragraph"""
+        documents = [
+            ([bullet_list(list_item(paragraph(text("First item"))), list_item(paragraph(text("Second item"))))],
+             "* First item\n* Second item"),
+            ([paragraph(text("Highlights:")), bullet_list(list_item(paragraph(text("One"))), list_item(paragraph(text("Two"))))],
+             "Highlights:\n* One\n* Two"),
+            ([paragraph(text(" ")), bullet_list(list_item(paragraph(text("Only item"))))], "* Only item"),
+        ]
+
+        for content, expected in documents:
+            with self.subTest(content=content):
+                self.assertEqual(render_adf_markdown(content), expected)
+
+    def test_paragraphs(self):
+        """Test paragraphs are separated by a line break and empty paragraphs are skipped"""
+        content = [paragraph(text("First")), paragraph(), paragraph(text("  ")), paragraph(text("Second"))]
+
+        self.assertEqual(render_adf_markdown(content), "First\nSecond")
+
+    def test_nested_bullet_list(self):
+        """Test nested list items are indented under their parent item"""
+        content = [bullet_list(
+            list_item(paragraph(text("Parent")), bullet_list(list_item(paragraph(text("Child"))))),
+            list_item(paragraph(text("Sibling"))),
+        )]
+
+        self.assertEqual(render_adf_markdown(content), "* Parent\n  * Child\n* Sibling")
+
+    def test_deeply_nested_list(self):
+        """Test lists nested deeper than the recursion limit still render"""
+        node = list_item(paragraph(text("Leaf")))
+        for _ in range(2000):
+            node = list_item(bullet_list(node))
+
+        self.assertTrue(render_adf_markdown([bullet_list(node)]).endswith("* Leaf"))
+
+    def test_ordered_list(self):
+        """Test ordered lists are numbered from their order attribute"""
+        items = [list_item(paragraph(text("One"))), list_item(paragraph(text("Two")))]
+
+        self.assertEqual(render_adf_markdown([{"type": "orderedList", "content": items}]), "1. One\n2. Two")
+        self.assertEqual(render_adf_markdown([{"type": "orderedList", "attrs": {"order": 3}, "content": items}]), "3. One\n4. Two")
+
+    def test_paragraph_after_list(self):
+        """Test a paragraph following a list is separated by a blank line, so it does not continue the list"""
+        content = [bullet_list(list_item(paragraph(text("Item")))), paragraph(text("After"))]
+
+        self.assertEqual(render_adf_markdown(content), "* Item\n\nAfter")
+
+    def test_marks(self):
+        """Test text marks render as Markdown emphasis, outside of surrounding whitespace"""
+        content = [paragraph(
+            text("bold", {"type": "strong"}),
+            text(" and "),
+            text("both ", {"type": "strong"}, {"type": "em"}),
+            text("struck", {"type": "strike"}),
+            text(" "),
+            text("code", {"type": "code"}),
+        )]
+
+        self.assertEqual(render_adf_markdown(content), "**bold** and ***both*** ~~struck~~ `code`")
+
+    def test_links(self):
+        """Test link marks render as Markdown links, combined with other marks"""
+        link = {"type": "link", "attrs": {"href": "https://bitwarden.com"}}
+        content = [paragraph(text("See "), text("the site", link), text(" or "), text("this", {"type": "strong"}, link))]
+
+        self.assertEqual(render_adf_markdown(content), "See [the site](https://bitwarden.com) or [**this**](https://bitwarden.com)")
+
+    def test_parse_release_notes(self):
+        """Test release notes are rendered from the release notes field of an issue"""
+        response = {"fields": {"customfield_10309": {"type": "doc", "content": [paragraph(text("Release notes"))]}}}
+
+        self.assertEqual(parse_release_notes(response), "Release notes")
+
+    def test_parse_release_notes_missing_field(self):
+        """Test an issue without release notes returns an empty string"""
+        with patch('sys.stderr', new=io.StringIO()):
+            self.assertEqual(parse_release_notes({"fields": {"customfield_10309": None}}), "")
+
+
+class TestJiraSearch(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), JiraSearchHandler)
+        self.server.issues = {f"RELEASE-{number}": release_notes_field(f"Notes {number}") for number in range(1, 301)}
+        self.server.searches = []
+        self.server.connections = set()
+        self.server.status = None
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = JiraClient("cloud-id", "user@example.com", "token", f"http://127.0.0.1:{self.server.server_port}")
+
+        # Suppress stderr
+        self.stderr_patcher = patch('sys.stderr', new=io.StringIO())
+        self.stderr_patcher.start()
+        self.addCleanup(self.stderr_patcher.stop)
+
+    def test_search_issues_follows_pages(self):
+        """Test every page of a search is fetched with the nextPageToken of the previous one"""
+        keys = [f"RELEASE-{number}" for number in range(1, 251)]
+
+        issues = search_issues(self.client, f"key in ({', '.join(keys)})", [jira_release_notes.RELEASE_NOTES_FIELD])
+
+        self.assertEqual([issue["key"] for issue in issues], keys)
+        self.assertEqual([token for _, token in self.server.searches], [None, "100", "200"])
+
+    def test_responses_are_gzip_compressed(self):
+        """Test gzip is requested and compressed responses are decoded, counting the compressed bytes"""
+        keys = [f"RELEASE-{number}" for number in range(1, 51)]
+
+        issues = search_issues(self.client, f"key in ({', '.join(keys)})", [jira_release_notes.RELEASE_NOTES_FIELD])
+
+        self.assertEqual(len(issues), 50)
+        self.assertLess(self.client.bytes_received, len(json.dumps({"issues": issues})) / 2)
+
+    def test_batch_splits_keys_into_searches(self):
+        """Test issue IDs are deduplicated case-insensitively and searched SEARCH_BATCH_SIZE keys at a time"""
+        issue_ids = ["RELEASE-1", "release-2", "RELEASE-3", "RELEASE-2", "RELEASE-4", "RELEASE-5"]
+
+        with patch.object(jira_release_notes, "SEARCH_BATCH_SIZE", 2):
+            release_notes = fetch_release_notes_batch(self.client, issue_ids)
+
+        self.assertEqual(release_notes, {
+            "RELEASE-1": "Notes 1", "release-2": "Notes 2", "RELEASE-3": "Notes 3",
+            "RELEASE-2": "Notes 2", "RELEASE-4": "Notes 4", "RELEASE-5": "Notes 5",
+        })
+        self.assertEqual(sorted(keys for keys, _ in self.server.searches),
+                         [["RELEASE-1", "RELEASE-2"], ["RELEASE-3", "RELEASE-4"], ["RELEASE-5"]])
+
+    def test_unknown_key_is_isolated(self):
+        """Test a search rejected because of an unknown key is split until the key is isolated"""
+        issue_ids = ["RELEASE-1", "RELEASE-2", "MISSING-1", "RELEASE-3"]
+
+        release_notes = fetch_release_notes_batch(self.client, issue_ids)
+
+        self.assertEqual(release_notes, {"RELEASE-1": "Notes 1", "RELEASE-2": "Notes 2", "MISSING-1": None, "RELEASE-3": "Notes 3"})
+        self.assertIn(["MISSING-1"], [keys for keys, _ in self.server.searches])
+        self.assertIn("Error fetching Jira issue (MISSING-1)", sys.stderr.getvalue())
+
+    def test_server_error_is_raised(self):
+        """Test errors other than a rejected search fail the batch"""
+        self.server.status = 500
+
+        with self.assertRaises(JiraError) as context:
+            fetch_release_notes_batch(self.client, ["RELEASE-1"])
+        self.assertEqual(context.exception.status, 500)
+
+    def test_connections_are_kept_per_thread(self):
+        """Test each search thread reuses its own keep-alive connection"""
+        issue_ids = [f"RELEASE-{number}" for number in range(1, 31)]
+
+        with patch.object(jira_release_notes, "SEARCH_BATCH_SIZE", 1):
+            release_notes = fetch_release_notes_batch(self.client, issue_ids)
+
+        self.assertEqual(release_notes, {issue_id: f"Notes {issue_id.split('-')[1]}" for issue_id in issue_ids})
+        self.assertEqual(len(self.server.searches), 30)
+        self.assertLessEqual(len(self.server.connections), jira_release_notes.SEARCH_WORKERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,9 @@ Label pull requests based on changed file paths and PR title patterns (conventio
 
 Usage:
     python label-pr.py <pr-number> <pr-labels> [-a|--add|-r|--replace] [-d|--dry-run] [-c|--config CONFIG]
+                       [--base-ref BASE_REF --head-ref HEAD_REF] [--title TITLE]
+    python label-pr.py (--batch PR_NUMBER [PR_NUMBER ...] | --search QUERY) [-a|--add|-r|--replace] [-d|--dry-run]
+                       [-c|--config CONFIG] [-w|--workers WORKERS]
 
 Arguments:
     pr-number: The pull request number
@@ -13,6 +16,13 @@ Arguments:
     -r, --replace: Replace all existing labels
     -d, --dry-run: Run without actually applying labels
     -c, --config: Path to JSON config file (default: .github/label-pr.json)
+    --batch: Label many pull requests, fetching their data in batched GraphQL requests
+    --search: Label every pull request matching a GitHub search query (e.g. "is:open"), in batch mode
+    -w, --workers: Number of concurrent label updates in batch mode (default: 4)
+    --base-ref, --head-ref: Compute changed files with a local merge-base git diff, falling back to the GitHub API if a ref is missing
+    --title: PR title, fetched from the GitHub API when not provided
+
+Set SCRIPT_TRACE=1 (or SCRIPT_TRACE_FILE=trace.json) to time the API calls, git commands and matching, see tracing.py.
 
 Examples:
     python label-pr.py 1234 '[]'
@@ -20,17 +30,35 @@ Examples:
     python label-pr.py 1234 '[{"name":"label1"}]' --replace
     python label-pr.py 1234 '[{"name":"label1"}]' -r -d
     python label-pr.py 1234 '[]' --config custom-config.json
+    python label-pr.py 1234 '[]' --base-ref origin/main --head-ref HEAD --title "feat: New feature" -d
+    python label-pr.py --batch 1234 1235 1236 --replace
+    python label-pr.py --search "is:open updated:>2025-01-01" -r -d
 """
 
 import argparse
+import itertools
 import json
 import os
+import re
 import subprocess
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Iterable, Iterator, Optional
+from urllib.parse import quote
+
+from github_api import GitHubApiError, get_client
+from tracing import report_at_exit, run_subprocess, span, traced
 
 DEFAULT_MODE = "add"
 DEFAULT_CONFIG_PATH = ".github/label-pr.json"
+DEFAULT_BATCH_WORKERS = 4
+# Pull requests per GraphQL request, each one fetches up to GRAPHQL_PAGE_SIZE changed files
+GRAPHQL_BATCH_SIZE = 25
+GRAPHQL_PAGE_SIZE = 100
 
+@traced()
 def load_config_json(config_file: str) -> dict:
     """Load configuration from JSON file."""
     if not os.path.exists(config_file):
@@ -64,95 +92,270 @@ def load_config_json(config_file: str) -> dict:
 
 def gh_get_changed_files(pr_number: str) -> list[str]:
     """Get list of changed files in a pull request."""
+    with closing(gh_iter_changed_files(pr_number)) as changed_files:
+        return list(changed_files)
+
+def gh_iter_changed_files(pr_number: str) -> Iterator[str]:
+    """Stream changed files in a pull request, one page of the GitHub API at a time.
+
+    Closing the iterator before it is exhausted stops fetching the remaining pages.
+    """
+    client = get_client()
     try:
-        result = subprocess.run(
-            ["gh", "pr", "diff", pr_number, "--name-only"],
+        for file in client.paginate(f"repos/{client.repository}/pulls/{pr_number}/files", {"per_page": 100}):
+            yield file["filename"]
+    except GitHubApiError as e:
+        print(f"::error::Error getting changed files: {e}")
+
+def git_get_merge_base(base_ref: str, head_ref: str) -> Optional[str]:
+    """Get the merge base of two refs from the local repository, None if either ref or their history is missing."""
+    try:
+        result = run_subprocess(
+            ["git", "merge-base", base_ref, head_ref],
             capture_output=True,
             text=True,
             check=True
         )
-        changed_files = result.stdout.strip().split("\n")
-        return list(filter(None, changed_files))
-    except subprocess.CalledProcessError as e:
-        print(f"::error::Error getting changed files: {e}")
-        return []
+        return result.stdout.strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+def git_iter_changed_files(merge_base: str, head_ref: str) -> Iterator[str]:
+    """Stream files changed between a merge base and a head ref, as listed by the local git diff.
+
+    Rename detection is disabled (a renamed file lists both paths): it compares file contents, which a
+    checkout without blobs would fetch from the remote one by one.
+    """
+    return iter_command_lines(
+        ["git", "-c", "core.quotePath=false", "diff", "--name-only", "--no-renames", merge_base, head_ref],
+        "Error getting changed files from git"
+    )
 
+def iter_changed_files(pr_number: str, base_ref: Optional[str] = None, head_ref: Optional[str] = None) -> Iterator[str]:
+    """Stream changed files in a pull request, from local git objects when both refs are available, otherwise from the GitHub API."""
+    if base_ref and head_ref:
+        merge_base = git_get_merge_base(base_ref, head_ref)
+        if merge_base:
+            print(f"👀 Getting changed files from local git diff {merge_base}..{head_ref}")
+            return git_iter_changed_files(merge_base, head_ref)
+        print(f"::notice::Refs '{base_ref}' and '{head_ref}' are not available locally, getting changed files from the GitHub API")
+    return gh_iter_changed_files(pr_number)
+
+def iter_command_lines(command: list[str], error_message: str) -> Iterator[str]:
+    """Stream the non-empty output lines of a command as it runs.
+
+    Closing the iterator before it is exhausted terminates the command. Stderr goes to a temporary file rather
+    than a pipe, so a command writing a lot of errors cannot block while stdout is being read.
+    """
+    with span(f"subprocess {command[0]}", args=" ".join(command[1:3])) as s, tempfile.TemporaryFile("w+") as stderr_file:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True
+        )
+        completed = False
+        try:
+            for line in process.stdout:
+                s.add_bytes(received=len(line))
+                output_line = line.rstrip("\n")
+                if output_line:
+                    yield output_line
+            completed = True
+        finally:
+            if not completed:
+                process.terminate()
+            process.stdout.close()
+            returncode = process.wait()
+            stderr_file.seek(0)
+            stderr = stderr_file.read() if completed else ""
+
+    if returncode != 0:
+        print(f"::error::{error_message}: {command[0]} {command[1]} exited with status {returncode}: {stderr.strip()}")
+
+def echo_changed_files(changed_files: Iterable[str]) -> Iterator[str]:
+    """Print changed files as they are consumed."""
+    print("👀 Changed files:")
+    for changed_file in changed_files:
+        print(changed_file)
+        yield changed_file
+
+@traced()
 def gh_get_pr_title(pr_number: str) -> str:
     """Get the title of a pull request."""
+    client = get_client()
     try:
-        result = subprocess.run(
-            ["gh", "pr", "view", pr_number, "--json", "title", "--jq", ".title"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
+        return client.rest("GET", f"repos/{client.repository}/pulls/{pr_number}")["title"].strip()
+    except GitHubApiError as e:
         print(f"::error::Error getting PR title: {e}")
         return ""
 
-def gh_add_labels(pr_number: str, labels: list[str]) -> None:
-    """Add labels to a pull request (doesn't remove existing labels)."""
-    gh_labels = ','.join(labels)
-    subprocess.run(
-        ["gh", "pr", "edit", pr_number, "--add-label", gh_labels],
-        check=True
-    )
-
-def gh_replace_labels(pr_number: str, labels: list[str]) -> None:
-    """Replace all labels on a pull request with the specified labels."""
-    payload = json.dumps({"labels": labels})
-    subprocess.run(
-        ["gh", "api", "repos/{owner}/{repo}/issues/" + pr_number, "-X", "PATCH", "--silent", "--input", "-"],
-        input=payload,
-        text=True,
-        check=True
-    )
-
-def label_filepaths(changed_files: list[str], path_patterns: dict) -> list[str]:
-    """Check changed files against path patterns and return labels to apply."""
-    if not changed_files:
+@traced()
+def gh_edit_labels(pr_number: str, labels_to_add: list[str], labels_to_remove: list[str]) -> None:
+    """Add and remove labels on a pull request, one request for all added labels and one per removed label."""
+    client = get_client()
+    labels_path = f"repos/{client.repository}/issues/{pr_number}/labels"
+    if labels_to_add:
+        client.rest("POST", labels_path, {"labels": labels_to_add})
+    for label in labels_to_remove:
+        client.rest("DELETE", f"{labels_path}/{quote(label, safe='')}")
+
+def reconcile_labels(existing_labels: list[str], labels: set[str], mode: str) -> tuple[list[str], list[str]]:
+    """Return the minimal (labels to add, labels to remove) turning the existing labels into the computed ones.
+
+    In add mode existing labels are never removed. Both lists are empty when the PR is already up to date.
+    """
+    existing = set(existing_labels)
+    labels_to_add = sorted(labels - existing)
+    labels_to_remove = sorted(existing - labels) if mode == "replace" else []
+    return labels_to_add, labels_to_remove
+
+class PathMatcher:
+    """Prefix trie compiled once from path_patterns, matching a file path against every label in a single walk."""
+
+    # Key holding the labels of the patterns ending at a trie node (never a path character)
+    LABELS = ""
+
+    def __init__(self, path_patterns: dict):
+        self.labels = list(path_patterns)
+        self.root: dict = {}
+        for label, patterns in path_patterns.items():
+            for pattern in patterns:
+                node = self.root
+                for char in pattern:
+                    node = node.setdefault(char, {})
+                node.setdefault(self.LABELS, []).append(label)
+
+    def match(self, file: str) -> list[str]:
+        """Return the labels of every pattern that is a prefix of the file path."""
+        node = self.root
+        labels = list(node.get(self.LABELS, []))
+        for char in file:
+            node = node.get(char)
+            if node is None:
+                break
+            labels.extend(node.get(self.LABELS, []))
+        return labels
+
+    @traced()
+    def match_files(self, files: Iterable[str]) -> dict[str, str]:
+        """Return the first matching file for each label, stopping as soon as every label is matched."""
+        matches: dict[str, str] = {}
+        for file in files:
+            for label in self.match(file):
+                matches.setdefault(label, file)
+            if len(matches) == len(self.labels):
+                break
+        return matches
+
+def expand_shared_label(labels: set[str]) -> None:
+    """Replace the app:shared label with the labels of every app."""
+    if "app:shared" in labels:
+        labels.add("app:password-manager")
+        labels.add("app:authenticator")
+        labels.remove("app:shared")
+
+@traced()
+def label_filepaths(changed_files: Iterable[str], path_patterns: dict, matcher: Optional[PathMatcher] = None) -> list[str]:
+    """Check changed files against path patterns and return labels to apply.
+
+    Changed files can be a lazy iterable, it is only consumed until every label is matched.
+    """
+    changed_files = iter(changed_files)
+    first_file = next(changed_files, None)
+    if first_file is None:
         return []
 
+    matcher = matcher or PathMatcher(path_patterns)
+    matches = matcher.match_files(itertools.chain([first_file], changed_files))
+
     labels_to_apply = set()  # Use set to avoid duplicates
 
-    for label, patterns in path_patterns.items():
-        for file in changed_files:
-            if any(file.startswith(pattern) for pattern in patterns):
-                print(f"👀 File '{file}' matches pattern for label '{label}'")
-                labels_to_apply.add(label)
-                break
+    for label in matcher.labels:
+        if label in matches:
+            print(f"👀 File '{matches[label]}' matches pattern for label '{label}'")
+            labels_to_apply.add(label)
 
-    if "app:shared" in labels_to_apply:
-        labels_to_apply.add("app:password-manager")
-        labels_to_apply.add("app:authenticator")
-        labels_to_apply.remove("app:shared")
+    expand_shared_label(labels_to_apply)
 
     if not labels_to_apply:
         print("::notice::No matching file paths found.")
 
     return list(labels_to_apply)
 
-def label_title(pr_title: str, title_patterns: dict) -> list[str]:
+class TitleMatcher:
+    """Matcher compiled once from title_patterns, finding every conventional commit prefix in a single scan.
+
+    Every match ends with a `:` or `(` delimiter, so the title is scanned once for delimiters and a trie of
+    the reversed patterns is walked backwards from each of them. This finds overlapping matches too, such
+    as `chore(` and `chore(ci):`.
+
+    Like the substring checks it replaces, the lowercased title is compared with the patterns as written, so
+    patterns containing uppercase letters never match.
+    """
+
+    DELIMITERS = re.compile(r"[:(]")
+    # Key holding the (label, pattern) pairs of the patterns ending at a trie node (never a title character)
+    MATCHES = ""
+
+    def __init__(self, title_patterns: dict):
+        self.root: dict = {}
+        # (label, pattern) -> (label position, pattern position) in the config, to report matches in config order
+        self.order: dict[tuple[str, str], tuple[int, int]] = {}
+        for label_index, (label, patterns) in enumerate(title_patterns.items()):
+            for pattern_index, pattern in enumerate(patterns):
+                self.order.setdefault((label, pattern), (label_index, pattern_index))
+                node = self.root
+                for char in reversed(pattern):
+                    node = node.setdefault(char, {})
+                node.setdefault(self.MATCHES, []).append((label, pattern))
+
+    def find(self, title: str) -> set[tuple[str, str]]:
+        """Return every (label, pattern) pair whose conventional commit prefix appears in the title."""
+        title_lower = title.lower()
+        found = set()
+        for delimiter in self.DELIMITERS.finditer(title_lower):
+            node = self.root
+            found.update(node.get(self.MATCHES, ()))
+            for position in range(delimiter.start() - 1, -1, -1):
+                node = node.get(title_lower[position])
+                if node is None:
+                    break
+                found.update(node.get(self.MATCHES, ()))
+        return found
+
+    def match(self, title: str) -> list[tuple[str, str]]:
+        """Return the first matching pattern of each matching label, in config order."""
+        first_matches: dict[str, tuple[int, int, str]] = {}
+        for label, pattern in self.find(title):
+            order = self.order[(label, pattern)]
+            if label not in first_matches or order < first_matches[label][:2]:
+                first_matches[label] = (*order, pattern)
+        return [(label, pattern) for label, (_, _, pattern) in sorted(first_matches.items(), key=lambda item: item[1])]
+
+@traced()
+def label_title(pr_title: str, title_patterns: dict, matcher: Optional[TitleMatcher] = None) -> list[str]:
     """Check PR title against patterns and return labels to apply."""
     if not pr_title:
         return []
 
+    matcher = matcher or TitleMatcher(title_patterns)
     labels_to_apply = set()
-    title_lower = pr_title.lower()
-    for label, patterns in title_patterns.items():
-        for pattern in patterns:
-            # Check for pattern with : or ( suffix (conventional commits format)
-            if f"{pattern}:" in title_lower or f"{pattern}(" in title_lower:
-                print(f"📝 Title matches pattern '{pattern}' for label '{label}'")
-                labels_to_apply.add(label)
-                break
+    for label, pattern in matcher.match(pr_title):
+        print(f"📝 Title matches pattern '{pattern}' for label '{label}'")
+        labels_to_apply.add(label)
 
     if not labels_to_apply:
         print("::notice::No matching title patterns found.")
 
     return list(labels_to_apply)
 
+@traced()
+def label_titles(pr_titles: Iterable[str], title_patterns: dict) -> list[list[str]]:
+    """Return the title labels of many PR titles at once (e.g. for backfills), without logging."""
+    matcher = TitleMatcher(title_patterns)
+    return [[label for label, _ in matcher.match(pr_title)] if pr_title else [] for pr_title in pr_titles]
+
 def parse_pr_labels(pr_labels_str: str) -> list[str]:
     """Parse PR labels from JSON array string."""
     try:
@@ -165,15 +368,152 @@ def parse_pr_labels(pr_labels_str: str) -> list[str]:
         print(f"::error::Error parsing PR labels: {e}")
         return []
 
+def filter_preserved_labels(labels: list[str]) -> list[str]:
+    """Return the labels that should be preserved in replace mode (exclude app: and t: labels)."""
+    return [label for label in labels if not (label.startswith("app:") or label.startswith("t:"))]
+
 def get_preserved_labels(pr_labels_str: str) -> list[str]:
     """Get existing PR labels that should be preserved (exclude app: and t: labels)."""
     existing_labels = parse_pr_labels(pr_labels_str)
     print(f"🔍 Parsed PR labels: {existing_labels}")
-    preserved_labels = [label for label in existing_labels if not (label.startswith("app:") or label.startswith("t:"))]
+    preserved_labels = filter_preserved_labels(existing_labels)
     if preserved_labels:
         print(f"🔍 Preserving existing labels: {', '.join(preserved_labels)}")
     return preserved_labels
 
+def gh_graphql(query: str, variables: Optional[dict] = None) -> dict:
+    """Run a GraphQL query against the current repository and return its data.
+
+    The $owner and $repo variables are always set to the current repository.
+    """
+    client = get_client()
+    return client.graphql(query, {"owner": client.owner, "repo": client.repo_name, **(variables or {})})
+
+@traced()
+def gh_search_pr_numbers(search_query: str) -> list[int]:
+    """Return the numbers of every pull request in the current repository matching a search query."""
+    query = """
+    query ($q: String!, $after: String) {
+        search(query: $q, type: ISSUE, first: %d, after: $after) {
+            pageInfo { hasNextPage endCursor }
+            nodes { ... on PullRequest { number } }
+        }
+    }
+    """ % GRAPHQL_PAGE_SIZE
+
+    pr_numbers = []
+    variables = {"q": f"repo:{get_client().repository} is:pr {search_query}"}
+    while True:
+        search = gh_graphql(query, variables)["search"]
+        pr_numbers += [node["number"] for node in search["nodes"] if node]
+        if not search["pageInfo"]["hasNextPage"]:
+            return pr_numbers
+        variables["after"] = search["pageInfo"]["endCursor"]
+
+@traced()
+def gh_fetch_prs(pr_numbers: list[int]) -> dict[int, dict]:
+    """Batch-fetch the title, current labels and changed files of many pull requests.
+
+    Up to GRAPHQL_BATCH_SIZE pull requests are fetched per GraphQL request, pull requests with more
+    changed files than fit in one page are fetched again from their files cursor until complete.
+
+    Returns:
+        Dict mapping each PR number to {"title": str, "labels": list[str], "files": list[str]}.
+    """
+    prs: dict[int, dict] = {}
+    cursors: dict[int, Optional[str]] = dict.fromkeys(pr_numbers)  # PRs with files left to fetch
+
+    while cursors:
+        batch = list(cursors.items())[:GRAPHQL_BATCH_SIZE]
+        fragments = []
+        for pr_number, cursor in batch:
+            after = f", after: {json.dumps(cursor)}" if cursor else ""
+            fragments.append(
+                f"pr_{pr_number}: pullRequest(number: {pr_number}) {{ title labels(first: 100) {{ nodes {{ name }} }} "
+                f"files(first: {GRAPHQL_PAGE_SIZE}{after}) {{ pageInfo {{ hasNextPage endCursor }} nodes {{ path }} }} }}"
+            )
+        query = "query ($owner: String!, $repo: String!) { repository(owner: $owner, name: $repo) { %s } }" % "\n".join(fragments)
+        repository = gh_graphql(query)["repository"]
+
+        for pr_number, _ in batch:
+            pr_data = repository.get(f"pr_{pr_number}")
+            if not pr_data:
+                print(f"::warning::Pull request #{pr_number} not found")
+                del cursors[pr_number]
+                continue
+            pr = prs.setdefault(pr_number, {
+                "title": pr_data["title"],
+                "labels": [node["name"] for node in pr_data["labels"]["nodes"]],
+                "files": [],
+            })
+            files = pr_data["files"] or {"nodes": [], "pageInfo": {"hasNextPage": False}}
+            pr["files"] += [node["path"] for node in files["nodes"]]
+            if files["pageInfo"]["hasNextPage"]:
+                cursors[pr_number] = files["pageInfo"]["endCursor"]
+            else:
+                del cursors[pr_number]
+    return prs
+
+@traced()
+def compute_pr_labels(pr: dict, path_matcher: PathMatcher, title_matcher: TitleMatcher, mode: str) -> set[str]:
+    """Compute the labels to apply to a fetched pull request, without logging."""
+    labels = set(path_matcher.match_files(pr["files"]))
+    expand_shared_label(labels)
+    labels.update(label for label, _ in title_matcher.match(pr["title"]))
+    if labels and mode == "replace":
+        labels.update(filter_preserved_labels(pr["labels"]))
+    return labels
+
+def format_label_changes(labels_to_add: list[str], labels_to_remove: list[str]) -> str:
+    """Format label changes as "+added, -removed"."""
+    return ', '.join([f"+{label}" for label in labels_to_add] + [f"-{label}" for label in labels_to_remove])
+
+@traced()
+def label_prs_batch(pr_numbers: list[int], config: dict, mode: str, dry_run: bool, workers: int = DEFAULT_BATCH_WORKERS) -> bool:
+    """Label many pull requests: fetch them in batches, compute labels locally and apply them concurrently.
+
+    Added labels are content-creating requests, paced by the client to about 80 pull requests per minute,
+    removed labels are not paced.
+
+    Returns:
+        True if every label update succeeded.
+    """
+    print(f"🔍 Fetching {len(pr_numbers)} pull requests...")
+    prs = gh_fetch_prs(pr_numbers)
+    path_matcher = PathMatcher(config["path_patterns"])
+    title_matcher = TitleMatcher(config["title_patterns"])
+
+    updates = []
+    for pr_number, pr in prs.items():
+        labels = compute_pr_labels(pr, path_matcher, title_matcher, mode)
+        if not labels:
+            print(f"::warning::#{pr_number}: No matching patterns found, no labels applied.")
+            continue
+        labels_to_add, labels_to_remove = reconcile_labels(pr["labels"], labels, mode)
+        if not labels_to_add and not labels_to_remove:
+            print(f"✅ #{pr_number}: Labels already up to date: {', '.join(sorted(labels))}")
+            continue
+        print(f"🏷️ #{pr_number}: {format_label_changes(labels_to_add, labels_to_remove)}")
+        updates.append((str(pr_number), labels_to_add, labels_to_remove))
+
+    if dry_run or not updates:
+        return True
+
+    def apply(update: tuple[str, list[str], list[str]]) -> Optional[str]:
+        pr_number, labels_to_add, labels_to_remove = update
+        try:
+            gh_edit_labels(pr_number, labels_to_add, labels_to_remove)
+            return None
+        except GitHubApiError as e:
+            return f"#{pr_number}: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        errors = [error for error in executor.map(apply, updates) if error]
+    for error in errors:
+        print(f"::error::Error applying labels to {error}")
+    print(f"✅ Labeled {len(updates) - len(errors)} of {len(updates)} pull requests")
+    return not errors
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -181,14 +521,48 @@ def parse_args():
     )
     parser.add_argument(
         "pr_number",
+        nargs="?",
         help="The pull request number"
     )
 
     parser.add_argument(
         "pr_labels",
+        nargs="?",
         help="Current PR labels (JSON array)"
     )
 
+    batch_group = parser.add_mutually_exclusive_group()
+    batch_group.add_argument(
+        "--batch",
+        nargs="+",
+        type=int,
+        metavar="PR_NUMBER",
+        help="Label many pull requests, fetching their data in batched GraphQL requests"
+    )
+    batch_group.add_argument(
+        "--search",
+        metavar="QUERY",
+        help="Label every pull request matching a GitHub search query (e.g. \"is:open\"), in batch mode"
+    )
+    parser.add_argument(
+        "--base-ref",
+        help="Base ref of the pull request, changed files are computed locally when both refs are available"
+    )
+    parser.add_argument(
+        "--head-ref",
+        help="Head ref of the pull request, changed files are computed locally when both refs are available"
+    )
+    parser.add_argument(
+        "--title",
+        help="PR title, fetched from the GitHub API when not provided"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=DEFAULT_BATCH_WORKERS,
+        help=f"Number of concurrent label updates in batch mode (default: {DEFAULT_BATCH_WORKERS})"
+    )
+
     mode_group = parser.add_mutually_exclusive_group()
     mode_group.add_argument(
         "-a", "--add",
@@ -213,9 +587,12 @@ def parse_args():
         help=f"Path to JSON config file (default: {DEFAULT_CONFIG_PATH})"
     )
     args, unknown = parser.parse_known_args() # required to handle --dry-run passed as an empty string ("") by the workflow
+    if args.batch is None and args.search is None and (args.pr_number is None or args.pr_labels is None):
+        parser.error("pr_number and pr_labels are required unless --batch or --search is used")
     return args
 
 def main():
+    report_at_exit()
     args = parse_args()
     config = load_config_json(args.config)
     LABEL_TITLE_PATTERNS = config["title_patterns"]
@@ -227,15 +604,23 @@ def main():
     if args.dry_run:
         print("🔍 DRY RUN MODE - Labels will not be applied")
     print(f"📌 Labeling mode: {mode}")
+
+    if args.batch is not None or args.search is not None:
+        pr_numbers = args.batch if args.batch is not None else gh_search_pr_numbers(args.search)
+        success = label_prs_batch(pr_numbers, config, mode, args.dry_run, args.workers)
+        print("✅ Done")
+        sys.exit(0 if success else 1)
     print(f"🔍 Checking PR #{pr_number}...")
 
-    pr_title = gh_get_pr_title(pr_number)
+    pr_title = args.title if args.title is not None else gh_get_pr_title(pr_number)
     print(f"📋 PR Title: {pr_title}\n")
 
-    changed_files = gh_get_changed_files(pr_number)
-    print("👀 Changed files:\n" + "\n".join(changed_files) + "\n")
+    # Changed files are matched as they are listed, the listing is stopped once every path label is matched
+    matcher = PathMatcher(LABEL_PATH_PATTERNS)
+    with closing(iter_changed_files(pr_number, args.base_ref, args.head_ref)) as changed_files:
+        filepath_labels = label_filepaths(echo_changed_files(changed_files), LABEL_PATH_PATTERNS, matcher)
+    print("")
 
-    filepath_labels = label_filepaths(changed_files, LABEL_PATH_PATTERNS)
     title_labels = label_title(pr_title, LABEL_TITLE_PATTERNS)
     all_labels = set(filepath_labels + title_labels)
 
@@ -244,16 +629,21 @@ def main():
         labels_str = ', '.join(sorted(all_labels))
         if mode == "add":
             print(f"::notice::🏷️ Adding labels: {labels_str}")
-            if not args.dry_run:
-                gh_add_labels(pr_number, list(all_labels))
         else:
             preserved_labels = get_preserved_labels(args.pr_labels)
             if preserved_labels:
                 all_labels.update(preserved_labels)
                 labels_str = ', '.join(sorted(all_labels))
             print(f"::notice::🏷️ Replacing labels with: {labels_str}")
+
+        # Only write the difference with the current labels, and nothing when they already match
+        labels_to_add, labels_to_remove = reconcile_labels(parse_pr_labels(args.pr_labels), all_labels, mode)
+        if not labels_to_add and not labels_to_remove:
+            print("✅ PR labels are already up to date, skipping update")
+        else:
+            print(f"🏷️ Label changes: {format_label_changes(labels_to_add, labels_to_remove)}")
             if not args.dry_run:
-                gh_replace_labels(pr_number, list(all_labels))
+                gh_edit_labels(pr_number, labels_to_add, labels_to_remove)
     else:
         print("::warning::No matching patterns found, no labels applied.")
 
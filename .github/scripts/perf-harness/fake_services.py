@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+
+"""
+Local stand-in for the GitHub REST, GitHub GraphQL and Jira endpoints used by the workflow scripts.
+
+Serves deterministic synthetic data sized by the configuration (changed files per PR, PRs per release,
+linked issues per PR, ADF list items per Jira issue...), and can inject latency, rate limits and
+GraphQL query size limits. Point the scripts to it with GITHUB_API_URL and --base-url.
+
+Endpoints:
+    GET    /repos/{owner}/{repo}/pulls/{number}                  PR title
+    GET    /repos/{owner}/{repo}/pulls/{number}/files            Changed files, paginated with Link headers
+    POST   /repos/{owner}/{repo}/issues/{number}/labels          Add labels
+    DELETE /repos/{owner}/{repo}/issues/{number}/labels/{name}   Remove a label
+    POST   /repos/{owner}/{repo}/issues/{number}/comments        Comment an issue
+    GET    /repos/{owner}/{repo}/releases                        Releases, newest first, paginated with Link headers
+    GET    /repos/{owner}/{repo}/releases/tags/{tag}             Release by tag
+    POST   /graphql                                              PR search, PR labels and files, linked issues, issue comments
+    GET    /ex/jira/{cloud_id}/rest/api/3/issue/{key}            Jira issue
+    POST   /ex/jira/{cloud_id}/rest/api/3/search/jql             Jira search by issue keys
+    GET    /_stats                                               Request counts of the server
+
+Usage:
+    python fake_services.py [--port 8080] [--latency-ms 20] [--files-per-pr 5000] [--prs-per-release 500]
+                            [--adf-items 100000] [--rate-limit-every 50] ...
+
+Example:
+    python fake_services.py --port 8080 --files-per-pr 5000 &
+    GITHUB_API_URL=http://127.0.0.1:8080 GH_TOKEN=fake GH_REPO=bitwarden/android \\
+        python ../label-pr.py 1 '[]' --dry-run
+"""
+
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, NamedTuple, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Changed files are in the first directory, except for one file in each of the others at the end of the
+# list, so label-pr.py only finds every path label of label-pr.json after reading all the files
+FILE_DIRECTORIES = [
+    "app/src/main/kotlin/com/x8bit/bitwarden/ui",
+    "docs",
+    "core/src/main/kotlin/com/bitwarden/core",
+    "authenticator/src/main/kotlin/com/bitwarden/authenticator",
+]
+PR_TITLES = ["feat: New feature {n}", "fix: Crash {n}", "chore(deps): Update library {n}", "[PM-{n}] refactor: Cleanup"]
+# First PR and issue numbers of the synthetic data
+FIRST_PR_NUMBER = 1000
+FIRST_ISSUE_NUMBER = 100000
+
+class FakeServiceConfig(NamedTuple):
+    latency_ms: float = 0.0
+    # Every Nth request is answered with a secondary rate limit error (0 disables it)
+    rate_limit_every: int = 0
+    rate_limit_retry_after: int = 1
+    # GraphQL queries with more aliased fields are rejected as too large (0 disables it)
+    graphql_max_fields: int = 0
+    files_per_pr: int = 50
+    search_prs: int = 100
+    releases: int = 1
+    prs_per_release: int = 50
+    issues_per_pr: int = 1
+    comments_per_issue: int = 0
+    adf_items: int = 10
+    # Extra Jira custom fields padding every issue, like the real ones
+    jira_extra_fields: int = 50
+
+@functools.lru_cache(maxsize=1024)
+def pr_files(config: FakeServiceConfig, pr_number: int) -> list[str]:
+    first_other = config.files_per_pr - len(FILE_DIRECTORIES) + 1
+    return [
+        f"{FILE_DIRECTORIES[max(0, i - first_other + 1)]}/pr{pr_number}/File{i}.kt"
+        for i in range(config.files_per_pr)
+    ]
+
+def pr_title(pr_number: int) -> str:
+    return PR_TITLES[pr_number % len(PR_TITLES)].format(n=pr_number)
+
+def release_tag(index: int) -> str:
+    return f"v2025.{index}.0"
+
+def release_pr_numbers(config: FakeServiceConfig, index: int) -> list[int]:
+    first = FIRST_PR_NUMBER + index * config.prs_per_release
+    return list(range(first, first + config.prs_per_release))
+
+def release_body(owner: str, repo: str, config: FakeServiceConfig, index: int) -> str:
+    lines = ["## What's Changed", ""]
+    lines += [
+        f"* {pr_title(pr_number)} by @contributor in https://github.com/{owner}/{repo}/pull/{pr_number}"
+        for pr_number in release_pr_numbers(config, index)
+    ]
+    return "\n".join(lines)
+
+def release_data(owner: str, repo: str, config: FakeServiceConfig, index: int) -> dict:
+    tag = release_tag(index)
+    return {
+        "tag_name": tag,
+        "name": tag,
+        "draft": False,
+        "html_url": f"https://github.com/{owner}/{repo}/releases/tag/{tag}",
+        "body": release_body(owner, repo, config, index),
+    }
+
+def linked_issues(config: FakeServiceConfig, pr_number: int) -> list[int]:
+    first = FIRST_ISSUE_NUMBER + (pr_number - FIRST_PR_NUMBER) * config.issues_per_pr
+    return list(range(first, first + config.issues_per_pr))
+
+def adf_document(config: FakeServiceConfig, key: str) -> dict:
+    link = {"type": "link", "attrs": {"href": "https://github.com/bitwarden/android"}}
+    items = [
+        {"type": "listItem", "content": [{"type": "paragraph", "content": [
+            {"type": "text", "text": f"{key} release note {i} "},
+            {"type": "text", "text": "fixed", "marks": [{"type": "strong"}]},
+            {"type": "text", "text": " PR", "marks": [link]},
+        ]}]}
+        for i in range(config.adf_items)
+    ]
+    return {"type": "doc", "version": 1, "content": [{"type": "bulletList", "content": items}]}
+
+def jira_issue(config: FakeServiceConfig, key: str, fields: Optional[list[str]] = None) -> dict:
+    all_fields = {
+        "customfield_10309": adf_document(config, key),
+        "summary": f"Release {key}",
+        **{f"customfield_{20000 + i}": {"value": f"Field {i}"} for i in range(config.jira_extra_fields)},
+    }
+    if fields is not None:
+        all_fields = {name: value for name, value in all_fields.items() if name in fields}
+    return {"id": key.split("-")[-1], "key": key, "fields": all_fields}
+
+def page(items: list, per_page: int, after: Optional[str]) -> tuple[list, dict]:
+    """Return a GraphQL connection page of items, cursors are item offsets."""
+    start = int(after) if after else 0
+    end = start + per_page
+    return items[start:end], {"hasNextPage": end < len(items), "endCursor": str(end)}
+
+GRAPHQL_SEARCH = re.compile(r'search\(query: \$q, type: ISSUE, first: (\d+)')
+GRAPHQL_PR_FILES = re.compile(r'(\w+): pullRequest\(number: (\d+)\) \{ title labels\(first: \d+\) \{ nodes \{ name \} \} files\(first: (\d+)(?:, after: "([^"]*)")?\)')
+GRAPHQL_PR_ISSUES = re.compile(r'(\w+): pullRequest\(number: (\d+)\) \{ closingIssuesReferences\(first: (\d+)(?:, after: "([^"]*)")?\)')
+GRAPHQL_ISSUE_COMMENTS = re.compile(r'(\w+): issue\(number: (\d+)\) \{ comments\(last: (\d+)(?:, before: "([^"]*)")?\)')
+
+def graphql_data(config: FakeServiceConfig, query: str, variables: dict) -> Any:
+    """Resolve the GraphQL queries of label-pr.py and gh_release_update_issues.py, None if the query is too large."""
+    search = GRAPHQL_SEARCH.search(query)
+    if search:
+        pr_numbers = list(range(FIRST_PR_NUMBER, FIRST_PR_NUMBER + config.search_prs))
+        nodes, page_info = page(pr_numbers, int(search.group(1)), variables.get("after"))
+        return {"search": {"pageInfo": page_info, "nodes": [{"number": number} for number in nodes]}}
+
+    fields = {}
+    for alias, number, first, after in GRAPHQL_PR_FILES.findall(query):
+        nodes, page_info = page(pr_files(config, int(number)), int(first), after)
+        fields[alias] = {
+            "title": pr_title(int(number)),
+            "labels": {"nodes": []},
+            "files": {"pageInfo": page_info, "nodes": [{"path": path} for path in nodes]},
+        }
+    for alias, number, first, after in GRAPHQL_PR_ISSUES.findall(query):
+        nodes, page_info = page(linked_issues(config, int(number)), int(first), after)
+        fields[alias] = {"closingIssuesReferences": {"pageInfo": page_info, "nodes": [{"number": n} for n in nodes]}}
+    for alias, number, last, before in GRAPHQL_ISSUE_COMMENTS.findall(query):
+        end = int(before) if before else config.comments_per_issue
+        start = max(0, end - int(last))
+        comments = [{"body": f"Comment {i}", "viewerDidAuthor": False} for i in range(start, end)]
+        fields[alias] = {"comments": {"pageInfo": {"hasPreviousPage": start > 0, "startCursor": str(start)}, "nodes": comments}}
+    if config.graphql_max_fields and len(fields) > config.graphql_max_fields:
+        return None
+    return {"repository": fields}
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are sent in two writes: with Nagle's algorithm the body waits for the client's
+    # delayed ACK of the headers, adding ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+    server: "FakeServiceServer"
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, data: Any = None, headers: Optional[dict] = None) -> None:
+        body = json.dumps(data).encode() if data is not None else b""
+        if self.command == "GET" and status == 200:
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            headers = {**(headers or {}), "ETag": etag}
+            if self.headers.get("If-None-Match") == etag:
+                self.server.count_not_modified()
+                status, body = 304, b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count_bytes(len(body))
+
+    def reply_page(self, items: list, url, params: dict) -> None:
+        """Reply with a page of a REST list, linking to the next page like GitHub does."""
+        per_page = int(params.get("per_page", ["30"])[0])
+        page_number = int(params.get("page", ["1"])[0])
+        start = (page_number - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            headers["Link"] = f'<http://{self.headers["Host"]}{url.path}?per_page={per_page}&page={page_number + 1}>; rel="next"'
+        self.reply(200, items[start:start + per_page], headers)
+
+    def handle_request(self, method: str) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            return self.reply(200, self.server.stats())
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        config = self.server.config
+        request_number = self.server.count_request(method, url.path)
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+        if config.rate_limit_every and request_number % config.rate_limit_every == 0:
+            self.server.count_rate_limited()
+            return self.reply(403, {"message": "You have exceeded a secondary rate limit."},
+                              {"Retry-After": str(config.rate_limit_retry_after)})
+
+        if url.path == "/graphql":
+            data = graphql_data(config, body["query"], body.get("variables") or {})
+            if data is None:
+                return self.reply(200, {"errors": [{"message": "Query exceeds the maximum node limit"}]})
+            return self.reply(200, {"data": data})
+
+        params = parse_qs(url.query)
+        match = re.match(r"/repos/([^/]+)/([^/]+)/(.+)$", url.path)
+        if match:
+            owner, repo, resource = match.groups()
+            pr = re.fullmatch(r"pulls/(\d+)(/files)?", resource)
+            if method == "GET" and pr:
+                if pr.group(2):
+                    return self.reply_page([{"filename": path} for path in pr_files(config, int(pr.group(1)))], url, params)
+                return self.reply(200, {"number": int(pr.group(1)), "title": pr_title(int(pr.group(1)))})
+            if method == "POST" and re.fullmatch(r"issues/\d+/labels", resource):
+                return self.reply(200, [{"name": name} for name in body["labels"]])
+            if method == "DELETE" and re.fullmatch(r"issues/\d+/labels/.+", resource):
+                return self.reply(200, [])
+            if method == "POST" and re.fullmatch(r"issues/\d+/comments", resource):
+                return self.reply(201, {"id": 1, "body": body["body"]})
+            if method == "GET" and resource == "releases":
+                releases = [release_data(owner, repo, config, index) for index in reversed(range(config.releases))]
+                return self.reply_page(releases, url, params)
+            tag = re.fullmatch(r"releases/tags/(.+)", resource)
+            if method == "GET" and tag:
+                for index in range(config.releases):
+                    if release_tag(index) == unquote(tag.group(1)):
+                        return self.reply(200, release_data(owner, repo, config, index))
+
+        jira = re.match(r"/ex/jira/[^/]+/rest/api/3/(.+)$", url.path)
+        if jira:
+            issue = re.fullmatch(r"issue/([^/]+)", jira.group(1))
+            if method == "GET" and issue:
+                return self.reply(200, jira_issue(config, unquote(issue.group(1))))
+            if method == "POST" and jira.group(1) == "search/jql":
+                keys = re.fullmatch(r"key in \((.*)\)", body["jql"]).group(1).split(", ")
+                issues, page_info = page(keys, min(body.get("maxResults", 50), 100), body.get("nextPageToken"))
+                data = {"issues": [jira_issue(config, key, body.get("fields")) for key in issues], "isLast": not page_info["hasNextPage"]}
+                if page_info["hasNextPage"]:
+                    data["nextPageToken"] = page_info["endCursor"]
+                return self.reply(200, data)
+
+        self.reply(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+class FakeServiceServer(ThreadingHTTPServer):
+    """Threaded stand-in server counting the requests it receives, by endpoint."""
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: FakeServiceConfig):
+        super().__init__(address, FakeServiceHandler)
+        self.config = config
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._requests: Counter = Counter()
+            self._bytes_sent = 0
+            self._rate_limited = 0
+            self._not_modified = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self, method: str, path: str) -> int:
+        """Count a request under its endpoint (the path with numbers and names replaced by placeholders), return its number."""
+        endpoint = re.sub(r"/repos/[^/]+/[^/]+/", "/repos/{owner}/{repo}/", path)
+        endpoint = re.sub(r"/ex/jira/[^/]+/", "/ex/jira/{cloud_id}/", endpoint)
+        endpoint = re.sub(r"/(pulls|issues)/\d+", r"/\1/{number}", endpoint)
+        endpoint = re.sub(r"/(labels|tags|issue)/[^/]+$", r"/\1/{name}", endpoint)
+        endpoint = f"{method} {endpoint}"
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._requests[None] += 1
+            return self._requests[None]
+
+    def count_bytes(self, length: int) -> None:
+        with self._lock:
+            self._bytes_sent += length
+
+    def count_rate_limited(self) -> None:
+        with self._lock:
+            self._rate_limited += 1
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self._not_modified += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self._requests[None],
+                "rate_limited": self._rate_limited,
+                "not_modified": self._not_modified,
+                "bytes_sent": self._bytes_sent,
+                "endpoints": {endpoint: count for endpoint, count in sorted(self._requests.items(), key=str) if endpoint},
+            }
+
+def start_server(config: FakeServiceConfig, port: int = 0) -> FakeServiceServer:
+    """Start a stand-in server on a background thread, on a free port by default."""
+    server = FakeServiceServer(("127.0.0.1", port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub and Jira APIs used by the workflow scripts.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    defaults = FakeServiceConfig()
+    for field in FakeServiceConfig._fields:
+        parser.add_argument(
+            f"--{field.replace('_', '-')}",
+            type=type(getattr(defaults, field)),
+            default=getattr(defaults, field),
+            help=f"(default: {getattr(defaults, field)})"
+        )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = FakeServiceConfig(**{field: getattr(args, field) for field in FakeServiceConfig._fields})
+    server = FakeServiceServer(("127.0.0.1", args.port), config)
+    print(f"🚀 Serving fake GitHub and Jira APIs on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"📋 {json.dumps(server.stats(), indent=2)}")
+
+if __name__ == "__main__":
+    main()
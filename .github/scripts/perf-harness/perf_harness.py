@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+, Linux (peak memory is read from wait4)
+"""
+Offline end-to-end performance harness for label-pr.py, gh_release_update_issues.py and jira_release_notes.py.
+
+Each scenario starts a stand-in server (fake_services.py) sized for it, runs a script against it in a
+subprocess (--repeat times, keeping the fastest run) and reports the wall time, the CPU time and peak RSS of the script, the API calls received by
+the server and the slowest spans of the script trace (see tracing.py).
+
+Usage:
+    python perf_harness.py [--scenario NAME ...] [--latency-ms 20] [--repeat 1] [--cache] [--output FILE]
+
+Examples:
+    python perf_harness.py
+    python perf_harness.py --scenario label-pr-5000-files jira-huge-adf --latency-ms 50
+    python perf_harness.py --repeat 3 --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from fake_services import FakeServiceConfig, FakeServiceServer, release_tag, start_server
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+SCRIPTS_DIR = REPO_ROOT / ".github" / "scripts"
+REPOSITORY = "bitwarden/android"
+DEFAULT_LATENCY_MS = 20.0
+DEFAULT_REPEAT = 1
+# Slowest spans of the script trace kept in the results
+TOP_SPANS = 5
+
+class Scenario(NamedTuple):
+    description: str
+    config: FakeServiceConfig
+    # Builds the script command line from the server URL
+    command: Callable[[str], List[str]]
+
+def label_pr(*args: str) -> Callable[[str], List[str]]:
+    return lambda url: [sys.executable, str(SCRIPTS_DIR / "label-pr.py"), *args]
+
+def release_update_issues(*args: str) -> Callable[[str], List[str]]:
+    return lambda url: [sys.executable, str(SCRIPTS_DIR / "gh_release_update_issues.py"), *args]
+
+def jira_release_notes(issue_ids: str) -> Callable[[str], List[str]]:
+    script = SCRIPTS_DIR / "jira-get-release-notes" / "jira_release_notes.py"
+    return lambda url: [sys.executable, str(script), issue_ids, "cloud-id", "perf@example.com", "fake-token", "--base-url", f"{url}/ex/jira"]
+
+def release_url(index: int) -> str:
+    return f"https://github.com/{REPOSITORY}/releases/tag/{release_tag(index)}"
+
+# Content-creating requests are spaced by github_api.WRITE_INTERVAL, the GitHub scenarios run dry to measure the reads
+SCENARIOS: Dict[str, Scenario] = {
+    "label-pr-5000-files": Scenario(
+        "label-pr.py on a PR changing 5,000 files, listed with the REST API",
+        FakeServiceConfig(files_per_pr=5000),
+        label_pr("1000", "[]", "--replace"),
+    ),
+    "label-pr-5000-files-rate-limited": Scenario(
+        "label-pr.py on a PR changing 5,000 files, with a secondary rate limit every 20 requests",
+        FakeServiceConfig(files_per_pr=5000, rate_limit_every=20),
+        label_pr("1000", "[]", "--replace"),
+    ),
+    "label-pr-batch-500": Scenario(
+        "label-pr.py --search on 500 PRs changing 300 files each, in batched GraphQL requests",
+        FakeServiceConfig(search_prs=500, files_per_pr=300),
+        label_pr("--search", "is:open", "--replace", "--dry-run"),
+    ),
+    "release-500-prs": Scenario(
+        "gh_release_update_issues.py on a release of 500 PRs linking 2 issues each",
+        FakeServiceConfig(prs_per_release=500, issues_per_pr=2, comments_per_issue=20),
+        release_update_issues(release_url(0), "--dry-run"),
+    ),
+    "release-backfill-20": Scenario(
+        "gh_release_update_issues.py --from-tag over 20 releases of 50 PRs each",
+        FakeServiceConfig(releases=20, prs_per_release=50, issues_per_pr=1),
+        release_update_issues(release_url(19), "--from-tag", release_tag(0), "--dry-run"),
+    ),
+    "jira-huge-adf": Scenario(
+        "jira_release_notes.py on an issue whose release notes are a 100,000 item ADF list",
+        FakeServiceConfig(adf_items=100000),
+        jira_release_notes("RELEASE-1"),
+    ),
+    "jira-batch-500": Scenario(
+        "jira_release_notes.py --json on 500 issues, fetched with batched JQL searches",
+        FakeServiceConfig(adf_items=50),
+        lambda url: jira_release_notes(",".join(f"RELEASE-{i}" for i in range(1, 501)))(url) + ["--json"],
+    ),
+}
+
+def run_scenario(name: str, scenario: Scenario, server: FakeServiceServer, cache_dir: str, log_dir: str) -> Dict[str, Any]:
+    """Run a scenario once against its stand-in server and return its measurements."""
+    server.reset_stats()
+    trace_file = os.path.join(log_dir, f"{name}.trace.json")
+    log_file = os.path.join(log_dir, f"{name}.log")
+    env = {
+        **os.environ,
+        "GITHUB_API_URL": server.url,
+        "GITHUB_GRAPHQL_URL": f"{server.url}/graphql",
+        "GH_TOKEN": "fake-token",
+        "GH_REPO": REPOSITORY,
+        "HTTP_CACHE_DIR": cache_dir,
+        "SCRIPT_TRACE_FILE": trace_file,
+    }
+    env.pop("GITHUB_STEP_SUMMARY", None)
+
+    with open(log_file, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(scenario.command(server.url), cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 reports the resource usage of this child only, unlike getrusage(RUSAGE_CHILDREN)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stats = server.stats()
+
+    spans = []
+    if os.path.exists(trace_file):
+        with open(trace_file, 'r') as f:
+            spans = json.load(f)["spans"][:TOP_SPANS]
+    return {
+        "exit_code": process.returncode,
+        "seconds": round(seconds, 6),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 6),
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+        "api_calls": stats["requests"],
+        "rate_limited": stats["rate_limited"],
+        "not_modified": stats["not_modified"],
+        "bytes_received": stats["bytes_sent"],
+        "endpoints": stats["endpoints"],
+        "top_spans": spans,
+        "log": log_file,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the workflow scripts against local stand-in GitHub and Jira APIs and measure them.")
+    parser.add_argument(
+        "--scenario",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+        help="Scenarios to run (default: all)"
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=DEFAULT_LATENCY_MS,
+        help=f"Latency added to every API response (default: {DEFAULT_LATENCY_MS})"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Number of runs per scenario, the fastest one is kept (default: {DEFAULT_REPEAT})"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Share a response cache between the runs of a scenario, instead of disabling it"
+    )
+    parser.add_argument(
+        "--log-dir",
+        help="Directory to keep the script logs and traces in (default: a temporary directory)"
+    )
+    parser.add_argument(
+        "--output",
+        help="Path to save the results JSON to"
+    )
+    return parser.parse_args()
+
+def main():
+    if not hasattr(os, "wait4"):
+        print("::error::The performance harness requires os.wait4, run it on Linux or macOS")
+        sys.exit(1)
+    args = parse_args()
+
+    results = {}
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = args.log_dir or tmp_dir
+        os.makedirs(log_dir, exist_ok=True)
+        for name in args.scenario:
+            scenario = SCENARIOS[name]
+            print(f"🚀 {name}: {scenario.description}")
+            cache_dir = os.path.join(tmp_dir, f"{name}.cache") if args.cache else ""
+            # The server is shared by the runs, so that cached responses are revalidated against the same URLs
+            server = start_server(scenario.config._replace(latency_ms=args.latency_ms))
+            try:
+                runs = [run_scenario(name, scenario, server, cache_dir, log_dir) for _ in range(args.repeat)]
+            finally:
+                server.shutdown()
+                server.server_close()
+            result = min(runs, key=lambda run: run["seconds"])
+            results[name] = result
+
+            print(f"⏱️ {name}: {result['seconds']:.3f}s, cpu {result['cpu_seconds']:.3f}s, peak {result['peak_rss_bytes'] / 1024 / 1024:.1f} MiB, "
+                  f"{result['api_calls']} API calls ({result['rate_limited']} rate limited, {result['not_modified']} not modified), "
+                  f"{result['bytes_received'] / 1024:.0f} KiB received")
+            for endpoint, count in result["endpoints"].items():
+                print(f"    {count:>6} {endpoint}")
+            if result["exit_code"] != 0:
+                failed.append(name)
+                print(f"::error::{name} exited with status {result['exit_code']}, see {result['log'] if args.log_dir else 'its log (--log-dir)'}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "latency_ms": args.latency_ms,
+                    "results": results,
+                }, f, indent=2)
+            print(f"Results saved to {args.output}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import gh_release_update_issues
+from gh_release_update_issues import (
+    CommentState,
+    ReleasePRs,
+    comment_issues,
+    find_commented_releases,
+    gh_fetch_commented_releases,
+    gh_fetch_linked_issues_batched,
+    gh_fetch_releases_between,
+    gh_graphql_batched,
+    is_release_comment,
+    map_issues_to_releases,
+)
+from github_api import GitHubApiError
+
+RELEASE_URL = "https://github.com/owner/repo/releases/tag/v1.0.0"
+OTHER_RELEASE_URL = "https://github.com/owner/repo/releases/tag/v1.1.0"
+ISSUE_COMMENTS = re.compile(r'(\w+): issue\(number: (\d+)\) \{ comments\(last: (\d+)(?:, before: "([^"]*)")?\)')
+PR_ISSUES = re.compile(r'(\w+): pullRequest\(number: (\d+)\) \{ closingIssuesReferences\(first: (\d+)(?:, after: "([^"]*)")?\)')
+ALIAS = re.compile(r'^\s*(\w+): ', re.MULTILINE)
+
+
+def comment(body, by_viewer=True):
+    return {"body": body, "viewerDidAuthor": by_viewer}
+
+
+def release_comment(release_url, by_viewer=True):
+    return comment(f":shipit: Pull Request(s) linked to this issue released in [v1]({release_url}):", by_viewer)
+
+
+class FakeGraphQLClient:
+    """Resolves the GraphQL queries of gh_release_update_issues.py, cursors are item offsets.
+
+    Queries with more than `max_fields` aliased fields are rejected like GitHub rejects queries that are too large,
+    every query fails with `error` when set. Posted comments are added to the issue comments, the next
+    `post_failures` (status, whether the comment is posted anyway) fail the comments posted afterwards.
+    """
+
+    def __init__(self, issue_comments=None, pr_issues=None, max_fields=None, error=None, post_failures=()):
+        self.issue_comments = issue_comments or {}
+        self.pr_issues = pr_issues or {}
+        self.max_fields = max_fields
+        self.error = error
+        self.post_failures = list(post_failures)
+        self.requests = []
+        self.query_sizes = []
+        self.posts = []
+        self._lock = threading.Lock()
+
+    def rest(self, method, path, body=None, params=None):
+        issue_number = int(path.split("/")[-2])
+        with self._lock:
+            self.posts.append(issue_number)
+            failure = self.post_failures.pop(0) if self.post_failures else None
+            if failure is None or failure[1]:
+                self.issue_comments.setdefault(issue_number, []).append(comment(body["body"]))
+        if failure:
+            raise GitHubApiError(f"POST {path} failed with status {failure[0]}", failure[0])
+
+    def graphql(self, query, variables):
+        size = len(ALIAS.findall(query))
+        with self._lock:
+            self.query_sizes.append(size)
+        if self.error:
+            raise self.error
+        if self.max_fields is not None and size > self.max_fields:
+            raise GitHubApiError("GraphQL errors: Query has complexity of 20000, which exceeds the maximum of 10000")
+        fields = {}
+        for alias, number, first, after in PR_ISSUES.findall(query):
+            with self._lock:
+                self.requests.append((int(number), after or None))
+            issues = self.pr_issues.get(int(number), [])
+            start = int(after) if after else 0
+            end = start + int(first)
+            fields[alias] = {"closingIssuesReferences": {
+                "pageInfo": {"hasNextPage": end < len(issues), "endCursor": str(end)},
+                "nodes": [{"number": issue_number} for issue_number in issues[start:end]],
+            }}
+        for alias, number, last, before in ISSUE_COMMENTS.findall(query):
+            with self._lock:
+                self.requests.append((int(number), before or None))
+            comments = self.issue_comments.get(int(number), [])
+            end = int(before) if before else len(comments)
+            start = max(0, end - int(last))
+            fields[alias] = {"comments": {
+                "pageInfo": {"hasPreviousPage": start > 0, "startCursor": str(start)},
+                "nodes": comments[start:end],
+            }}
+        return {"repository": fields}
+
+
+def release(tag, draft=False):
+    return {"tag_name": tag, "name": f"Release {tag}", "html_url": f"https://github.com/owner/repo/releases/tag/{tag}",
+            "body": f"* https://github.com/owner/repo/pull/{tag[1:]}", "draft": draft}
+
+
+class FakeReleasesClient:
+    """Lists releases newest first, counting the releases read from the paginated list."""
+
+    def __init__(self, releases):
+        self.releases = releases
+        self.read = 0
+
+    def paginate(self, path, params=None):
+        for item in self.releases:
+            self.read += 1
+            yield item
+
+
+class TestReleaseRange(unittest.TestCase):
+    def setUp(self):
+        # v4 is a draft, v1 the first release of the repository
+        self.client = FakeReleasesClient([release("v5"), release("v4", draft=True), release("v3"), release("v2"), release("v1")])
+        patcher = patch.object(gh_release_update_issues, "get_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _tags(self, from_tag, to_tag):
+        return [url.rsplit("/", 1)[1] for _, url, _ in gh_fetch_releases_between("owner/repo", from_tag, to_tag)]
+
+    def test_releases_between(self):
+        """Test releases from the older tag to the newer one are returned oldest first, without drafts"""
+        self.assertEqual(self._tags("v2", "v5"), ["v2", "v3", "v5"])
+        self.assertEqual(self.client.read, 4)
+
+    def test_first_release(self):
+        """Test a range starting at the first release of the repository"""
+        self.assertEqual(self._tags("v1", "v3"), ["v1", "v2", "v3"])
+
+    def test_single_release(self):
+        """Test a range of a single release"""
+        self.assertEqual(gh_fetch_releases_between("owner/repo", "v3", "v3"),
+                         [("Release v3", "https://github.com/owner/repo/releases/tag/v3", "* https://github.com/owner/repo/pull/3")])
+
+    def test_missing_tags(self):
+        """Test a missing tag, or a draft one, fails after reading the whole list"""
+        for from_tag, to_tag, missing in (("v0", "v3", "v0"), ("v1", "v6", "v6"), ("v4", "v5", "v4")):
+            with self.subTest(from_tag=from_tag, to_tag=to_tag):
+                with self.assertRaisesRegex(ValueError, f"Release not found: {missing}"):
+                    gh_fetch_releases_between("owner/repo", from_tag, to_tag)
+
+    def test_reversed_range(self):
+        """Test a range whose tags are reversed is rejected"""
+        with self.assertRaisesRegex(ValueError, "Release v3 is newer than release v2"):
+            gh_fetch_releases_between("owner/repo", "v3", "v2")
+
+    def test_map_issues_to_releases(self):
+        """Test each issue lists the releases of its linked PRs, oldest first, with only its own PRs"""
+        releases = [
+            ReleasePRs("v1", "url/v1", [1, 2]),
+            ReleasePRs("v2", "url/v2", []),
+            ReleasePRs("v3", "url/v3", [3, 4]),
+        ]
+        pr_issues_map = {1: [10], 2: [10, 20], 3: [20], 4: []}
+
+        self.assertEqual(map_issues_to_releases(releases, pr_issues_map), {
+            10: [ReleasePRs("v1", "url/v1", [1, 2])],
+            20: [ReleasePRs("v1", "url/v1", [2]), ReleasePRs("v3", "url/v3", [3])],
+        })
+
+    def test_map_issues_to_releases_empty(self):
+        """Test releases without PRs, or PRs without linked issues, map no issue"""
+        self.assertEqual(map_issues_to_releases([], {}), {})
+        self.assertEqual(map_issues_to_releases([ReleasePRs("v1", "url/v1", []), ReleasePRs("v2", "url/v2", [1])], {}), {})
+
+
+class TestCommentedReleases(unittest.TestCase):
+    def setUp(self):
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+        self.addCleanup(self.stdout_patcher.stop)
+
+    def _fetch(self, issue_comments, issue_releases):
+        client = FakeGraphQLClient(issue_comments)
+        with patch.object(gh_release_update_issues, "get_client", return_value=client):
+            return gh_fetch_commented_releases("owner", "repo", issue_releases), client.requests
+
+    def test_is_release_comment(self):
+        """Test only comments posted with the same token and linking the release are release comments"""
+        self.assertTrue(is_release_comment(release_comment(RELEASE_URL), RELEASE_URL))
+        self.assertFalse(is_release_comment(release_comment(RELEASE_URL), OTHER_RELEASE_URL))
+        self.assertFalse(is_release_comment(release_comment(RELEASE_URL, by_viewer=False), RELEASE_URL))
+        self.assertFalse(is_release_comment(comment(f"> :shipit: released in [v1]({RELEASE_URL})"), RELEASE_URL))
+
+    def test_comments_quoted_by_other_authors_are_ignored(self):
+        """Test a release comment posted by someone else does not count as commented"""
+        commented, _ = self._fetch({1: [release_comment(RELEASE_URL, by_viewer=False)]}, {1: [RELEASE_URL]})
+
+        self.assertEqual(commented, {1: set()})
+
+    def test_comments_are_paged_backwards(self):
+        """Test issues with more comments than a page are fetched again from their cursor until the release is found"""
+        issue_comments = {
+            1: [release_comment(RELEASE_URL)] + [comment(f"Comment {i}") for i in range(249)],
+            2: [comment(f"Comment {i}") for i in range(150)],
+        }
+
+        commented, requests = self._fetch(issue_comments, {1: [RELEASE_URL], 2: [RELEASE_URL]})
+
+        self.assertEqual(commented, {1: {RELEASE_URL}, 2: set()})
+        self.assertEqual([request for request in requests if request[0] == 1], [(1, None), (1, "150"), (1, "50")])
+        self.assertEqual([request for request in requests if request[0] == 2], [(2, None), (2, "50")])
+
+    def test_paging_stops_once_every_release_is_found(self):
+        """Test older comments are not fetched once every release of an issue is found"""
+        issue_comments = {1: [comment(f"Comment {i}") for i in range(150)] + [release_comment(RELEASE_URL), release_comment(OTHER_RELEASE_URL)]}
+
+        commented, requests = self._fetch(issue_comments, {1: [RELEASE_URL, OTHER_RELEASE_URL]})
+
+        self.assertEqual(commented, {1: {RELEASE_URL, OTHER_RELEASE_URL}})
+        self.assertEqual(requests, [(1, None)])
+
+    def test_missing_issue(self):
+        """Test an issue that cannot be resolved is reported as not commented"""
+        client = FakeGraphQLClient({})
+        client.graphql = lambda query, variables: {"repository": {"issue_1": None}}
+
+        with patch.object(gh_release_update_issues, "get_client", return_value=client):
+            self.assertEqual(gh_fetch_commented_releases("owner", "repo", {1: [RELEASE_URL]}), {1: set()})
+
+    def test_find_commented_releases_checks_state_first(self):
+        """Test releases recorded in the state are not looked up, and issues fully recorded are not fetched"""
+        state = CommentState()
+        state.mark_commented([RELEASE_URL], 1)
+        state.mark_commented([RELEASE_URL, OTHER_RELEASE_URL], 2)
+        issue_releases = {
+            1: [ReleasePRs("v1.0.0", RELEASE_URL, [10]), ReleasePRs("v1.1.0", OTHER_RELEASE_URL, [11])],
+            2: [ReleasePRs("v1.0.0", RELEASE_URL, [10]), ReleasePRs("v1.1.0", OTHER_RELEASE_URL, [11])],
+        }
+        client = FakeGraphQLClient({1: [release_comment(OTHER_RELEASE_URL)]})
+
+        with patch.object(gh_release_update_issues, "get_client", return_value=client):
+            commented = find_commented_releases("owner", "repo", issue_releases, state)
+
+        self.assertEqual(commented, {1: {RELEASE_URL, OTHER_RELEASE_URL}, 2: {RELEASE_URL, OTHER_RELEASE_URL}})
+        self.assertEqual(client.requests, [(1, None)])
+
+
+class TestCommentIssues(unittest.TestCase):
+    def setUp(self):
+        self.issue_releases = {1: [ReleasePRs("v1.0.0", RELEASE_URL, [10])]}
+        self.state = CommentState()
+
+        # Suppress stdout and retry without waiting
+        for patcher in (patch('sys.stdout', new=io.StringIO()), patch.object(gh_release_update_issues, "COMMENT_RETRY_SECONDS", 0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _comment(self, client):
+        with patch.object(gh_release_update_issues, "get_client", return_value=client):
+            return comment_issues("owner/repo", self.issue_releases, dry_run=False, state=self.state)
+
+    def test_comment(self):
+        """Test an issue is commented once and recorded in the state"""
+        client = FakeGraphQLClient()
+
+        self.assertEqual(self._comment(client), {1: "commented"})
+        self.assertEqual(client.posts, [1])
+        self.assertTrue(self.state.is_commented(RELEASE_URL, 1))
+
+    def test_comment_posted_despite_server_error_is_not_posted_again(self):
+        """Test a comment answered with a 502 after being posted is found in the issue comments instead of posted again"""
+        client = FakeGraphQLClient(post_failures=[(502, True)])
+
+        self.assertEqual(self._comment(client), {1: "commented"})
+        self.assertEqual(client.posts, [1])
+        self.assertEqual(client.requests, [(1, None)])
+        self.assertEqual(len(client.issue_comments[1]), 1)
+        self.assertTrue(self.state.is_commented(RELEASE_URL, 1))
+
+    def test_missing_comment_is_posted_again(self):
+        """Test a comment that failed with a server or connection error, and is missing, is posted again"""
+        client = FakeGraphQLClient(post_failures=[(502, False), (None, False)])
+
+        self.assertEqual(self._comment(client), {1: "commented"})
+        self.assertEqual(client.posts, [1, 1, 1])
+        self.assertEqual(len(client.issue_comments[1]), 1)
+
+    def test_comment_fails_after_retries(self):
+        """Test a comment failing on every attempt is reported as failed and not recorded"""
+        client = FakeGraphQLClient(post_failures=[(502, False)] * 3)
+
+        self.assertTrue(self._comment(client)[1].startswith("failed: POST"))
+        self.assertEqual(client.posts, [1] * (gh_release_update_issues.COMMENT_RETRIES + 1))
+        self.assertFalse(self.state.is_commented(RELEASE_URL, 1))
+
+    def test_client_error_is_not_retried(self):
+        """Test a comment rejected by GitHub is not checked nor posted again"""
+        client = FakeGraphQLClient(post_failures=[(422, False)])
+
+        self.assertTrue(self._comment(client)[1].startswith("failed:"))
+        self.assertEqual(client.posts, [1])
+        self.assertEqual(client.requests, [])
+
+
+class TestGraphQLBatching(unittest.TestCase):
+    def setUp(self):
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+        self.addCleanup(self.stdout_patcher.stop)
+
+    def _patch_client(self, client):
+        patcher = patch.object(gh_release_update_issues, "get_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_follow_node_cost(self):
+        """Test fragments are split into chunks whose estimated node count stays under GRAPHQL_MAX_NODES"""
+        client = FakeGraphQLClient(pr_issues={number: [number] for number in range(25)})
+        self._patch_client(client)
+        fragments = {f'pr_{number}': 'pullRequest(number: %d) { closingIssuesReferences(first: 1) { nodes { number } } }' % number
+                     for number in range(25)}
+
+        with patch.object(gh_release_update_issues, "GRAPHQL_MAX_NODES", 1000):
+            results = gh_graphql_batched("owner", "repo", fragments, 100)
+
+        self.assertEqual(sorted(client.query_sizes), [5, 10, 10])
+        self.assertEqual(results["pr_24"]["closingIssuesReferences"]["nodes"], [{"number": 24}])
+        self.assertEqual(set(results), set(fragments))
+
+    def test_oversized_chunk_is_split(self):
+        """Test a chunk rejected as too large is split in halves and the smaller size is used afterwards"""
+        client = FakeGraphQLClient(pr_issues={number: [number] for number in range(25)}, max_fields=5)
+        self._patch_client(client)
+        fragments = {f'pr_{number}': 'pullRequest(number: %d) { closingIssuesReferences(first: 1) { nodes { number } } }' % number
+                     for number in range(25)}
+
+        with patch.object(gh_release_update_issues, "GRAPHQL_MAX_NODES", 1000), \
+                patch.object(gh_release_update_issues, "GRAPHQL_WORKERS", 1):
+            results = gh_graphql_batched("owner", "repo", fragments, 100)
+
+        self.assertEqual(client.query_sizes, [10, 5, 5, 5, 5, 5])
+        self.assertEqual({alias: data["closingIssuesReferences"]["nodes"] for alias, data in results.items()},
+                         {f'pr_{number}': [{"number": number}] for number in range(25)})
+        self.assertIn("::notice::GraphQL request for 10 fields too large, splitting it", sys.stdout.getvalue())
+
+    def test_other_errors_are_raised(self):
+        """Test errors unrelated to the query size, or of a single field, are raised without splitting"""
+        fragments = {f'pr_{number}': 'pullRequest(number: %d) { title }' % number for number in range(4)}
+        for client, chunk in (
+            (FakeGraphQLClient(error=GitHubApiError("Bad credentials", 401)), fragments),
+            (FakeGraphQLClient(max_fields=0), {'pr_1': fragments['pr_1']}),
+        ):
+            with self.subTest(chunk=list(chunk)), patch.object(gh_release_update_issues, "get_client", return_value=client):
+                with self.assertRaises(GitHubApiError):
+                    gh_graphql_batched("owner", "repo", chunk, 1)
+                self.assertEqual(client.query_sizes, [len(chunk)])
+
+    def test_linked_issues_are_paged(self):
+        """Test PRs with more linked issues than a page are fetched again from their cursor until complete"""
+        client = FakeGraphQLClient(pr_issues={1: list(range(1000, 1250)), 2: [2000], 3: []})
+        self._patch_client(client)
+
+        self.assertEqual(gh_fetch_linked_issues_batched("owner", "repo", [1, 2, 3]),
+                         {1: list(range(1000, 1250)), 2: [2000], 3: []})
+        self.assertEqual(sorted(client.requests, key=lambda request: (request[0], int(request[1] or 0))),
+                         [(1, None), (1, "100"), (1, "200"), (2, None), (3, None)])
+
+
+class TestCommentState(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.file_path = os.path.join(self.directory, "state.json")
+
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+        self.addCleanup(self.stdout_patcher.stop)
+
+    def test_state_is_saved_and_resumed(self):
+        """Test commented issues are saved after every comment and loaded by the next run"""
+        state = CommentState(self.file_path)
+        state.mark_commented([RELEASE_URL, OTHER_RELEASE_URL], 1)
+        state.mark_commented([RELEASE_URL], 2)
+
+        with open(self.file_path) as f:
+            self.assertEqual(json.load(f), {"commented": {RELEASE_URL: [1, 2], OTHER_RELEASE_URL: [1]}})
+        self.assertEqual(os.listdir(self.directory), ["state.json"])
+
+        resumed = CommentState(self.file_path)
+        self.assertTrue(resumed.is_commented(RELEASE_URL, 2))
+        self.assertTrue(resumed.is_commented(OTHER_RELEASE_URL, 1))
+        self.assertFalse(resumed.is_commented(OTHER_RELEASE_URL, 2))
+
+    def test_state_without_file(self):
+        """Test the state is only kept in memory without a file path"""
+        state = CommentState()
+        state.mark_commented([RELEASE_URL], 1)
+
+        self.assertTrue(state.is_commented(RELEASE_URL, 1))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_missing_file_starts_empty(self):
+        """Test a state file that does not exist yet starts an empty state"""
+        self.assertFalse(CommentState(self.file_path).is_commented(RELEASE_URL, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
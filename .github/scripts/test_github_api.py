@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import io
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import github_api
+from github_api import GitHubApiError, GitHubClient
+
+
+class BadGatewayHandler(BaseHTTPRequestHandler):
+    """Answers every request with a 502, counting the requests per method."""
+
+    def _respond(self):
+        self.server.requests.append(self.command)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b'{"message": "Bad Gateway"}'
+        self.send_response(502)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_PUT = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NoContentHandler(BaseHTTPRequestHandler):
+    """Answers every request with a 204, counting the requests per method."""
+
+    def _respond(self):
+        self.server.requests.append(self.command)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_DELETE = do_GET = do_POST = do_PUT = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestGitHubApi(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), BadGatewayHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        api_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.client = GitHubClient(api_url=api_url, token="token", repository="owner/repo", retries=2, write_interval=0)
+
+        # Suppress stdout and retry without waiting
+        for patcher in (patch('sys.stdout', new=io.StringIO()), patch.object(github_api, "BACKOFF_BASE_SECONDS", 0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_post_is_not_retried_on_server_error(self):
+        """Test a POST answered with a 502 is sent once, as the server may have processed it"""
+        with self.assertRaises(GitHubApiError) as context:
+            self.client.rest("POST", "repos/owner/repo/issues/1/comments", {"body": "comment"})
+
+        self.assertEqual(context.exception.status, 502)
+        self.assertEqual(self.server.requests, ["POST"])
+        self.assertEqual(self.client.retry_count, 0)
+
+    def test_patch_is_not_retried_on_server_error(self):
+        """Test a PATCH answered with a 502 is sent once"""
+        with self.assertRaises(GitHubApiError):
+            self.client.rest("PATCH", "repos/owner/repo/issues/1", {"state": "closed"})
+
+        self.assertEqual(self.server.requests, ["PATCH"])
+
+    def test_idempotent_requests_are_retried_on_server_error(self):
+        """Test GET and PUT requests answered with a 502 are retried"""
+        for method in ("GET", "PUT"):
+            with self.subTest(method=method):
+                self.server.requests.clear()
+                with self.assertRaises(GitHubApiError):
+                    self.client.rest(method, "repos/owner/repo/issues/1/labels")
+                self.assertEqual(self.server.requests, [method] * 3)
+
+    def test_graphql_query_is_retried_on_server_error(self):
+        """Test a GraphQL query, sent as a POST, is retried"""
+        with self.assertRaises(GitHubApiError):
+            self.client.request("POST", self.client.graphql_url, {"query": "{ viewer { login } }"}, query=True)
+
+        self.assertEqual(self.server.requests, ["POST"] * 3)
+
+
+class TestWritePacing(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), NoContentHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        api_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.client = GitHubClient(api_url=api_url, token="token", repository="owner/repo", write_interval=60)
+
+    def test_idempotent_writes_are_not_paced(self):
+        """Test PUT and DELETE requests do not wait for, nor take, a write slot"""
+        start = time.monotonic()
+        for method in ("POST", "PUT", "DELETE", "PUT", "DELETE", "GET"):
+            if method == "POST":
+                self.client.rest(method, "repos/owner/repo/issues/1/comments", {"body": "comment"})
+            else:
+                self.client.rest(method, "repos/owner/repo/issues/1/labels/bug")
+
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual(self.server.requests, ["POST", "PUT", "DELETE", "PUT", "DELETE", "GET"])
+
+    def test_content_creating_writes_are_paced(self):
+        """Test a POST takes the next write slot"""
+        self.client.rest("POST", "repos/owner/repo/issues/1/comments", {"body": "comment"})
+
+        self.assertGreater(self.client._next_write_at, time.monotonic() + 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+import http.client
+import io
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from github_api import GitHubClient
+from http_cache import ResponseCache, open_default_cache
+
+URL = "https://api.github.com/repos/owner/repo/pulls/1"
+
+
+def response_headers(**headers):
+    message = http.client.HTTPMessage()
+    for name, value in headers.items():
+        message[name.replace("_", "-")] = value
+    return message
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serves a JSON body with a per-token ETag, answering 304 when the request revalidates it."""
+
+    def do_GET(self):
+        etag = f'"{self.headers["Authorization"]}"'
+        self.server.requests.append((self.headers["Authorization"], self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = b'{"number": 1}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache = ResponseCache(self.directory)
+
+    def test_key_depends_on_credentials(self):
+        """Test a different token never maps to another token's entry"""
+        key = ResponseCache.key("GET", URL, "token-a")
+        self.cache.put(key, 200, response_headers(ETag='"a"'), b"body")
+
+        self.assertIsNotNone(self.cache.get(key))
+        self.assertNotEqual(ResponseCache.key("GET", URL, "token-b"), key)
+        self.assertIsNone(self.cache.get(ResponseCache.key("GET", URL, "token-b")))
+        self.assertIsNone(self.cache.get(ResponseCache.key("GET", URL)))
+
+    def test_entries_do_not_contain_credentials_or_url(self):
+        """Test neither the token nor the URL are written to disk"""
+        key = ResponseCache.key("GET", URL, "secret-token")
+        self.cache.put(key, 200, response_headers(ETag='"a"', Authorization="Bearer secret-token"), b"body")
+
+        for name in os.listdir(self.directory):
+            self.assertNotIn("secret-token", name)
+            with open(os.path.join(self.directory, name), "rb") as f:
+                content = f.read()
+            self.assertNotIn(b"secret-token", content)
+            self.assertNotIn(URL.encode(), content)
+
+    def test_expired_entry_is_not_served(self):
+        """Test entries older than the TTL are neither served nor kept by eviction"""
+        cache = ResponseCache(self.directory, ttl=60)
+        key = ResponseCache.key("GET", URL, "token")
+        cache.put(key, 200, response_headers(ETag='"a"'), b"body")
+        expired = time.time() - 120
+        os.utime(os.path.join(self.directory, key), (expired, expired))
+
+        self.assertIsNone(cache.get(key))
+        cache.evict()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_touch_restarts_ttl(self):
+        """Test a revalidated entry is served again"""
+        cache = ResponseCache(self.directory, ttl=60)
+        key = ResponseCache.key("GET", URL, "token")
+        cache.put(key, 200, response_headers(ETag='"a"'), b"body")
+        expired = time.time() - 120
+        os.utime(os.path.join(self.directory, key), (expired, expired))
+
+        cache.touch(key)
+        self.assertEqual(cache.get(key).body, b"body")
+
+    def test_response_without_validator_is_not_stored(self):
+        """Test responses that cannot be revalidated are not cached"""
+        key = ResponseCache.key("GET", URL, "token")
+        self.cache.put(key, 200, response_headers(Content_Type="application/json"), b"body")
+
+        self.assertIsNone(self.cache.get(key))
+
+    def test_validators(self):
+        """Test stored validators become conditional request headers"""
+        key = ResponseCache.key("GET", URL, "token")
+        self.cache.put(key, 200, response_headers(ETag='"a"', Last_Modified="Sat, 17 Oct 2026 00:00:00 GMT"), b"body")
+
+        self.assertEqual(self.cache.get(key).validators,
+                         {"If-None-Match": '"a"', "If-Modified-Since": "Sat, 17 Oct 2026 00:00:00 GMT"})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test the least recently used entries are evicted when the cache grows over its size limit"""
+        cache = ResponseCache(self.directory, max_bytes=2500)
+        keys = [ResponseCache.key("GET", f"{URL}/{index}", "token") for index in range(3)]
+        for index, key in enumerate(keys[:2]):
+            cache.put(key, 200, response_headers(ETag=f'"{index}"'), b"x" * 1000)
+            mtime = time.time() - 100 + index
+            os.utime(os.path.join(self.directory, key), (mtime, mtime))
+        cache.touch(keys[0])
+        cache.put(keys[2], 200, response_headers(ETag='"2"'), b"x" * 1000)
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+    @unittest.skipIf(os.name != "posix", "file modes are POSIX only")
+    def test_entries_are_private(self):
+        """Test cache entries are only readable by their owner"""
+        key = ResponseCache.key("GET", URL, "token")
+        self.cache.put(key, 200, response_headers(ETag='"a"'), b"body")
+
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.directory, key)).st_mode), 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(self.directory).st_mode) & 0o077, 0)
+
+    def test_default_cache_is_opt_in(self):
+        """Test the default cache is only opened when HTTP_CACHE_DIR is set"""
+        with patch.dict(os.environ, clear=True):
+            self.assertIsNone(open_default_cache())
+        with patch.dict(os.environ, {"HTTP_CACHE_DIR": ""}):
+            self.assertIsNone(open_default_cache())
+        with patch.dict(os.environ, {"HTTP_CACHE_DIR": self.directory}):
+            self.assertEqual(open_default_cache().directory, self.directory)
+
+
+class TestClientCache(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}"
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(directory.name)
+
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+        self.addCleanup(self.stdout_patcher.stop)
+
+    def _client(self, token):
+        return GitHubClient(api_url=self.api_url, token=token, repository="owner/repo", cache=self.cache)
+
+    def test_not_modified_response_is_served_from_cache(self):
+        """Test a repeated GET is revalidated and its 304 answer served from the stored body"""
+        client = self._client("token-a")
+
+        self.assertEqual(client.rest("GET", "repos/owner/repo/pulls/1"), {"number": 1})
+        self.assertEqual(client.rest("GET", "repos/owner/repo/pulls/1"), {"number": 1})
+        self.assertEqual(self.server.requests, [("Bearer token-a", None), ("Bearer token-a", '"Bearer token-a"')])
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_other_token_does_not_use_cached_entry(self):
+        """Test a client with another token does not revalidate or receive the first token's entry"""
+        self._client("token-a").rest("GET", "repos/owner/repo/pulls/1")
+        self._client("token-b").rest("GET", "repos/owner/repo/pulls/1")
+
+        self.assertEqual(self.server.requests, [("Bearer token-a", None), ("Bearer token-b", None)])
+        self.assertEqual(self.cache.hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+import importlib.util
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import github_api
+from github_api import GitHubClient
+
+# label-pr.py is not an importable module name
+_spec = importlib.util.spec_from_file_location("label_pr", os.path.join(os.path.dirname(__file__), "label-pr.py"))
+label_pr = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(label_pr)
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "../label-pr.json")
+PR_FILES = re.compile(r'(\w+): pullRequest\(number: (\d+)\) \{ title labels\(first: \d+\) \{ nodes \{ name \} \} files\(first: (\d+)(?:, after: "([^"]*)")?\)')
+
+
+class PullRequestsHandler(BaseHTTPRequestHandler):
+    """Serves the pull requests of `server.prs` to the GraphQL queries of label-pr.py and records label updates.
+
+    File cursors are file offsets. Label updates of the PRs in `server.failing_prs` are answered with a 502.
+    """
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/graphql":
+            fields = {}
+            for alias, number, first, after in PR_FILES.findall(body["query"]):
+                self.server.requests.append(("graphql", int(number), after or None))
+                pr = self.server.prs.get(int(number))
+                if pr is None:
+                    fields[alias] = None
+                    continue
+                start = int(after) if after else 0
+                end = start + int(first)
+                fields[alias] = {
+                    "title": pr["title"],
+                    "labels": {"nodes": [{"name": label} for label in pr["labels"]]},
+                    "files": {"pageInfo": {"hasNextPage": end < len(pr["files"]), "endCursor": str(end)},
+                              "nodes": [{"path": path} for path in pr["files"][start:end]]},
+                }
+            self._send_json(200, {"data": {"repository": fields}})
+            return
+        self._update_labels(("POST", body["labels"]))
+
+    def do_DELETE(self):
+        self._update_labels(("DELETE", self.path.rsplit("/", 1)[1]))
+
+    def _update_labels(self, update):
+        pr_number = int(self.path.split("/")[5])
+        self.server.requests.append((pr_number, *update))
+        if pr_number in self.server.failing_prs:
+            self._send_json(502, {"message": "Bad Gateway"})
+        else:
+            self._send_json(200, [])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestLabelPr(unittest.TestCase):
+    def setUp(self):
+        with open(CONFIG_FILE) as f:
+            self.config = json.load(f)
+
+        # Suppress stdout
+        self.stdout_patcher = patch('sys.stdout', new=io.StringIO())
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+
+    def test_path_matcher(self):
+        """Test files are labeled for every label with a pattern that is a prefix of their path"""
+        path_patterns = self.config["path_patterns"]
+        expected_labels = {
+            "app/src/main/AndroidManifest.xml": ["app:password-manager"],
+            "authenticator/build.gradle.kts": ["app:authenticator"],
+            "authenticatorbridge/src/main/Foo.kt": ["app:authenticator", "app:password-manager"],
+            "core/src/main/Bar.kt": ["app:authenticator", "app:password-manager"],
+            "gradle/libs.versions.toml": ["app:authenticator", "app:password-manager"],
+            "cxf/README.md": ["app:password-manager"],
+            "testharness/src/Baz.kt": ["app:password-manager"],
+            "README.md": [],
+            ".github/workflows/build.yml": [],
+            "application/foo": [],
+            "src/app/foo": [],
+            "": [],
+        }
+        for file, labels in expected_labels.items():
+            with self.subTest(file=file):
+                self.assertEqual(sorted(label_pr.label_filepaths([file], path_patterns)), labels)
+
+        # Labels do not depend on the order of the changed files
+        for files, labels in ((list(expected_labels), ["app:authenticator", "app:password-manager"]),
+                              (["README.md", "app/Foo.kt", "cxf/README.md", "testharness/src/Baz.kt"], ["app:password-manager"])):
+            for i in range(len(files)):
+                with self.subTest(files=files[i:] + files[:i]):
+                    self.assertEqual(sorted(label_pr.label_filepaths(files[i:] + files[:i], path_patterns)), labels)
+
+    def test_path_matcher_overlapping_patterns(self):
+        """Test a path matches every label with a pattern that is a prefix of it"""
+        path_patterns = {"short": ["ap"], "app": ["app/"], "src": ["app/src/", "app/src/main/"], "other": ["app/test/"]}
+        matcher = label_pr.PathMatcher(path_patterns)
+
+        self.assertEqual(sorted(matcher.match("app/src/main/Foo.kt")), ["app", "short", "src", "src"])
+        self.assertEqual(sorted(matcher.match("app/")), ["app", "short"])
+        self.assertEqual(matcher.match("ap"), ["short"])
+        for file, labels in (("app/src/main/Foo.kt", ["app", "short", "src"]), ("app/test/Foo.kt", ["app", "other", "short"]),
+                             ("apple", ["short"]), ("b", [])):
+            with self.subTest(file=file):
+                self.assertEqual(sorted(label_pr.label_filepaths([file], path_patterns)), labels)
+
+    def test_path_matcher_multiple_labels_per_path(self):
+        """Test a pattern listed under several labels, and the app:shared expansion"""
+        path_patterns = {"app:shared": ["core/"], "app:password-manager": ["app/"], "app:authenticator": ["core/"]}
+        matcher = label_pr.PathMatcher(path_patterns)
+
+        self.assertEqual(matcher.match("core/Foo.kt"), ["app:shared", "app:authenticator"])
+        self.assertEqual(sorted(label_pr.label_filepaths(["core/Foo.kt"], path_patterns)), ["app:authenticator", "app:password-manager"])
+
+    def test_path_matcher_no_match(self):
+        """Test paths matching no pattern produce no labels"""
+        path_patterns = self.config["path_patterns"]
+
+        self.assertEqual(label_pr.PathMatcher(path_patterns).match("docs/README.md"), [])
+        self.assertEqual(label_pr.label_filepaths(["docs/README.md", "Core/Foo.kt", "/app/Foo.kt"], path_patterns), [])
+        self.assertEqual(label_pr.label_filepaths([], path_patterns), [])
+
+    def test_path_matcher_stops_when_every_label_matches(self):
+        """Test the changed files are only consumed until every label is matched"""
+        path_patterns = {"app": ["app/"], "core": ["core/"]}
+        files = iter(["app/Foo.kt", "core/Foo.kt", "unread/Foo.kt"])
+
+        self.assertEqual(label_pr.PathMatcher(path_patterns).match_files(files), {"app": "app/Foo.kt", "core": "core/Foo.kt"})
+        self.assertEqual(list(files), ["unread/Foo.kt"])
+
+    def test_title_matcher(self):
+        """Test titles are labeled for every pattern followed by `:` or `(`, anywhere in the title and in any case"""
+        title_patterns = self.config["title_patterns"]
+        expected_labels = {
+            "feat: New feature": ["t:feature"],
+            "Feat(autofill): New feature": ["t:feature"],
+            "fix: Crash": ["t:bug"],
+            "chore(ci): Bump runner": ["t:ci", "t:tech-debt"],
+            "chore(deps): Bump library": ["t:tech-debt"],
+            "chore: Cleanup": ["t:tech-debt"],
+            "ci: Update workflow": ["t:ci"],
+            "[PM-1234] refactor: Simplify": ["t:tech-debt"],
+            "revert: \"feat: New feature\"": ["t:feature", "t:tech-debt"],
+            "feature!: Breaking change": [],
+            "breaking-change: Remove API": ["t:breaking-change"],
+            "docs:": ["t:docs"],
+            "Update README": [],
+            "prefix:": ["t:bug"],
+            "fixture(test): Something": [],
+            "bugfix: perf: docs(x) llm:": ["t:bug", "t:docs", "t:llm", "t:tech-debt"],
+            "": [],
+            ":(": [],
+        }
+        for title, labels in expected_labels.items():
+            with self.subTest(title=title):
+                self.assertEqual(sorted(label_pr.label_title(title, title_patterns)), labels)
+        self.assertEqual([sorted(labels) for labels in label_pr.label_titles(expected_labels, title_patterns)],
+                         list(expected_labels.values()))
+
+    def test_title_matcher_pattern_case(self):
+        """Test patterns are compared as written with the lowercased title, so uppercase patterns never match"""
+        title_patterns = {"t:feature": ["Feat"], "t:bug": ["fix"]}
+
+        for title in ("Feat: New feature", "feat: New feature", "FEAT: New feature"):
+            with self.subTest(title=title):
+                self.assertEqual(label_pr.label_title(title, title_patterns), [])
+        self.assertEqual(label_pr.label_title("FIX: Crash", title_patterns), ["t:bug"])
+
+    def test_title_matcher_overlapping_patterns(self):
+        """Test `chore(` and `chore(ci):` both match, and the first matching pattern of each label is reported"""
+        title_patterns = self.config["title_patterns"]
+        matcher = label_pr.TitleMatcher(title_patterns)
+
+        self.assertEqual(matcher.match("chore(ci): Bump runner"), [("t:tech-debt", "chore"), ("t:ci", "chore(ci)")])
+        self.assertIn(("t:ci", "chore(ci)"), matcher.find("chore(ci): Bump runner"))
+        self.assertEqual(set(label_pr.label_title("chore(ci): Bump runner", title_patterns)), {"t:tech-debt", "t:ci"})
+
+    def test_title_matcher_patterns_without_delimiter(self):
+        """Test patterns only match when followed by `:` or `(`, anywhere in the title"""
+        title_patterns = {"t:feature": ["feat"], "t:bug": ["fix"], "t:ci": ["chore(ci)"]}
+
+        for title in ("feat New feature", "feature: New feature", "Fix crash", "chore(ci) Bump runner", "feat"):
+            with self.subTest(title=title):
+                self.assertEqual(label_pr.label_title(title, title_patterns), [])
+        self.assertEqual(label_pr.label_title("Update: prefix(fix): Crash", title_patterns), ["t:bug"])
+        self.assertEqual(label_pr.label_title("chore(ci)(scope): Bump runner", title_patterns), ["t:ci"])
+
+    def test_reconcile_labels_add_mode(self):
+        """Test add mode only adds the missing labels and never removes any"""
+        self.assertEqual(label_pr.reconcile_labels(["t:bug", "app:authenticator"], {"t:feature", "app:authenticator"}, "add"),
+                         (["t:feature"], []))
+
+    def test_reconcile_labels_replace_mode(self):
+        """Test replace mode adds the missing labels and removes the ones no longer computed"""
+        self.assertEqual(label_pr.reconcile_labels(["t:bug", "app:authenticator", "hold"], {"t:feature", "app:authenticator", "hold"}, "replace"),
+                         (["t:feature"], ["t:bug"]))
+
+    def test_reconcile_labels_up_to_date(self):
+        """Test both lists are empty when the PR already has the computed labels"""
+        self.assertEqual(label_pr.reconcile_labels(["t:bug", "hold"], {"t:bug"}, "add"), ([], []))
+        self.assertEqual(label_pr.reconcile_labels(["t:bug", "hold"], {"t:bug", "hold"}, "replace"), ([], []))
+
+    def _run_main(self, pr_labels, *args, changed_files=("app/Foo.kt",), title="fix: Crash"):
+        argv = ["label-pr.py", "1234", json.dumps([{"name": label} for label in pr_labels]), "--title", title, "--config", CONFIG_FILE, *args]
+        with patch.object(sys, "argv", argv), \
+                patch.object(label_pr, "iter_changed_files", lambda *_: (file for file in changed_files)), \
+                patch.object(label_pr, "gh_edit_labels") as gh_edit_labels:
+            label_pr.main()
+        return gh_edit_labels
+
+    def test_main_skips_update_when_labels_up_to_date(self):
+        """Test no API call is made when the PR labels already match"""
+        gh_edit_labels = self._run_main(["t:bug", "app:password-manager"], "--replace")
+
+        gh_edit_labels.assert_not_called()
+        self.assertIn("already up to date", sys.stdout.getvalue())
+
+    def test_main_replace_preserves_unmanaged_labels(self):
+        """Test replace mode removes stale app: and t: labels but keeps the other labels"""
+        gh_edit_labels = self._run_main(["t:feature", "app:authenticator", "hold", "automated-pr"], "--replace")
+
+        gh_edit_labels.assert_called_once_with("1234", ["app:password-manager", "t:bug"], ["app:authenticator", "t:feature"])
+
+    def test_main_add_keeps_existing_labels(self):
+        """Test add mode only adds the missing labels"""
+        gh_edit_labels = self._run_main(["t:feature", "hold"])
+
+        gh_edit_labels.assert_called_once_with("1234", ["app:password-manager", "t:bug"], [])
+
+    def _git_repository(self):
+        """Create a repository where `feature` renames and edits a file and adds another, while `main` moves on."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = {**os.environ, "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+               "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+
+        def git(*args):
+            subprocess.run(["git", *args], cwd=directory.name, env=env, check=True, capture_output=True)
+
+        def write(path, content):
+            os.makedirs(os.path.join(directory.name, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(directory.name, path), "w") as f:
+                f.write(content)
+
+        git("init", "-q", "-b", "main")
+        write("app/Foo.kt", "class Foo {\n" + "    val x = 1\n" * 20 + "}\n")
+        write("core/Bar.kt", "class Bar\n")
+        git("add", "-A")
+        git("commit", "-q", "-m", "Initial commit")
+        git("checkout", "-q", "-b", "feature")
+        os.remove(os.path.join(directory.name, "app/Foo.kt"))
+        write("authenticator/Foo.kt", "class Foo {\n" + "    val x = 1\n" * 20 + "    val y = 2\n}\n")
+        write("core/Baz.kt", "class Baz\n")
+        git("add", "-A")
+        git("commit", "-q", "-m", "Rename Foo")
+        git("checkout", "-q", "main")
+        write("docs/README.md", "Docs\n")
+        git("add", "-A")
+        git("commit", "-q", "-m", "Add docs")
+
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+        return directory.name
+
+    def test_git_merge_base(self):
+        """Test the merge base of two local refs is found, and missing refs give None"""
+        self._git_repository()
+        initial_commit = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], capture_output=True, text=True).stdout.strip()
+
+        self.assertEqual(label_pr.git_get_merge_base("main", "feature"), initial_commit)
+        self.assertIsNone(label_pr.git_get_merge_base("main", "missing"))
+
+    def test_iter_changed_files_from_git(self):
+        """Test changed files come from the merge-base diff, listing both paths of a renamed and edited file"""
+        self._git_repository()
+
+        with patch.object(label_pr, "gh_iter_changed_files") as gh_iter_changed_files:
+            changed_files = sorted(label_pr.iter_changed_files("1234", "main", "feature"))
+
+        gh_iter_changed_files.assert_not_called()
+        self.assertEqual(changed_files, ["app/Foo.kt", "authenticator/Foo.kt", "core/Baz.kt"])
+
+    def test_iter_changed_files_falls_back_to_api(self):
+        """Test changed files are listed with the GitHub API when a ref is missing or not given"""
+        self._git_repository()
+
+        for base_ref, head_ref in (("main", "missing"), (None, None)):
+            with self.subTest(base_ref=base_ref, head_ref=head_ref), \
+                    patch.object(label_pr, "gh_iter_changed_files", return_value=iter(["app/Foo.kt"])) as gh_iter_changed_files:
+                self.assertEqual(list(label_pr.iter_changed_files("1234", base_ref, head_ref)), ["app/Foo.kt"])
+                gh_iter_changed_files.assert_called_once_with("1234")
+
+    def test_iter_command_lines_with_large_stderr(self):
+        """Test a command writing more than a pipe buffer to stderr before its output does not block"""
+        command = [sys.executable, "-c", "import sys; sys.stderr.write('x' * 1024 * 1024); print('done')"]
+        lines = []
+        reader = threading.Thread(target=lambda: lines.extend(label_pr.iter_command_lines(command, "Error")), daemon=True)
+        reader.start()
+        reader.join(timeout=30)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(lines, ["done"])
+
+    def test_iter_command_lines_reports_stderr_on_failure(self):
+        """Test a failing command's stderr is reported after its output"""
+        command = [sys.executable, "-c", "import sys; print('partial'); sys.exit('boom')"]
+
+        self.assertEqual(list(label_pr.iter_command_lines(command, "Error running command")), ["partial"])
+        self.assertIn("exited with status 1: boom", sys.stdout.getvalue())
+
+
+class TestBatchLabeling(unittest.TestCase):
+    def setUp(self):
+        with open(CONFIG_FILE) as f:
+            self.config = json.load(f)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PullRequestsHandler)
+        self.server.prs = {}
+        self.server.failing_prs = set()
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        client = GitHubClient(api_url=f"http://127.0.0.1:{self.server.server_port}", token="token", repository="owner/repo",
+                              retries=1, write_interval=0)
+
+        # Suppress stdout and retry without waiting
+        for patcher in (patch('sys.stdout', new=io.StringIO()), patch.object(github_api, "BACKOFF_BASE_SECONDS", 0),
+                        patch.object(label_pr, "get_client", return_value=client)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fetch_prs_pages_files_across_batches(self):
+        """Test PRs are fetched in batches and PRs with many files are fetched again from their cursor until complete"""
+        self.server.prs = {
+            1: {"title": "feat: One", "labels": ["hold"], "files": [f"app/File{i}.kt" for i in range(250)]},
+            2: {"title": "fix: Two", "labels": [], "files": ["core/Two.kt"]},
+            3: {"title": "chore: Three", "labels": [], "files": []},
+        }
+
+        with patch.object(label_pr, "GRAPHQL_BATCH_SIZE", 2):
+            prs = label_pr.gh_fetch_prs([1, 2, 3, 4])
+
+        self.assertEqual(prs, {
+            1: {"title": "feat: One", "labels": ["hold"], "files": [f"app/File{i}.kt" for i in range(250)]},
+            2: {"title": "fix: Two", "labels": [], "files": ["core/Two.kt"]},
+            3: {"title": "chore: Three", "labels": [], "files": []},
+        })
+        self.assertEqual(self.server.requests, [
+            ("graphql", 1, None), ("graphql", 2, None),
+            ("graphql", 1, "100"), ("graphql", 3, None),
+            ("graphql", 1, "200"), ("graphql", 4, None),
+        ])
+        self.assertIn("Pull request #4 not found", sys.stdout.getvalue())
+
+    def test_label_prs_batch_partial_failure(self):
+        """Test a failing label update is reported without stopping the updates of the other PRs"""
+        self.server.prs = {
+            1: {"title": "fix: One", "labels": [], "files": ["app/One.kt"]},
+            2: {"title": "fix: Two", "labels": ["t:feature"], "files": ["authenticator/Two.kt"]},
+            3: {"title": "fix: Three", "labels": ["t:bug", "app:password-manager"], "files": ["app/Three.kt"]},
+        }
+        self.server.failing_prs = {1}
+
+        self.assertFalse(label_pr.label_prs_batch([1, 2, 3], self.config, "replace", dry_run=False, workers=2))
+
+        updates = sorted(request for request in self.server.requests if request[0] != "graphql")
+        self.assertEqual(updates, [
+            (1, "POST", ["app:password-manager", "t:bug"]),
+            (2, "DELETE", "t%3Afeature"),
+            (2, "POST", ["app:authenticator", "t:bug"]),
+        ])
+        output = sys.stdout.getvalue()
+        self.assertIn("::error::Error applying labels to #1:", output)
+        self.assertIn("Labeled 1 of 2 pull requests", output)
+
+    def test_label_prs_batch_success(self):
+        """Test a batch without failures reports success"""
+        self.server.prs = {1: {"title": "fix: One", "labels": [], "files": ["app/One.kt"]}}
+
+        self.assertTrue(label_pr.label_prs_batch([1], self.config, "add", dry_run=False))
+        self.assertIn((1, "POST", ["app:password-manager", "t:bug"]), self.server.requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
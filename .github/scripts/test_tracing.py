@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+
+import tracing
+from tracing import Span, _Tracer, format_summary_markdown, report, report_at_exit, span, traced
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tracer = _Tracer()
+        for patcher in (patch.object(tracing, "_tracer", self.tracer), patch.object(tracing, "ENABLED", True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_record_aggregates_by_name(self):
+        """Test spans of the same name are aggregated into counts, durations, bytes and errors"""
+        first = Span("github GET", {"path": "/a"})
+        first.add_bytes(sent=10, received=100)
+        self.tracer.record(first, 1.0, 1.5, error=False)
+        self.tracer.record(Span("github GET", {"path": "/b"}), 2.0, 2.25, error=True)
+        self.tracer.record(Span("git diff"), 3.0, 3.125, error=False)
+
+        self.assertEqual(self.tracer.summary(), [
+            {"name": "github GET", "count": 2, "seconds": 0.75, "mean_seconds": 0.375, "max_seconds": 0.5,
+             "bytes_sent": 10, "bytes_received": 100, "errors": 1},
+            {"name": "git diff", "count": 1, "seconds": 0.125, "mean_seconds": 0.125, "max_seconds": 0.125,
+             "bytes_sent": 0, "bytes_received": 0, "errors": 0},
+        ])
+        self.assertEqual([event["args"] for event in self.tracer.events],
+                         [{"path": "/a", "bytes_sent": 10, "bytes_received": 100}, {"path": "/b", "error": True}, {}])
+
+    def test_span_records_errors(self):
+        """Test a span records the exception leaving it as an error without swallowing it"""
+        with self.assertRaises(ValueError):
+            with span("parse", file="a.json") as s:
+                s.set(size=3)
+                raise ValueError("boom")
+
+        self.assertEqual(self.tracer.summary()[0]["errors"], 1)
+        self.assertEqual(self.tracer.events[0]["args"], {"file": "a.json", "size": 3, "error": True})
+
+    def test_events_over_max_are_dropped(self):
+        """Test spans past MAX_EVENTS are only aggregated, counting the dropped events"""
+        with patch.object(tracing, "MAX_EVENTS", 3):
+            for _ in range(5):
+                with span("step"):
+                    pass
+
+        self.assertEqual(len(self.tracer.events), 3)
+        self.assertEqual(self.tracer.dropped_events, 2)
+        self.assertEqual(self.tracer.summary()[0]["count"], 5)
+        self.assertEqual(report()["dropped_events"], 2)
+
+    def test_summary_markdown_truncates_rows(self):
+        """Test the step summary lists the SUMMARY_ROWS slowest spans and counts the omitted ones"""
+        for index in range(5):
+            self.tracer.record(Span(f"span {index}"), 0.0, index + 1.0, error=False)
+
+        with patch.object(tracing, "SUMMARY_ROWS", 2):
+            markdown = format_summary_markdown(report())
+
+        rows = [line for line in markdown.splitlines() if line.startswith("| `")]
+        self.assertEqual(rows, [
+            "| `span 4` | 1 | 5000.0 | 5000.00 | 5000.0 | 0 | 0 | 0 |",
+            "| `span 3` | 1 | 4000.0 | 4000.00 | 4000.0 | 0 | 0 | 0 |",
+        ])
+        self.assertIn("_3 faster spans omitted, see the JSON trace._", markdown)
+
+    def test_disabled_tracing_is_a_noop(self):
+        """Test span() returns the shared no-op span and @traced the function itself when tracing is disabled"""
+        def parse():
+            return 1
+
+        with patch.object(tracing, "ENABLED", False), patch("atexit.register") as register:
+            with span("step") as s:
+                s.add_bytes(sent=1)
+                s.set(status=200)
+            self.assertIs(s, tracing._NOOP_SPAN)
+            self.assertIs(traced()(parse), parse)
+            report_at_exit()
+
+        register.assert_not_called()
+        self.assertEqual(self.tracer.stats, {})
+        self.assertIsNot(traced()(parse), parse)
+
+    def test_report_at_exit_registers_once(self):
+        """Test the report is registered for the calling process only, however often main() calls it"""
+        with patch.object(tracing, "_report_pid", None), patch("atexit.register") as register:
+            report_at_exit()
+            report_at_exit()
+
+            register.assert_called_once_with(tracing.write_report)
+            self.assertIsNotNone(tracing._report_pid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Requires Python 3.9+
+"""
+Lightweight timing instrumentation for the workflow scripts.
+
+Spans time a block of code with a monotonic clock and are aggregated by name into call counts, total,
+mean and max durations, bytes sent and received, and errors. Nested spans are timed independently,
+so the total of a span includes the spans it contains.
+
+Tracing is disabled unless enabled from the environment. span() then returns a shared no-op span and
+@traced returns the decorated function unchanged, so instrumented code runs at full speed.
+
+When enabled and the script's main() called report_at_exit(), the trace is written when the process exits:
+    - as a JSON file in the Chrome trace event format (open it in https://ui.perfetto.dev), with the
+      aggregated spans under "spans"
+    - as a table of the aggregated spans appended to the GitHub step summary
+
+Configuration (environment, read at import):
+    SCRIPT_TRACE: Set to 1 to enable tracing
+    SCRIPT_TRACE_FILE: Path of the JSON trace to write, enables tracing
+    GITHUB_STEP_SUMMARY: Set by GitHub Actions, the span table is appended to it
+
+Example:
+    from tracing import report_at_exit, span, traced
+
+    @traced()
+    def parse_config(config_file): ...
+
+    def main():
+        report_at_exit()
+        ...
+
+    with span("github GET", path=path) as s:
+        response = send(...)
+        s.add_bytes(sent=len(payload), received=len(response))
+"""
+
+import atexit
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+ENABLED = bool(os.environ.get("SCRIPT_TRACE") or os.environ.get("SCRIPT_TRACE_FILE"))
+# Individual span events kept for the JSON trace, later spans are only aggregated
+MAX_EVENTS = 50000
+# Slowest spans listed in the step summary table
+SUMMARY_ROWS = 30
+
+class _NoopSpan:
+    """Span returned when tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add_bytes(self, sent: int = 0, received: int = 0) -> None:
+        pass
+
+    def set(self, **attrs) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class Span:
+    """A timed block of code, created by span()."""
+    __slots__ = ("name", "attrs", "bytes_sent", "bytes_received", "_start")
+
+    def __init__(self, name: str, attrs: Optional[dict] = None):
+        self.name = name
+        self.attrs = attrs
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _tracer.record(self, self._start, time.perf_counter(), exc_type is not None)
+        return False
+
+    def add_bytes(self, sent: int = 0, received: int = 0) -> None:
+        """Count bytes sent and received during the span."""
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+    def set(self, **attrs) -> None:
+        """Attach attributes to the span event (e.g. a response status)."""
+        self.attrs = {**(self.attrs or {}), **attrs}
+
+class _Tracer:
+    """Aggregates the recorded spans, thread-safe."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.stats: dict[str, list] = {}  # name -> [count, seconds, max seconds, bytes sent, bytes received, errors]
+        self.events: list[dict] = []
+        self.dropped_events = 0
+        self._lock = threading.Lock()
+
+    def record(self, span: Span, start: float, end: float, error: bool) -> None:
+        seconds = end - start
+        with self._lock:
+            stats = self.stats.get(span.name)
+            if stats is None:
+                stats = self.stats[span.name] = [0, 0.0, 0.0, 0, 0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += span.bytes_sent
+            stats[4] += span.bytes_received
+            stats[5] += error
+            if len(self.events) < MAX_EVENTS:
+                args = dict(span.attrs or {})
+                if span.bytes_sent or span.bytes_received:
+                    args.update(bytes_sent=span.bytes_sent, bytes_received=span.bytes_received)
+                if error:
+                    args["error"] = True
+                self.events.append({
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": round((start - self.origin) * 1e6, 1),
+                    "dur": round(seconds * 1e6, 1),
+                    "pid": self.pid,
+                    "tid": threading.get_ident(),
+                    "args": args,
+                })
+            else:
+                self.dropped_events += 1
+
+    def summary(self) -> list[dict]:
+        """Return the aggregated spans, slowest total first."""
+        with self._lock:
+            stats = list(self.stats.items())
+        rows = [
+            {
+                "name": name,
+                "count": count,
+                "seconds": round(seconds, 6),
+                "mean_seconds": round(seconds / count, 6),
+                "max_seconds": round(max_seconds, 6),
+                "bytes_sent": bytes_sent,
+                "bytes_received": bytes_received,
+                "errors": errors,
+            }
+            for name, (count, seconds, max_seconds, bytes_sent, bytes_received, errors) in stats
+        ]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+_tracer = _Tracer()
+# Process that registered write_report, see report_at_exit()
+_report_pid: Optional[int] = None
+
+def span(name: str, **attrs) -> Any:
+    """Return a context manager timing a block of code under a span name.
+
+    Names are aggregated, keep them low-cardinality (e.g. "github GET") and put the details in attrs.
+    """
+    if not ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call of a function, under its qualified name by default.
+
+    Generator functions are only timed until they return their generator, time their body with span().
+    """
+    def decorate(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def run_subprocess(args: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() in a "subprocess <program>" span counting the bytes of its input and output."""
+    with span(f"subprocess {os.path.basename(args[0])}", args=" ".join(args[1:3])) as s:
+        result = subprocess.run(args, **kwargs)
+        s.add_bytes(sent=len(kwargs.get("input") or ""), received=len(result.stdout or "") + len(result.stderr or ""))
+        return result
+
+def report() -> dict:
+    """Return the trace: the aggregated spans and the span events in the Chrome trace event format."""
+    return {
+        "script": os.path.basename(sys.argv[0]),
+        "wall_seconds": round(time.perf_counter() - _tracer.origin, 6),
+        "spans": _tracer.summary(),
+        "dropped_events": _tracer.dropped_events,
+        "traceEvents": list(_tracer.events),
+        "displayTimeUnit": "ms",
+    }
+
+def format_summary_markdown(trace: dict) -> str:
+    """Format the aggregated spans of a trace as a Markdown table, for the GitHub step summary."""
+    lines = [
+        f"### ⏱️ {trace['script']} trace",
+        "",
+        f"Wall time: {trace['wall_seconds']:.3f}s",
+        "",
+        "| Span | Calls | Total (ms) | Mean (ms) | Max (ms) | Bytes sent | Bytes received | Errors |",
+        "|------|------:|-----------:|----------:|---------:|-----------:|---------------:|-------:|",
+    ]
+    for row in trace["spans"][:SUMMARY_ROWS]:
+        lines.append(
+            f"| `{row['name']}` | {row['count']} | {row['seconds'] * 1000:.1f} | {row['mean_seconds'] * 1000:.2f} "
+            f"| {row['max_seconds'] * 1000:.1f} | {row['bytes_sent']} | {row['bytes_received']} | {row['errors']} |"
+        )
+    if len(trace["spans"]) > SUMMARY_ROWS:
+        lines.append(f"\n_{len(trace['spans']) - SUMMARY_ROWS} faster spans omitted, see the JSON trace._")
+    return "\n".join(lines) + "\n"
+
+def write_report() -> None:
+    """Write the trace to SCRIPT_TRACE_FILE and append its table to the GitHub step summary."""
+    # Processes forked after report_at_exit() inherit the exit hook, only the registering process reports
+    if _report_pid not in (None, os.getpid()) or not _tracer.stats:
+        return
+    trace = report()
+    trace_file = os.environ.get("SCRIPT_TRACE_FILE")
+    if trace_file:
+        with open(trace_file, 'w') as f:
+            json.dump(trace, f)
+        print(f"⏱️ Trace saved to {trace_file}", file=sys.stderr)
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        with open(summary_file, 'a') as f:
+            f.write(format_summary_markdown(trace))
+    elif not trace_file:
+        print(format_summary_markdown(trace), file=sys.stderr)
+
+def report_at_exit() -> None:
+    """Write the trace when the process exits, if tracing is enabled. Called from the main() of the scripts.
+
+    Registered from main() rather than at import, so that worker processes importing a script (with the
+    spawn and forkserver start methods) never write a report over the script's own.
+    """
+    global _report_pid
+    if ENABLED and _report_pid is None:
+        _report_pid = os.getpid()
+        atexit.register(write_report)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark and regression suite for validate_json.py.
+
+Generates synthetic privileged apps lists, measures the wall time and tracemalloc peak of every
+validate_json.py mode and compares the results against a stored baseline. Wall times are compared
+relative to a plain json.load of the same list, so that the baseline holds across machines.
+
+Usage:
+    python benchmark_validate_json.py [--sizes 1000,10000,100000] [--baseline FILE] [--save-baseline]
+                                      [--threshold 0.25] [--repeat 7] [--output FILE]
+
+Examples:
+    python benchmark_validate_json.py
+    python benchmark_validate_json.py --sizes 1000,10000,100000,1000000 --threshold 0.5
+    python benchmark_validate_json.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import validate_json
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark-baseline.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 7
+# Differences below these floors are treated as noise, whatever the relative change
+MIN_SECONDS_DELTA = 0.05
+MIN_PEAK_BYTES_DELTA = 256 * 1024
+# Calibration benchmark (a plain json.load), wall times are compared relative to it
+REFERENCE_BENCHMARK = "validate_json"
+BUILDS = ["release", "userdebug", "beta"]
+
+
+def generate_privileged_list(file_path: str, size: int, seed: int = 0, offset: int = 0) -> None:
+    """
+    Writes a synthetic privileged apps list in the same layout as fido2_privileged_google.json.
+
+    Args:
+        file_path: Path of the JSON file to write
+        size: Number of apps
+        seed: Random seed, the same seed always produces the same file
+        offset: First package number, lists generated with overlapping ranges share package names
+    """
+    rng = random.Random(seed)
+    apps = []
+    for i in range(offset, offset + size):
+        signatures = [
+            {"build": BUILDS[k], "cert_fingerprint_sha256": rng.randbytes(validate_json.FINGERPRINT_SIZE).hex(':').upper()}
+            for k in range(rng.randint(1, 2))
+        ]
+        apps.append({"type": "android", "info": {"package_name": f"com.example.browser{i}", "signatures": signatures}})
+
+    with open(file_path, 'w') as f:
+        json.dump({"apps": apps}, f, indent=2)
+
+
+def benchmarks(file1_path: str, file2_path: str) -> Dict[str, Callable[[], Any]]:
+    """Returns the benchmarked calls, keyed by name. file2 overlaps file1 by 10% of its packages."""
+
+    def fingerprints():
+        index = validate_json.FingerprintIndex()
+        index.add_file(file1_path)
+        index.add_file(file2_path)
+        index.package_conflicts()
+        index.shared_fingerprints()
+
+    compiled_path = file1_path + ".bin"
+    canonical1_path = file1_path + ".canonical.json"
+    canonical2_path = file2_path + ".canonical.json"
+
+    def canonicalize():
+        validate_json.canonicalize_file(file1_path, canonical1_path)
+        validate_json.canonicalize_file(file2_path, canonical2_path)
+
+    def lookup():
+        if not os.path.exists(compiled_path):
+            validate_json.compile_privileged_apps([file1_path], compiled_path)
+        fingerprint = bytes(validate_json.FINGERPRINT_SIZE)
+        with validate_json.PrivilegedAppTable(compiled_path) as table:
+            for i in range(1000):
+                table.is_privileged(f"com.example.browser{i}", fingerprint)
+
+    return {
+        "validate_json": lambda: validate_json.validate_json(file1_path, streaming=False),
+        "validate_json_streaming": lambda: validate_json.validate_json(file1_path, streaming=True),
+        "get_package_names": lambda: validate_json.get_package_names(file1_path, streaming=False),
+        "get_package_names_streaming": lambda: validate_json.get_package_names(file1_path, streaming=True),
+        "find_duplicates": lambda: validate_json.find_duplicates(file1_path, file2_path),
+        "find_duplicates_multi": lambda: validate_json.find_duplicates_multi([file1_path, file2_path]),
+        "check_files": lambda: validate_json.check_files(file1_path, file2_path),
+        "fingerprints": fingerprints,
+        "diff_files": lambda: validate_json.diff_files(file1_path, file2_path),
+        "validate_all": lambda: validate_json.validate_all([file1_path, file2_path]),
+        "compile": lambda: validate_json.compile_privileged_apps([file1_path], compiled_path),
+        "lookup_1000": lookup,
+        # The merge benchmarks rely on the canonical files written by the canonicalize benchmark
+        "canonicalize": canonicalize,
+        "find_duplicates_merge": lambda: validate_json.find_duplicates(canonical1_path, canonical2_path, merge=True),
+        "diff_files_merge": lambda: validate_json.diff_files(canonical1_path, canonical2_path, merge=True),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Measures the best wall time of `repeat` runs and the tracemalloc peak of one extra run.
+
+    The relative gap between the median and the best run is kept as the "noise" of the benchmark, it
+    widens the regression threshold of benchmarks whose timings vary from run to run.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        best = min(times)
+
+        # Measured separately, tracing allocations slows the code down considerably
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {"seconds": round(best, 6), "noise": round((statistics.median(times) - best) / best, 3), "peak_bytes": peak}
+
+
+def run_benchmarks(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Runs every benchmark for each list size.
+
+    Returns:
+        Dict mapping benchmark name to a dict mapping size (as a string) to its measurement
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            file1_path = os.path.join(tmp_dir, f"apps-{size}-1.json")
+            file2_path = os.path.join(tmp_dir, f"apps-{size}-2.json")
+            generate_privileged_list(file1_path, size, seed=1)
+            generate_privileged_list(file2_path, size, seed=2, offset=size - size // 10)
+
+            for name, func in benchmarks(file1_path, file2_path).items():
+                measurement = measure(func, repeat)
+                results.setdefault(name, {})[str(size)] = measurement
+                print(f"⏱️ {name} [{size}]: {measurement['seconds']:.4f}s, peak {measurement['peak_bytes'] / 1024:.0f} KiB")
+
+            for file_path in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, file_path))
+    return results
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, str, str, float, float]]:
+    """
+    Compares results against a baseline.
+
+    Wall times depend on the machine, so they are compared relative to the REFERENCE_BENCHMARK time of
+    the same run and size: a baseline recorded on one runner can be checked on another, and only a
+    benchmark slowing down compared to a plain json.load is reported. tracemalloc peaks do not depend
+    on the machine and are compared as is.
+
+    The wall time threshold is widened by the measured noise of the benchmark and of the reference (the
+    larger of the baseline and current values of each), so benchmarks with unsteady timings need a larger
+    slowdown to be reported.
+
+    Returns:
+        List of (benchmark, size, metric, baseline value, current value) for every metric that
+        grew by more than `threshold` (e.g. 0.25 for 25%) and by more than the noise floor. Wall
+        times are reported as "seconds/<REFERENCE_BENCHMARK>" ratios.
+    """
+    regressions = []
+    for name, by_size in results.items():
+        for size, measurement in by_size.items():
+            expected = baseline.get(name, {}).get(size)
+            if not expected:
+                continue
+
+            before, after = expected["peak_bytes"], measurement["peak_bytes"]
+            if after > before * (1 + threshold) and after - before > MIN_PEAK_BYTES_DELTA:
+                regressions.append((name, size, "peak_bytes", before, after))
+
+            reference = results.get(REFERENCE_BENCHMARK, {}).get(size)
+            expected_reference = baseline.get(REFERENCE_BENCHMARK, {}).get(size)
+            if name == REFERENCE_BENCHMARK or not reference or not expected_reference:
+                continue
+            before = expected["seconds"] / expected_reference["seconds"]
+            after = measurement["seconds"] / reference["seconds"]
+            noise = (max(expected.get("noise", 0), measurement.get("noise", 0))
+                     + max(expected_reference.get("noise", 0), reference.get("noise", 0)))
+            # The noise floor applies to the wall time the ratio increase amounts to on this machine
+            if after > before * (1 + threshold + noise) and (after - before) * reference["seconds"] > MIN_SECONDS_DELTA:
+                regressions.append((name, size, f"seconds/{REFERENCE_BENCHMARK}", round(before, 3), round(after, 3)))
+    return regressions
+
+
+def same_python(baseline_version: str, version: str) -> bool:
+    """Whether two Python versions share their major and minor version (e.g. 3.13.0 and 3.13.1)."""
+    return baseline_version.split(".")[:2] == version.split(".")[:2]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark validate_json.py and check for regressions.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help=f"Comma separated number of apps per generated list (default: {','.join(map(str, DEFAULT_SIZES))})"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE_PATH,
+        help="Path to the baseline JSON file (default: benchmark-baseline.json next to this script)"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the results as the new baseline instead of comparing against it"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative increase treated as a regression (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Number of timed runs per benchmark, the best one is kept (default: {DEFAULT_REPEAT})"
+    )
+    parser.add_argument(
+        "--output",
+        help="Path to save the results JSON to"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        # Timings and allocations differ between interpreters, a baseline only holds for the Python it was recorded with
+        if not same_python(baseline.get("python", ""), platform.python_version()):
+            print(f"::error::The baseline was recorded with Python {baseline.get('python', 'unknown')}, not {platform.python_version()}: "
+                  f"run the benchmarks with that version or record a new baseline with --save-baseline")
+            sys.exit(1)
+
+    results = run_benchmarks(sizes, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"✅ Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if baseline is None:
+        print(f"::warning::Baseline file not found: {args.baseline}, run with --save-baseline to create it")
+        sys.exit(0)
+
+    regressions = find_regressions(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"❌ Found {len(regressions)} regressions above {args.threshold:.0%}:")
+        for name, size, metric, before, after in regressions:
+            print(f"  - {name} [{size}] {metric}: {before} -> {after} (+{(after - before) / before:.0%})")
+        sys.exit(1)
+
+    print(f"✅ No regressions above {args.threshold:.0%} compared to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import unittest
+
+from benchmark_validate_json import REFERENCE_BENCHMARK, find_regressions, same_python
+
+
+def results(reference_seconds, seconds, peak_bytes=1024 * 1024, noise=0.0, reference_noise=0.0, size="100000"):
+    """Builds results for the reference benchmark and a "mode" benchmark of one size."""
+    return {
+        REFERENCE_BENCHMARK: {size: {"seconds": reference_seconds, "noise": reference_noise, "peak_bytes": 1024 * 1024}},
+        "mode": {size: {"seconds": seconds, "noise": noise, "peak_bytes": peak_bytes}},
+    }
+
+
+class TestFindRegressions(unittest.TestCase):
+    def test_no_regression(self):
+        """Test unchanged results report nothing"""
+        baseline = results(0.5, 1.0)
+
+        self.assertEqual(find_regressions(baseline, baseline, 0.25), [])
+
+    def test_wall_time_regression_is_relative_to_reference(self):
+        """Test a slower benchmark is reported as a ratio of the reference time"""
+        self.assertEqual(find_regressions(results(0.5, 1.5), results(0.5, 1.0), 0.25),
+                         [("mode", "100000", f"seconds/{REFERENCE_BENCHMARK}", 2.0, 3.0)])
+
+    def test_slower_machine_is_not_a_regression(self):
+        """Test every benchmark slowing down with the reference is not reported"""
+        self.assertEqual(find_regressions(results(1.0, 2.0), results(0.5, 1.0), 0.25), [])
+
+    def test_below_threshold_is_not_a_regression(self):
+        """Test increases under the threshold are not reported"""
+        self.assertEqual(find_regressions(results(0.5, 1.2), results(0.5, 1.0), 0.25), [])
+
+    def test_below_noise_floor_is_not_a_regression(self):
+        """Test large relative increases amounting to a few milliseconds are not reported"""
+        self.assertEqual(find_regressions(results(0.001, 0.004), results(0.001, 0.002), 0.25), [])
+
+    def test_noise_widens_threshold(self):
+        """Test the measured noise of the benchmark and of the reference widens the threshold"""
+        current = results(0.5, 1.4, noise=0.1, reference_noise=0.05)
+
+        self.assertEqual(find_regressions(current, results(0.5, 1.0), 0.25), [])
+        self.assertEqual(len(find_regressions(results(0.5, 1.45, noise=0.1, reference_noise=0.05), results(0.5, 1.0), 0.25)), 1)
+        # The larger of the baseline and current noise is used
+        self.assertEqual(find_regressions(results(0.5, 1.4), results(0.5, 1.0, noise=0.1, reference_noise=0.05), 0.25), [])
+
+    def test_peak_bytes_regression(self):
+        """Test tracemalloc peaks are compared as is"""
+        self.assertEqual(find_regressions(results(0.5, 1.0, peak_bytes=4 * 1024 * 1024), results(0.5, 1.0), 0.25),
+                         [("mode", "100000", "peak_bytes", 1024 * 1024, 4 * 1024 * 1024)])
+        self.assertEqual(find_regressions(results(0.5, 1.0, peak_bytes=100 * 1024), results(0.5, 1.0, peak_bytes=10 * 1024), 0.25), [])
+
+    def test_missing_baseline_entries_are_skipped(self):
+        """Test benchmarks and sizes missing from the baseline, or without a reference, are skipped"""
+        current = results(0.5, 5.0)
+
+        self.assertEqual(find_regressions(current, results(0.5, 1.0, size="1000"), 0.25), [])
+        self.assertEqual(find_regressions(current, {"mode": {"100000": {"seconds": 1.0, "peak_bytes": 1024 * 1024}}}, 0.25), [])
+
+    def test_baseline_without_noise(self):
+        """Test baselines recorded before noise was measured are still compared"""
+        baseline = {name: {size: {"seconds": value["seconds"], "peak_bytes": value["peak_bytes"]} for size, value in by_size.items()}
+                    for name, by_size in results(0.5, 1.0).items()}
+
+        self.assertEqual(len(find_regressions(results(0.5, 1.5), baseline, 0.25)), 1)
+
+    def test_same_python(self):
+        """Test baselines are only comparable on the same major and minor Python version"""
+        self.assertTrue(same_python("3.13.0", "3.13.2"))
+        self.assertFalse(same_python("3.13.0", "3.11.7"))
+        self.assertFalse(same_python("", "3.13.0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
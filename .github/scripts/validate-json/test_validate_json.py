@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 import unittest
+import sys
 import os
 import json
-from validate_json import validate_json, find_duplicates, get_package_names
+import tempfile
+from validate_json import (
+    validate_json, find_duplicates, get_package_names, iter_json_items, iter_apps, check_files,
+    build_package_index, find_duplicates_multi, parse_fingerprint, format_fingerprint, FingerprintIndex,
+    diff_files, format_diff_markdown, validate_all, compile_privileged_apps, PrivilegedAppTable,
+    canonicalize_file, is_canonical,
+)
 from unittest.mock import patch
 import io
 
@@ -43,6 +50,344 @@ class TestValidateJson(unittest.TestCase):
         duplicates = find_duplicates(self.valid_file, self.valid_file2)
         self.assertEqual(len(duplicates), 0)
 
+    def test_check_files_parses_each_file_once(self):
+        """Test check validates both files and finds duplicates from a single parse per file"""
+        with patch('validate_json.get_package_names', wraps=get_package_names) as parse:
+            valid, duplicates = check_files(self.valid_file, self.valid_file2)
+
+        self.assertTrue(valid)
+        self.assertEqual(duplicates, [])
+        self.assertEqual(parse.call_count, 2)
+
+    def test_check_files_finds_duplicates(self):
+        """Test check reports duplicates when using the same file"""
+        valid, duplicates = check_files(self.valid_file, self.valid_file)
+
+        self.assertTrue(valid)
+        self.assertEqual(duplicates, sorted(get_package_names(self.valid_file)))
+
+    def test_check_files_and_find_duplicates_return_the_same_order(self):
+        """Test check and duplicates report duplicates in the same sorted order"""
+        _, duplicates = check_files(self.valid_file, self.valid_file)
+
+        self.assertEqual(find_duplicates(self.valid_file, self.valid_file, merge=False), duplicates)
+
+    def test_check_files_invalid(self):
+        """Test check fails and skips the duplicate check when a file is invalid"""
+        valid, duplicates = check_files(self.valid_file, self.invalid_file)
+
+        self.assertFalse(valid)
+        self.assertEqual(duplicates, [])
+
+    def test_build_package_index(self):
+        """Test the index maps every package name to its file and entry index"""
+        index = build_package_index([self.valid_file, self.valid_file2])
+
+        self.assertEqual(index["com.android.chrome"], [(self.valid_file, 0)])
+        self.assertEqual(index["com.chrome.canary"], [(self.valid_file, 2)])
+        self.assertEqual(index["org.chromium.chrome"], [(self.valid_file2, 0)])
+
+    def test_find_duplicates_multi_cross_file(self):
+        """Test duplicates are reported across any number of files"""
+        with tempfile.NamedTemporaryFile('wb', suffix='.json', delete=False) as f, open(self.valid_file, 'rb') as source:
+            f.write(source.read())
+        self.addCleanup(os.unlink, f.name)
+
+        duplicates = find_duplicates_multi([self.valid_file, self.valid_file2, f.name])
+
+        self.assertEqual(set(duplicates), get_package_names(self.valid_file))
+        self.assertEqual(duplicates["com.chrome.dev"], [(self.valid_file, 1), (f.name, 1)])
+
+    def test_find_duplicates_multi_repeated_path(self):
+        """Test a file passed twice, under any spelling, is only checked once"""
+        repeated = os.path.join(os.path.dirname(self.valid_file), ".", os.path.basename(self.valid_file))
+
+        self.assertEqual(find_duplicates_multi([self.valid_file, self.valid_file2, repeated, self.valid_file]), {})
+        self.assertIn("Ignoring 2 repeated file paths", sys.stdout.getvalue())
+
+    def test_find_duplicates_multi_within_file(self):
+        """Test a package declared twice in the same file is reported"""
+        with open(self.valid_file) as f:
+            data = json.load(f)
+        data["apps"].append(data["apps"][0])
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+
+        duplicates = find_duplicates_multi([f.name, self.valid_file2])
+
+        self.assertEqual(duplicates, {"com.android.chrome": [(f.name, 0), (f.name, 3)]})
+
+    def test_find_duplicates_multi_returns_empty_dict_when_no_duplicates(self):
+        """Test when using different files (should not find duplicates)"""
+        self.assertEqual(find_duplicates_multi([self.valid_file, self.valid_file2]), {})
+
+    def test_parse_fingerprint(self):
+        """Test colon separated fingerprints are parsed into 32 raw bytes and back"""
+        value = "F0:FD:6C:5B:41:0F:25:CB:25:C3:B5:33:46:C8:97:2F:AE:30:F8:EE:74:11:DF:91:04:80:AD:6B:2D:60:DB:83"
+        fingerprint = parse_fingerprint(value)
+
+        self.assertEqual(len(fingerprint), 32)
+        self.assertEqual(format_fingerprint(fingerprint), value)
+        self.assertIsNone(parse_fingerprint(value[:-3]))
+        self.assertIsNone(parse_fingerprint(value.replace(":", "")))
+        self.assertIsNone(parse_fingerprint(None))
+
+    def test_fingerprint_index_malformed(self):
+        """Test truncated fingerprints are reported as malformed"""
+        index = FingerprintIndex()
+        index.add_file(self.valid_file)
+
+        self.assertEqual(len(index), 4)
+        self.assertEqual([(entry[1], entry[2]) for entry in index.malformed], [(2, "com.chrome.canary")])
+
+    def test_fingerprint_index_shared_fingerprints(self):
+        """Test a fingerprint declared under different packages is reported"""
+        index = FingerprintIndex()
+        index.add_file(self.valid_file)
+        index.add_file(self.valid_file2)
+
+        self.assertEqual(index.shared_fingerprints(), {
+            "19:75:B2:F1:71:77:BC:89:A5:DF:F3:1F:9E:64:A6:CA:E2:81:A5:3D:C1:D1:D5:9B:1D:14:7F:E1:C8:2A:FA:00":
+                ["com.android.chrome", "org.chromium.chrome"],
+        })
+
+    def test_fingerprint_index_package_conflicts(self):
+        """Test a package listed with different fingerprints is reported"""
+        with open(self.valid_file2) as f:
+            data = json.load(f)
+        data["apps"][0]["info"]["package_name"] = "com.android.chrome"
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+
+        index = FingerprintIndex()
+        index.add_file(self.valid_file)
+        index.add_file(f.name)
+        conflicts = index.package_conflicts()
+
+        self.assertEqual(list(conflicts), ["com.android.chrome"])
+        self.assertEqual([(file_path, entry_index) for file_path, entry_index, _ in conflicts["com.android.chrome"]],
+                         [(self.valid_file, 0), (f.name, 0)])
+
+    def test_diff_files_identical_when_reordered(self):
+        """Test reordering apps does not produce a diff"""
+        with open(self.valid_file) as f:
+            data = json.load(f)
+        data["apps"].reverse()
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+
+        diff = diff_files(self.valid_file, f.name)
+
+        self.assertEqual((diff["added"], diff["removed"], diff["changed"]), ([], [], []))
+        self.assertEqual(format_diff_markdown(diff), "No privileged app changes.")
+
+    def test_diff_files_added_removed_changed(self):
+        """Test added, removed and changed apps are reported with their signature changes"""
+        with open(self.valid_file) as f:
+            data = json.load(f)
+        removed = data["apps"].pop(2)
+        data["apps"][0]["info"]["signatures"][1]["cert_fingerprint_sha256"] = "AA:" * 31 + "AA"
+        data["apps"].append({"type": "android", "info": {"package_name": "com.example", "signatures": []}})
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+
+        diff = diff_files(self.valid_file, f.name)
+
+        self.assertEqual([app["package_name"] for app in diff["added"]], ["com.example"])
+        self.assertEqual([app["package_name"] for app in diff["removed"]], [removed["info"]["package_name"]])
+        self.assertEqual(diff["changed"], [{
+            "package_name": "com.android.chrome",
+            "fields": [],
+            "signatures": {"userdebug": {
+                "added": ["AA:" * 31 + "AA"],
+                "removed": ["19:75:B2:F1:71:77:BC:89:A5:DF:F3:1F:9E:64:A6:CA:E2:81:A5:3D:C1:D1:D5:9B:1D:14:7F:E1:C8:2A:FA:00"],
+            }},
+        }])
+        self.assertIn("1 added, 1 removed, 1 changed", format_diff_markdown(diff))
+
+    def test_validate_all(self):
+        """Test validating a glob of files in worker processes reports each file"""
+        fixtures = os.path.join(os.path.dirname(__file__), "fixtures")
+
+        report = validate_all([os.path.join(fixtures, "*.json")], workers=2)
+
+        self.assertFalse(report["valid"])
+        self.assertEqual(report["workers"], 2)
+        results = {os.path.basename(result["file"]): result for result in report["files"]}
+        self.assertEqual(set(results), {"sample-invalid.json", "sample-valid1.json", "sample-valid2.json"})
+        self.assertFalse(results["sample-invalid.json"]["valid"])
+        self.assertTrue(results["sample-valid1.json"]["valid"])
+        self.assertGreaterEqual(results["sample-valid1.json"]["seconds"], 0)
+
+    def test_validate_all_unmatched_pattern(self):
+        """Test a pattern matching no files fails the validation"""
+        report = validate_all([self.valid_file, "does-not-exist-*.json"])
+
+        self.assertFalse(report["valid"])
+        self.assertEqual([result["valid"] for result in report["files"]], [True, False])
+
+    def test_compile_privileged_apps_lookup(self):
+        """Test every compiled (package, fingerprint) pair is found and others are not"""
+        output_file = os.path.join(tempfile.mkdtemp(), "privileged.bin")
+        self.addCleanup(os.unlink, output_file)
+        index = FingerprintIndex()
+        index.add_file(self.valid_file2)
+
+        self.assertEqual(compile_privileged_apps([self.valid_file2], output_file), len(index))
+
+        with PrivilegedAppTable(output_file) as table:
+            self.assertEqual(len(table), 2)
+            for signature_id, entry_id in enumerate(index.signature_entries):
+                package_name = index.package_names[index.entry_packages[entry_id]]
+                self.assertTrue(table.is_privileged(package_name, index.fingerprint(signature_id)))
+                self.assertTrue(table.is_privileged(package_name, format_fingerprint(index.fingerprint(signature_id))))
+                self.assertFalse(table.is_privileged(package_name + ".beta", index.fingerprint(signature_id)))
+                self.assertFalse(table.is_privileged(package_name, bytes(32)))
+            self.assertFalse(table.is_privileged("org.chromium.chrome", "not a fingerprint"))
+            self.assertEqual([name for name, _ in table.records()], ["org.chromium.chrome", "org.chromium.chrome"])
+
+    def test_compile_privileged_apps_malformed(self):
+        """Test compiling fails on malformed fingerprints"""
+        output_file = os.path.join(tempfile.mkdtemp(), "privileged.bin")
+
+        with self.assertRaises(ValueError):
+            compile_privileged_apps([self.valid_file], output_file)
+        self.assertFalse(os.path.exists(output_file))
+
+    def test_privileged_app_table_invalid_file(self):
+        """Test opening a file that is not a compiled table fails"""
+        with self.assertRaises(ValueError):
+            PrivilegedAppTable(self.valid_file)
+
+    def _write_reversed(self, file_path):
+        with open(file_path) as f:
+            data = json.load(f)
+        data["apps"].reverse()
+        for app in data["apps"]:
+            app["info"]["signatures"].reverse()
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_canonicalize_file(self):
+        """Test canonical files are sorted by package name and rewriting them is a no-op"""
+        file_path = self._write_reversed(self.valid_file)
+        self.assertFalse(is_canonical(file_path))
+
+        self.assertTrue(canonicalize_file(file_path))
+        self.assertTrue(is_canonical(file_path))
+        self.assertFalse(canonicalize_file(file_path))
+
+        with open(file_path) as f:
+            apps = json.load(f)["apps"]
+        self.assertEqual([app["info"]["package_name"] for app in apps], sorted(get_package_names(self.valid_file)))
+        self.assertEqual(list(apps[0]), ["type", "info"])
+        self.assertEqual([signature["build"] for signature in apps[0]["info"]["signatures"]], ["release", "userdebug"])
+        with open(file_path) as f:
+            self.assertTrue(f.read().endswith("}\n"))
+
+    def test_canonicalize_file_keeps_fingerprint_order_within_build(self):
+        """Test canonicalizing sorts signatures by build without reordering fingerprints of the same build"""
+        fingerprints = ["BB:" + ":".join(["00"] * 31), "AA:" + ":".join(["00"] * 31)]
+        data = {"apps": [{"type": "android", "info": {"package_name": "com.example", "signatures": [
+            {"build": "userdebug", "cert_fingerprint_sha256": fingerprints[0]},
+            {"build": "release", "cert_fingerprint_sha256": fingerprints[0]},
+            {"build": "release", "cert_fingerprint_sha256": fingerprints[1]},
+        ]}}]}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(data, f)
+        self.addCleanup(os.unlink, f.name)
+
+        canonicalize_file(f.name)
+        with open(f.name) as f:
+            signatures = json.load(f)["apps"][0]["info"]["signatures"]
+        self.assertEqual([(signature["build"], signature["cert_fingerprint_sha256"]) for signature in signatures],
+                         [("release", fingerprints[0]), ("release", fingerprints[1]), ("userdebug", fingerprints[0])])
+
+    def test_community_asset_is_canonical(self):
+        """Test the checked-in community list is in canonical form"""
+        community_file = os.path.join(os.path.dirname(__file__), "../../../app/src/main/assets/fido2_privileged_community.json")
+        self.assertTrue(is_canonical(community_file))
+
+    def test_merge_fast_path_matches_hashed(self):
+        """Test duplicate and diff checks give the same results with the canonical merge fast path"""
+        canonical1 = self._write_reversed(self.valid_file)
+        canonical2 = self._write_reversed(self.valid_file2)
+        canonicalize_file(canonical1)
+        canonicalize_file(canonical2)
+
+        for file1_path, file2_path in ((canonical1, canonical1), (canonical1, canonical2), (canonical2, canonical1)):
+            self.assertEqual(sorted(find_duplicates(file1_path, file2_path, merge=True)),
+                             sorted(find_duplicates(file1_path, file2_path, merge=False)))
+            self.assertEqual(diff_files(file1_path, file2_path, merge=True), diff_files(file1_path, file2_path, merge=False))
+
+    def test_merge_fast_path_falls_back_when_not_canonical(self):
+        """Test the merge fast path falls back to the hashed checks for files that are not sorted"""
+        file_path = self._write_reversed(self.valid_file)
+
+        self.assertEqual(sorted(find_duplicates(file_path, self.valid_file, merge=True)), sorted(get_package_names(self.valid_file)))
+        self.assertEqual(diff_files(file_path, self.valid_file, merge=True)["changed"], [])
+
+    def test_validate_json_streaming_valid(self):
+        """Test streaming validation of valid JSON file"""
+        self.assertTrue(validate_json(self.valid_file, streaming=True))
+
+    def test_validate_json_streaming_invalid(self):
+        """Test streaming validation of invalid JSON file"""
+        self.assertFalse(validate_json(self.invalid_file, streaming=True))
+
+    def test_get_package_names_streaming_matches_json_load(self):
+        """Test streaming package name extraction returns the same names as json.load"""
+        for file_path in (self.valid_file, self.valid_file2):
+            self.assertEqual(get_package_names(file_path, streaming=True), get_package_names(file_path, streaming=False))
+
+    def test_get_package_names_streaming_empty_apps(self):
+        """Test streaming an empty apps array returns no package names"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            f.write('{"apps": []}')
+        self.addCleanup(os.unlink, f.name)
+
+        self.assertEqual(get_package_names(f.name, streaming=True), set())
+
+    def test_iter_json_items_small_chunks(self):
+        """Test items are decoded correctly when tokens are split across chunks"""
+        with open(self.valid_file) as f:
+            expected = json.load(f)["apps"]
+        for chunk_size in (1, 2, 3, 7, 64):
+            items = list(iter_json_items(self.valid_file, chunk_size=chunk_size))
+            self.assertEqual([path for path, _ in items], [("apps", i) for i in range(len(expected))])
+            self.assertEqual([value for _, value in items], expected)
+
+    def test_iter_apps_streaming_empty_apps(self):
+        """Test streaming an empty apps array yields no entries"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            f.write('{"apps": []}')
+        self.addCleanup(os.unlink, f.name)
+
+        self.assertEqual(list(iter_apps(f.name, streaming=True)), [])
+
+    def test_iter_json_items_error_matches_json(self):
+        """Test streaming syntax errors report the same message and position as json.loads"""
+        documents = [
+            '{"apps": [1.5e3, -2, null]} x', '{"apps": [1,]}', '{"a" 1}', '[1 2]', '', '{"apps": [{"a": tru}]}',
+            '[1, 2, 3, ]', '{"apps": [], \n  }', '{"apps": [{"a": 1,\n\t}]}',
+        ]
+        for document in documents:
+            with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+                f.write(document)
+            self.addCleanup(os.unlink, f.name)
+            with self.assertRaises(json.JSONDecodeError) as expected:
+                json.loads(document)
+            for chunk_size in (1, 3, 64):
+                with self.assertRaises(json.JSONDecodeError) as actual:
+                    list(iter_json_items(f.name, chunk_size=chunk_size))
+                self.assertEqual(str(actual.exception), str(expected.exception))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,36 +1,288 @@
 #!/usr/bin/env python3
+import glob
 import json
+import mmap
+import re
+import struct
 import sys
 import os
-from typing import List, Dict, Any, Set
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Set, Iterator, Optional, Tuple, Union
 
+# tracing.py is shared with the scripts of the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import report_at_exit, span, traced  # noqa: E402
 
-def get_package_names(file_path: str) -> Set[str]:
+# Files larger than this are read with the streaming parser instead of json.load
+STREAMING_THRESHOLD_BYTES = 8 * 1024 * 1024
+STREAMING_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_FINGERPRINT = re.compile(r'[0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){31}')
+FINGERPRINT_SIZE = 32
+
+# Compiled table layout: header, then `count` records of the package name (UTF-8, NUL padded to
+# `name_width` bytes) followed by its raw fingerprint, sorted by their bytes
+COMPILED_MAGIC = b"BWPRIVAP"
+COMPILED_VERSION = 1
+_COMPILED_HEADER = struct.Struct('<8sIII')  # magic, version, count, name_width
+# Decode errors this close to the end of the buffer may be caused by a token split across chunks
+_MAX_TOKEN_TAIL = 16
+
+
+def _should_stream(file_path: str, streaming: Optional[bool]) -> bool:
+    if streaming is not None:
+        return streaming
+    return os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES
+
+
+def iter_json_items(file_path: str, depth: int = 2, chunk_size: int = STREAMING_CHUNK_SIZE) -> Iterator[Tuple[tuple, Any]]:
+    """
+    Incrementally parses a JSON file, validating its syntax chunk by chunk.
+
+    Objects and arrays shallower than `depth` are walked token by token; every value found
+    at `depth` (or any scalar or empty container above it) is decoded on its own and yielded
+    together with its path, e.g. (("apps", 3), {...}) for the fourth entry of the top-level "apps" array.
+    Peak memory is bounded by the chunk size and the largest single item, not the file size.
+
+    Args:
+        file_path: Path to the JSON file
+        depth: Nesting depth at which values are decoded whole
+        chunk_size: Number of characters read from the file at a time
+
+    Returns:
+        Iterator of (path, value) tuples
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    with open(file_path, 'r') as f:
+        reader = _StreamReader(f, chunk_size)
+        yield from reader.items(depth)
+
+
+class _StreamReader:
+    """Sliding window over a text file used by iter_json_items()."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # Optional position before self.pos that must survive fill(), e.g. a comma reported in an error
+        self.mark: Optional[int] = None
+        self.eof = False
+        # Absolute position, line number and last newline offset of buf[0], used for error messages
+        self.base = 0
+        self.base_line = 1
+        self.last_newline = -1
+
+    def fill(self) -> bool:
+        """Drops the consumed part of the buffer and appends the next chunk. Returns False at EOF."""
+        if self.eof:
+            return False
+        keep = self.pos if self.mark is None else self.mark
+        consumed = self.buf[:keep]
+        newlines = consumed.count('\n')
+        if newlines:
+            self.base_line += newlines
+            self.last_newline = self.base + consumed.rindex('\n')
+        self.base += keep
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[keep:] + chunk
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark = 0
+        return bool(chunk)
+
+    def error(self, msg: str, pos: int) -> json.JSONDecodeError:
+        """Builds a JSONDecodeError reporting the absolute line/column of buf[pos]."""
+        abs_pos = self.base + pos
+        lineno = self.base_line + self.buf.count('\n', 0, pos)
+        newline = self.buf.rfind('\n', 0, pos)
+        colno = abs_pos - (self.base + newline if newline >= 0 else self.last_newline)
+        err = json.JSONDecodeError(msg, "", 0)
+        err.args = (f"{msg}: line {lineno} column {colno} (char {abs_pos})",)
+        err.pos, err.lineno, err.colno = abs_pos, lineno, colno
+        return err
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character without consuming it ('' at EOF)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode(self) -> Any:
+        """Decodes the complete JSON value at the current position, reading more chunks as needed."""
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # The value may simply be cut off by the end of the buffer, anything else is a real error
+                truncated = e.msg.startswith("Unterminated string") or e.pos >= len(self.buf) - _MAX_TOKEN_TAIL
+                if truncated and not self.eof:
+                    self.fill()
+                    continue
+                raise self.error(e.msg, e.pos) from None
+            # A number ending near the buffer end (e.g. "1." of "1.5") may continue in the next chunk
+            if end >= len(self.buf) - _MAX_TOKEN_TAIL and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def items(self, depth: int) -> Iterator[Tuple[tuple, Any]]:
+        path: List[Any] = []
+        containers: List[str] = []
+        expect_value = True
+
+        while True:
+            c = self.peek()
+
+            if expect_value:
+                if c in ('{', '[') and len(path) < depth:
+                    self.pos += 1
+                    closing = '}' if c == '{' else ']'
+                    if self.peek() == closing:
+                        self.pos += 1
+                        yield tuple(path), ({} if c == '{' else [])
+                        expect_value = False
+                        continue
+                    containers.append(c)
+                    if c == '[':
+                        path.append(0)
+                        continue
+                    path.append(self._key())
+                    continue
+                if not c:
+                    raise self.error("Expecting value", self.pos)
+                yield tuple(path), self.decode()
+                expect_value = False
+                continue
+
+            if not containers:
+                if c:
+                    raise self.error("Extra data", self.pos)
+                return
+
+            closing = '}' if containers[-1] == '{' else ']'
+            if c == ',':
+                self.mark = self.pos
+                self.pos += 1
+                c = self.peek()
+                comma, self.mark = self.mark, None
+                if c == closing:
+                    raise self._trailing_comma_error(comma, closing)
+                if closing == '}':
+                    path[-1] = self._key()
+                else:
+                    path[-1] += 1
+                expect_value = True
+            elif c == closing:
+                self.pos += 1
+                containers.pop()
+                path.pop()
+            else:
+                raise self.error("Expecting ',' delimiter", self.pos)
+
+    def _trailing_comma_error(self, comma: int, closing: str) -> json.JSONDecodeError:
+        """Builds the error json reports for the trailing comma at buf[comma].
+
+        The message and position differ between Python versions ("Illegal trailing comma" at the comma since
+        3.13, "Expecting value" or "Expecting property name" at the closing bracket before), so they are taken
+        from json itself, decoding the comma up to the closing bracket after a minimal container opening.
+        """
+        prefix = '{"":0' if closing == '}' else '[0'
+        try:
+            _DECODER.raw_decode(prefix + self.buf[comma:self.pos + 1])
+        except json.JSONDecodeError as e:
+            return self.error(e.msg, comma + e.pos - len(prefix))
+        return self.error("Expecting value", self.pos)
+
+    def _key(self) -> str:
+        """Reads an object key and its ':' delimiter."""
+        if self.peek() != '"':
+            raise self.error("Expecting property name enclosed in double quotes", self.pos)
+        key = self.decode()
+        if self.peek() != ':':
+            raise self.error("Expecting ':' delimiter", self.pos)
+        self.pos += 1
+        return key
+
+
+def iter_apps(file_path: str, streaming: Optional[bool] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Iterates over the entries of the "apps" array of a privileged apps JSON file.
+
+    Args:
+        file_path: Path to the JSON file
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        Iterator of (entry index, app) tuples
+    """
+    if not _should_stream(file_path, streaming):
+        with span("json.load", file=file_path) as s, open(file_path, 'r') as f:
+            data = json.load(f)
+            s.add_bytes(received=f.tell())
+        yield from enumerate(data["apps"])
+        return
+
+    found_apps = False
+    for path, value in iter_json_items(file_path, depth=2):
+        if path and path[0] == "apps":
+            found_apps = True
+            if len(path) == 2:
+                yield path[1], value
+    if not found_apps:
+        raise KeyError("apps")
+
+
+@traced()
+def get_package_names(file_path: str, streaming: Optional[bool] = None) -> Set[str]:
     """
     Extracts package names from a JSON file.
 
     Args:
         file_path: Path to the JSON file
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
 
     Returns:
         Set of package names
     """
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    return {app["info"]["package_name"] for _, app in iter_apps(file_path, streaming)}
 
-    package_names = set()
-    for app in data["apps"]:
-        package_names.add(app["info"]["package_name"])
 
-    return package_names
+def _parse_json(file_path: str, streaming: Optional[bool]) -> None:
+    """Parses a JSON file, raising json.JSONDecodeError if it is invalid."""
+    if _should_stream(file_path, streaming):
+        for _ in iter_json_items(file_path):
+            pass
+    else:
+        with span("json.load", file=file_path) as s, open(file_path, 'r') as f:
+            json.load(f)
+            s.add_bytes(received=f.tell())
 
 
-def validate_json(file_path: str) -> bool:
+@traced()
+def validate_json(file_path: str, streaming: Optional[bool] = None) -> bool:
     """
     Validates if a JSON file is correctly formatted by attempting to deserialize it.
 
     Args:
         file_path: Path to the JSON file to validate
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
 
     Returns:
         True if valid, False otherwise
@@ -40,8 +292,7 @@ def validate_json(file_path: str) -> bool:
             print(f"Error: File {file_path} does not exist")
             return False
 
-        with open(file_path, 'r') as f:
-            json.load(f)
+        _parse_json(file_path, streaming)
         print(f"✅ JSON file {file_path} is valid")
         return True
     except json.JSONDecodeError as e:
@@ -52,39 +303,801 @@ def validate_json(file_path: str) -> bool:
         return False
 
 
-def find_duplicates(file1_path: str, file2_path: str) -> List[str]:
+def _validate_file_timed(file_path: str) -> Dict[str, Any]:
+    """Validates a single file without printing, for use in validate_all() worker processes."""
+    start = time.perf_counter()
+    error = None
+    try:
+        _parse_json(file_path, None)
+    except json.JSONDecodeError as e:
+        error = f"Invalid JSON: {str(e)}"
+    except Exception as e:
+        error = str(e)
+    return {"file": file_path, "valid": error is None, "error": error, "seconds": round(time.perf_counter() - start, 6)}
+
+
+@traced()
+def validate_all(patterns: List[str], workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Validates every JSON file matching the given glob patterns in a pool of worker processes.
+
+    Args:
+        patterns: Glob patterns (recursive "**" supported) or plain file paths
+        workers: Number of worker processes. Defaults to the number of CPUs; files are
+            validated in this process when there is a single worker or a single file.
+
+    Returns:
+        Report dict with the overall "valid" flag, "total_seconds", "workers" and a
+        per-file list of {"file", "valid", "error", "seconds"} results
+    """
+    start = time.perf_counter()
+    file_paths: Dict[str, None] = {}  # Ordered set, a file matched by several patterns is validated once
+    unmatched: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            unmatched.append(pattern)
+        file_paths.update(dict.fromkeys(matches))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(file_paths), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_validate_file_timed, list(file_paths), chunksize=max(1, len(file_paths) // (workers * 4))))
+    else:
+        results = [_validate_file_timed(file_path) for file_path in file_paths]
+
+    results += [{"file": pattern, "valid": False, "error": "No files match pattern", "seconds": 0.0} for pattern in unmatched]
+    return {
+        "valid": bool(results) and all(result["valid"] for result in results),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - start, 6),
+        "files": results,
+    }
+
+
+@traced()
+def find_duplicates(file1_path: str, file2_path: str, merge: Optional[bool] = None) -> List[str]:
     """
     Checks for duplicate package_name entries between two JSON files.
 
     Args:
         file1_path: Path to the first JSON file
         file2_path: Path to the second JSON file
+        merge: Force (True) or disable (False) the merge fast path for canonical files. By default
+            it is tried for files larger than STREAMING_THRESHOLD_BYTES. Files that turn out not
+            to be canonical fall back to comparing package name sets.
 
     Returns:
-        List of duplicate package names, empty list if none found
+        Sorted list of duplicate package names, empty list if none found
     """
     try:
-        # Get package names from both files
-        packages1 = get_package_names(file1_path)
-        packages2 = get_package_names(file2_path)
+        duplicates = None
+        if _use_merge([file1_path, file2_path], merge):
+            try:
+                duplicates = _merge_duplicates(file1_path, file2_path)
+            except _NotSortedError:
+                pass
 
-        # Find duplicates
-        duplicates = list(packages1.intersection(packages2))
+        if duplicates is None:
+            # Get package names from both files
+            packages1 = get_package_names(file1_path)
+            packages2 = get_package_names(file2_path)
 
-        if duplicates:
-            print(f"❌ Found {len(duplicates)} duplicate package names between {file1_path} and {file2_path}:")
-            for dup in duplicates:
-                print(f"  - {dup}")
-            return duplicates
-        else:
-            print(f"✅ No duplicate package names found between {file1_path} and {file2_path}")
-            return []
+            # Find duplicates, sorted like check_files() and the merge fast path return them
+            duplicates = sorted(packages1.intersection(packages2))
+
+        _print_duplicates(duplicates, file1_path, file2_path)
+        return duplicates
 
     except Exception as e:
         print(f"❌ Error checking duplicates: {str(e)}")
         return []
 
 
+def _print_duplicates(duplicates: List[str], file1_path: str, file2_path: str) -> None:
+    if duplicates:
+        print(f"❌ Found {len(duplicates)} duplicate package names between {file1_path} and {file2_path}:")
+        for dup in duplicates:
+            print(f"  - {dup}")
+    else:
+        print(f"✅ No duplicate package names found between {file1_path} and {file2_path}")
+
+
+@traced()
+def check_files(file1_path: str, file2_path: str, streaming: Optional[bool] = None) -> Tuple[bool, List[str]]:
+    """
+    Validates two JSON files and checks them for duplicate package names, parsing each file only once.
+
+    The parse used to validate a file also builds its package name index, which is then reused
+    for the duplicate check instead of re-reading the files.
+
+    Args:
+        file1_path: Path to the first JSON file
+        file2_path: Path to the second JSON file
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        Tuple of (True if both files are valid, list of duplicate package names). Duplicates
+        are only checked when both files are valid.
+    """
+    package_names: Dict[str, Set[str]] = {}
+    valid = True
+
+    for file_path in (file1_path, file2_path):
+        if file_path in package_names:
+            continue
+        if not os.path.exists(file_path):
+            print(f"Error: File {file_path} does not exist")
+            valid = False
+            continue
+        try:
+            package_names[file_path] = get_package_names(file_path, streaming)
+            print(f"✅ JSON file {file_path} is valid")
+        except json.JSONDecodeError as e:
+            print(f"❌ Invalid JSON in {file_path}: {str(e)}")
+            valid = False
+        except Exception as e:
+            print(f"❌ Error validating {file_path}: {str(e)}")
+            valid = False
+
+    if not valid:
+        return False, []
+
+    duplicates = sorted(package_names[file1_path].intersection(package_names[file2_path]))
+    _print_duplicates(duplicates, file1_path, file2_path)
+    return True, duplicates
+
+
+@traced()
+def build_package_index(file_paths: List[str], streaming: Optional[bool] = None) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Builds an index of every package name found in any number of JSON files, in a single pass over each file.
+
+    Args:
+        file_paths: Paths to the JSON files
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        Dict mapping each package name to the list of (file path, entry index) where it is declared
+    """
+    index: Dict[str, List[Tuple[str, int]]] = {}
+    for file_path in file_paths:
+        for entry_index, app in iter_apps(file_path, streaming):
+            index.setdefault(app["info"]["package_name"], []).append((file_path, entry_index))
+    return index
+
+
+@traced()
+def find_duplicates_multi(file_paths: List[str], streaming: Optional[bool] = None) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Checks for duplicate package_name entries across and within any number of JSON files.
+
+    Unlike find_duplicates(), a package declared twice in the same file is reported too. A file
+    passed more than once is only checked once.
+
+    Args:
+        file_paths: Paths to the JSON files
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        Dict mapping each duplicate package name to all of its (file path, entry index) locations,
+        empty dict if none found
+    """
+    # Otherwise every package of a repeated file would be reported as a within-file duplicate
+    unique_paths: Dict[str, str] = {}
+    for file_path in file_paths:
+        unique_paths.setdefault(os.path.realpath(file_path), file_path)
+    if len(unique_paths) < len(file_paths):
+        print(f"⚠️ Ignoring {len(file_paths) - len(unique_paths)} repeated file paths")
+        file_paths = list(unique_paths.values())
+
+    try:
+        index = build_package_index(file_paths, streaming)
+    except Exception as e:
+        print(f"❌ Error checking duplicates: {str(e)}")
+        return {}
+
+    duplicates = {name: locations for name, locations in index.items() if len(locations) > 1}
+    files = ', '.join(file_paths)
+    if not duplicates:
+        print(f"✅ No duplicate package names found in {files}")
+        return {}
+
+    print(f"❌ Found {len(duplicates)} duplicate package names in {files}:")
+    for name, locations in duplicates.items():
+        scope = "cross-file" if len({file_path for file_path, _ in locations}) > 1 else "within-file"
+        print(f"  - {name} ({scope}): {_format_locations(locations)}")
+    return duplicates
+
+
+def _format_locations(locations: List[Tuple[str, int]]) -> str:
+    return ', '.join(f"{file_path}[{entry_index}]" for file_path, entry_index in locations)
+
+
+def parse_fingerprint(value: Any) -> Optional[bytes]:
+    """
+    Parses a colon separated hex SHA-256 fingerprint (e.g. "F0:FD:...:83") into its 32 raw bytes.
+
+    Returns:
+        The fingerprint bytes, or None if the value is malformed
+    """
+    if not isinstance(value, str) or not _FINGERPRINT.fullmatch(value):
+        return None
+    return bytes.fromhex(value.replace(':', ' '))
+
+
+def format_fingerprint(fingerprint: bytes) -> str:
+    """Formats raw fingerprint bytes back to the colon separated upper case hex form."""
+    return fingerprint.hex(':').upper()
+
+
+class FingerprintIndex:
+    """
+    Compact index of the signature fingerprints declared in privileged apps JSON files.
+
+    Fingerprints are stored as 32 raw bytes each in a single bytearray and every other
+    per-entry or per-signature attribute is an id in a typed array, so hundreds of thousands
+    of signatures take a few dozen bytes each instead of several Python strings.
+    """
+
+    def __init__(self):
+        self.files: List[str] = []
+        self.package_names: List[str] = []
+        self._package_ids: Dict[str, int] = {}
+        # Per entry: file id, index in the file's "apps" array, package id and first signature
+        self.entry_files = array('I')
+        self.entry_indexes = array('I')
+        self.entry_packages = array('I')
+        self.entry_signatures = array('I')
+        # Per signature: FINGERPRINT_SIZE bytes in self.fingerprints and the entry it belongs to
+        self.fingerprints = bytearray()
+        self.signature_entries = array('I')
+        # (file path, entry index, package name, raw value) of every unparseable fingerprint
+        self.malformed: List[Tuple[str, int, str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.signature_entries)
+
+    @traced()
+    def add_file(self, file_path: str, streaming: Optional[bool] = None) -> None:
+        """Adds every signature of a JSON file to the index."""
+        file_id = len(self.files)
+        self.files.append(file_path)
+
+        for entry_index, app in iter_apps(file_path, streaming):
+            package_name = app["info"]["package_name"]
+            package_id = self._package_ids.get(package_name)
+            if package_id is None:
+                package_id = self._package_ids[package_name] = len(self.package_names)
+                self.package_names.append(package_name)
+
+            entry_id = len(self.entry_files)
+            self.entry_files.append(file_id)
+            self.entry_indexes.append(entry_index)
+            self.entry_packages.append(package_id)
+            self.entry_signatures.append(len(self.signature_entries))
+
+            for signature in app["info"].get("signatures", []):
+                value = signature.get("cert_fingerprint_sha256") if isinstance(signature, dict) else signature
+                fingerprint = parse_fingerprint(value)
+                if fingerprint is None:
+                    self.malformed.append((file_path, entry_index, package_name, value))
+                    continue
+                self.fingerprints += fingerprint
+                self.signature_entries.append(entry_id)
+
+    def fingerprint(self, signature_id: int) -> bytes:
+        start = signature_id * FINGERPRINT_SIZE
+        return bytes(self.fingerprints[start:start + FINGERPRINT_SIZE])
+
+    def entry_fingerprints(self, entry_id: int) -> Set[bytes]:
+        start = self.entry_signatures[entry_id]
+        end = self.entry_signatures[entry_id + 1] if entry_id + 1 < len(self.entry_signatures) else len(self)
+        return {self.fingerprint(signature_id) for signature_id in range(start, end)}
+
+    @traced()
+    def package_conflicts(self) -> Dict[str, List[Tuple[str, int, List[str]]]]:
+        """
+        Finds packages declared more than once whose entries list different fingerprints.
+
+        Returns:
+            Dict mapping each conflicting package name to its (file path, entry index, fingerprints) entries
+        """
+        entries_by_package: Dict[int, List[int]] = {}
+        for entry_id, package_id in enumerate(self.entry_packages):
+            entries_by_package.setdefault(package_id, []).append(entry_id)
+
+        conflicts: Dict[str, List[Tuple[str, int, List[str]]]] = {}
+        for package_id, entry_ids in entries_by_package.items():
+            if len(entry_ids) < 2:
+                continue
+            fingerprint_sets = [self.entry_fingerprints(entry_id) for entry_id in entry_ids]
+            if all(fingerprints == fingerprint_sets[0] for fingerprints in fingerprint_sets[1:]):
+                continue
+            conflicts[self.package_names[package_id]] = [
+                (self.files[self.entry_files[entry_id]], self.entry_indexes[entry_id], sorted(map(format_fingerprint, fingerprints)))
+                for entry_id, fingerprints in zip(entry_ids, fingerprint_sets)
+            ]
+        return conflicts
+
+    @traced()
+    def shared_fingerprints(self) -> Dict[str, List[str]]:
+        """
+        Finds fingerprints declared under more than one package name.
+
+        Signatures are sorted by their raw bytes so equal fingerprints end up next to each
+        other and can be grouped in a single linear scan.
+
+        Returns:
+            Dict mapping each shared fingerprint to the sorted package names declaring it
+        """
+        shared: Dict[str, List[str]] = {}
+        order = sorted(range(len(self)), key=self.fingerprint)
+
+        run_start = 0
+        for position in range(1, len(order) + 1):
+            if position < len(order) and self.fingerprint(order[position]) == self.fingerprint(order[run_start]):
+                continue
+            package_ids = {self.entry_packages[self.signature_entries[signature_id]] for signature_id in order[run_start:position]}
+            if len(package_ids) > 1:
+                shared[format_fingerprint(self.fingerprint(order[run_start]))] = sorted(self.package_names[package_id] for package_id in package_ids)
+            run_start = position
+        return shared
+
+
+@traced()
+def check_fingerprints(file_paths: List[str], streaming: Optional[bool] = None) -> bool:
+    """
+    Checks the signature fingerprints of any number of JSON files for conflicts.
+
+    Reports malformed fingerprints, packages listed with different fingerprints and
+    fingerprints listed under different packages.
+
+    Args:
+        file_paths: Paths to the JSON files
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        True if every fingerprint is well formed, False otherwise
+    """
+    index = FingerprintIndex()
+    try:
+        for file_path in file_paths:
+            index.add_file(file_path, streaming)
+    except Exception as e:
+        print(f"❌ Error checking fingerprints: {str(e)}")
+        return False
+
+    print(f"🔍 Indexed {len(index)} signatures of {len(index.package_names)} packages")
+
+    if index.malformed:
+        print(f"❌ Found {len(index.malformed)} malformed fingerprints:")
+        for file_path, entry_index, package_name, value in index.malformed:
+            print(f"  - {package_name} ({file_path}[{entry_index}]): {value!r}")
+    else:
+        print("✅ All fingerprints are well formed")
+
+    conflicts = index.package_conflicts()
+    if conflicts:
+        print(f"⚠️ Found {len(conflicts)} packages listed with different fingerprints:")
+        for package_name, entries in conflicts.items():
+            print(f"  - {package_name}:")
+            for file_path, entry_index, fingerprints in entries:
+                print(f"    {file_path}[{entry_index}]: {', '.join(fingerprints)}")
+    else:
+        print("✅ No package is listed with different fingerprints")
+
+    shared = index.shared_fingerprints()
+    if shared:
+        print(f"ℹ️ Found {len(shared)} fingerprints listed under different packages:")
+        for fingerprint, package_names in shared.items():
+            print(f"  - {fingerprint}: {', '.join(package_names)}")
+    else:
+        print("✅ No fingerprint is listed under different packages")
+
+    return not index.malformed
+
+
+@traced()
+def compile_privileged_apps(file_paths: List[str], output_file: str, streaming: Optional[bool] = None) -> int:
+    """
+    Compiles privileged apps JSON files into a sorted, fixed-layout binary table of
+    (package name, fingerprint) records that PrivilegedAppTable can query without parsing JSON.
+
+    Args:
+        file_paths: Paths to the JSON files
+        output_file: Path of the compiled table to write
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+
+    Returns:
+        Number of records written
+
+    Raises:
+        ValueError: If a file contains malformed fingerprints
+    """
+    index = FingerprintIndex()
+    for file_path in file_paths:
+        index.add_file(file_path, streaming)
+    if index.malformed:
+        file_path, entry_index, package_name, value = index.malformed[0]
+        raise ValueError(f"Malformed fingerprint for {package_name} ({file_path}[{entry_index}]): {value!r}")
+
+    encoded_names = [package_name.encode() for package_name in index.package_names]
+    records = sorted({
+        (encoded_names[index.entry_packages[entry_id]], index.fingerprint(signature_id))
+        for signature_id, entry_id in enumerate(index.signature_entries)
+    })
+    name_width = max((len(name) for name, _ in records), default=0)
+
+    with open(output_file, 'wb') as f:
+        f.write(_COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, len(records), name_width))
+        for name, fingerprint in records:
+            f.write(name.ljust(name_width, b'\0'))
+            f.write(fingerprint)
+    return len(records)
+
+
+class PrivilegedAppTable:
+    """
+    Read-only view of a table written by compile_privileged_apps().
+
+    The file is memory-mapped and queried with a binary search over its fixed-size records,
+    so opening it is instant and a lookup reads O(log n) records without parsing JSON.
+
+    Example:
+        with PrivilegedAppTable("privileged.bin") as table:
+            table.is_privileged("com.android.chrome", "F0:FD:...:83")
+    """
+
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if size < _COMPILED_HEADER.size:
+            self.close()
+            raise ValueError(f"{file_path} is not a compiled privileged apps table")
+
+        magic, version, self._count, self._name_width = _COMPILED_HEADER.unpack_from(self._mm, 0)
+        self._record_size = self._name_width + FINGERPRINT_SIZE
+        if magic != COMPILED_MAGIC or version != COMPILED_VERSION or size != _COMPILED_HEADER.size + self._count * self._record_size:
+            self.close()
+            raise ValueError(f"{file_path} is not a compiled privileged apps table (version {COMPILED_VERSION})")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "PrivilegedAppTable":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _record(self, record_index: int) -> bytes:
+        start = _COMPILED_HEADER.size + record_index * self._record_size
+        return self._mm[start:start + self._record_size]
+
+    def records(self) -> Iterator[Tuple[str, bytes]]:
+        """Iterates over the (package name, fingerprint) records in sorted order."""
+        for record_index in range(self._count):
+            record = self._record(record_index)
+            yield record[:self._name_width].rstrip(b'\0').decode(), record[self._name_width:]
+
+    def is_privileged(self, package_name: str, fingerprint: Union[str, bytes]) -> bool:
+        """
+        Checks whether a package signed with the given fingerprint is privileged.
+
+        Args:
+            package_name: Android package name
+            fingerprint: SHA-256 fingerprint, as 32 raw bytes or in colon separated hex form
+
+        Returns:
+            True if the (package name, fingerprint) pair is in the table
+        """
+        if isinstance(fingerprint, str):
+            fingerprint = parse_fingerprint(fingerprint)
+        name = package_name.encode()
+        if fingerprint is None or len(fingerprint) != FINGERPRINT_SIZE or len(name) > self._name_width:
+            return False
+
+        key = name.ljust(self._name_width, b'\0') + fingerprint
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+
+def _normalize_app(app: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Set[str]]]:
+    """Splits an app entry into its non-signature fields and a build type -> fingerprints map."""
+    info = dict(app.get("info", {}))
+    signatures: Dict[str, Set[str]] = {}
+    for signature in info.pop("signatures", []):
+        fingerprint = signature.get("cert_fingerprint_sha256")
+        signatures.setdefault(signature.get("build", ""), set()).add(fingerprint.upper() if isinstance(fingerprint, str) else fingerprint)
+    fields = {key: value for key, value in app.items() if key != "info"}
+    fields.update({f"info.{key}": value for key, value in info.items() if key != "package_name"})
+    return fields, signatures
+
+
+def _index_apps(file_path: str, streaming: Optional[bool]) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Set[str]]]]:
+    apps: Dict[str, Tuple[Dict[str, Any], Dict[str, Set[str]]]] = {}
+    for _, app in iter_apps(file_path, streaming):
+        fields, signatures = _normalize_app(app)
+        package_name = app["info"]["package_name"]
+        if package_name in apps:
+            # Merge repeated entries so the diff is independent of how upstream splits them
+            for build, fingerprints in signatures.items():
+                apps[package_name][1].setdefault(build, set()).update(fingerprints)
+            continue
+        apps[package_name] = (fields, signatures)
+    return apps
+
+
+def _sorted_signatures(signatures: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+    return {build: sorted(fingerprints, key=str) for build, fingerprints in sorted(signatures.items())}
+
+
+def _diff_app(package_name: str, old_app: Tuple[Dict[str, Any], Dict[str, Set[str]]],
+              new_app: Tuple[Dict[str, Any], Dict[str, Set[str]]]) -> Optional[Dict[str, Any]]:
+    old_fields, old_signatures = old_app
+    new_fields, new_signatures = new_app
+    fields = sorted(key for key in old_fields.keys() | new_fields.keys() if old_fields.get(key) != new_fields.get(key))
+    signatures = {}
+    for build in sorted(old_signatures.keys() | new_signatures.keys()):
+        old_fingerprints = old_signatures.get(build, set())
+        new_fingerprints = new_signatures.get(build, set())
+        if old_fingerprints != new_fingerprints:
+            signatures[build] = {
+                "added": sorted(new_fingerprints - old_fingerprints, key=str),
+                "removed": sorted(old_fingerprints - new_fingerprints, key=str),
+            }
+    if not (fields or signatures):
+        return None
+    return {"package_name": package_name, "fields": fields, "signatures": signatures}
+
+
+@traced()
+def diff_files(old_path: str, new_path: str, streaming: Optional[bool] = None, merge: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Compares two privileged apps JSON files keyed by package name.
+
+    Both files are indexed by package name in a single pass each, so the comparison is linear
+    and unaffected by upstream reordering the list.
+
+    Args:
+        old_path: Path to the old JSON file
+        new_path: Path to the new JSON file
+        streaming: Force (True) or disable (False) the streaming parser. By default it is
+            used for files larger than STREAMING_THRESHOLD_BYTES.
+        merge: Force (True) or disable (False) the merge fast path for canonical files. By default
+            it is tried for files larger than STREAMING_THRESHOLD_BYTES. Files that turn out not
+            to be canonical fall back to indexing both files.
+
+    Returns:
+        Dict with sorted "added" and "removed" apps and "changed" apps listing their changed
+        fields and the fingerprints added and removed per build type
+    """
+    if _use_merge([old_path, new_path], merge):
+        try:
+            return _merge_diff(old_path, new_path)
+        except _NotSortedError:
+            pass
+
+    old_apps = _index_apps(old_path, streaming)
+    new_apps = _index_apps(new_path, streaming)
+
+    added = []
+    changed = []
+    for package_name in sorted(new_apps):
+        if package_name not in old_apps:
+            added.append({"package_name": package_name, "signatures": _sorted_signatures(new_apps[package_name][1])})
+            continue
+        app_diff = _diff_app(package_name, old_apps.pop(package_name), new_apps[package_name])
+        if app_diff:
+            changed.append(app_diff)
+
+    removed = [
+        {"package_name": package_name, "signatures": _sorted_signatures(old_apps[package_name][1])}
+        for package_name in sorted(old_apps)
+    ]
+
+    return {"old": old_path, "new": new_path, "added": added, "removed": removed, "changed": changed}
+
+
+class _NotSortedError(ValueError):
+    """Raised by the merge fast paths when a file is not in canonical order."""
+
+
+def _use_merge(file_paths: List[str], merge: Optional[bool]) -> bool:
+    if merge is not None:
+        return merge
+    return any(os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES for file_path in file_paths)
+
+
+def _iter_sorted_apps(file_path: str) -> Iterator[Tuple[str, Tuple[Dict[str, Any], Dict[str, Set[str]]]]]:
+    """
+    Streams the apps of a canonical file, merging consecutive entries of the same package.
+
+    Raises:
+        _NotSortedError: As soon as a package name is out of order
+    """
+    current_name: Optional[str] = None
+    current_app: Optional[Tuple[Dict[str, Any], Dict[str, Set[str]]]] = None
+    for _, app in iter_apps(file_path, streaming=True):
+        package_name = app["info"]["package_name"]
+        if package_name == current_name:
+            for build, fingerprints in _normalize_app(app)[1].items():
+                current_app[1].setdefault(build, set()).update(fingerprints)
+            continue
+        if current_name is not None:
+            if package_name < current_name:
+                raise _NotSortedError(f"{file_path} is not sorted by package_name")
+            yield current_name, current_app
+        current_name, current_app = package_name, _normalize_app(app)
+    if current_name is not None:
+        yield current_name, current_app
+
+
+def _merge_join(old_path: str, new_path: str) -> Iterator[Tuple[str, Optional[Any], Optional[Any]]]:
+    """Merge-joins two canonical files, yielding (package name, old app or None, new app or None) in order."""
+    old_apps = _iter_sorted_apps(old_path)
+    new_apps = _iter_sorted_apps(new_path)
+    old = next(old_apps, None)
+    new = next(new_apps, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield old[0], old[1], None
+            old = next(old_apps, None)
+        elif old is None or new[0] < old[0]:
+            yield new[0], None, new[1]
+            new = next(new_apps, None)
+        else:
+            yield old[0], old[1], new[1]
+            old = next(old_apps, None)
+            new = next(new_apps, None)
+
+
+def _merge_duplicates(file1_path: str, file2_path: str) -> List[str]:
+    return [package_name for package_name, app1, app2 in _merge_join(file1_path, file2_path) if app1 and app2]
+
+
+def _merge_diff(old_path: str, new_path: str) -> Dict[str, Any]:
+    added = []
+    removed = []
+    changed = []
+    for package_name, old_app, new_app in _merge_join(old_path, new_path):
+        if old_app is None:
+            added.append({"package_name": package_name, "signatures": _sorted_signatures(new_app[1])})
+        elif new_app is None:
+            removed.append({"package_name": package_name, "signatures": _sorted_signatures(old_app[1])})
+        else:
+            app_diff = _diff_app(package_name, old_app, new_app)
+            if app_diff:
+                changed.append(app_diff)
+    return {"old": old_path, "new": new_path, "added": added, "removed": removed, "changed": changed}
+
+
+_CANONICAL_KEYS = {
+    "app": ["type", "info"],
+    "info": ["package_name", "signatures"],
+    "signature": ["build", "cert_fingerprint_sha256"],
+}
+
+
+def _ordered(value: Dict[str, Any], known_keys: List[str]) -> Dict[str, Any]:
+    """Orders the known keys as in the upstream list, followed by any other key sorted by name."""
+    ordered = {key: value[key] for key in known_keys if key in value}
+    ordered.update((key, value[key]) for key in sorted(value) if key not in ordered)
+    return ordered
+
+
+def _canonical_app(app: Dict[str, Any]) -> Dict[str, Any]:
+    info = dict(app["info"])
+    if isinstance(info.get("signatures"), list):
+        signatures = [_ordered(signature, _CANONICAL_KEYS["signature"]) if isinstance(signature, dict) else signature
+                      for signature in info["signatures"]]
+        # Stable sort by build only, fingerprints keep their order within a build
+        info["signatures"] = sorted(signatures, key=lambda signature: str(signature.get("build", "")) if isinstance(signature, dict) else "")
+    return _ordered({**app, "info": _ordered(info, _CANONICAL_KEYS["info"])}, _CANONICAL_KEYS["app"])
+
+
+def format_canonical(data: Dict[str, Any]) -> str:
+    """
+    Formats a privileged apps list in canonical form: apps sorted by package_name, signatures
+    sorted by build (keeping their order within a build), keys in upstream order, 2 space
+    indentation and a trailing newline.
+    """
+    apps = sorted((_canonical_app(app) for app in data["apps"]),
+                  key=lambda app: (app["info"]["package_name"], json.dumps(app, sort_keys=True)))
+    return json.dumps(_ordered({**data, "apps": apps}, ["apps"]), indent=2) + "\n"
+
+
+@traced()
+def canonicalize_file(file_path: str, output_file: Optional[str] = None) -> bool:
+    """
+    Rewrites a privileged apps JSON file in canonical form.
+
+    Args:
+        file_path: Path to the JSON file
+        output_file: Path to write the canonical file to, defaults to rewriting file_path
+
+    Returns:
+        True if the canonical form differs from the file's current content
+    """
+    with open(file_path, 'r') as f:
+        content = f.read()
+    canonical = format_canonical(json.loads(content))
+    if output_file or canonical != content:
+        with open(output_file or file_path, 'w') as f:
+            f.write(canonical)
+    return canonical != content
+
+
+@traced()
+def is_canonical(file_path: str) -> bool:
+    """Checks whether a privileged apps JSON file is already in canonical form."""
+    with open(file_path, 'r') as f:
+        content = f.read()
+    return format_canonical(json.loads(content)) == content
+
+
+def format_diff_markdown(diff: Dict[str, Any]) -> str:
+    """Formats the result of diff_files() as Markdown, e.g. for a pull request body."""
+    if not (diff["added"] or diff["removed"] or diff["changed"]):
+        return "No privileged app changes."
+
+    lines = [f"Privileged apps: {len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed"]
+    for title, apps in (("Added", diff["added"]), ("Removed", diff["removed"])):
+        if not apps:
+            continue
+        lines += ["", f"### {title}", ""]
+        for app in apps:
+            lines.append(f"- `{app['package_name']}`")
+            for build, fingerprints in app["signatures"].items():
+                lines += [f"  - `{build}`: `{fingerprint}`" for fingerprint in fingerprints]
+
+    if diff["changed"]:
+        lines += ["", "### Changed", ""]
+        for app in diff["changed"]:
+            lines.append(f"- `{app['package_name']}`")
+            if app["fields"]:
+                lines.append(f"  - fields: {', '.join(f'`{field}`' for field in app['fields'])}")
+            for build, fingerprints in app["signatures"].items():
+                lines += [f"  - `{build}`: + `{fingerprint}`" for fingerprint in fingerprints["added"]]
+                lines += [f"  - `{build}`: - `{fingerprint}`" for fingerprint in fingerprints["removed"]]
+
+    return "\n".join(lines)
+
+
+def _pop_option(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Removes `name <value>` from the command line arguments and returns the value."""
+    if name not in args:
+        return default
+    option_index = args.index(name)
+    if option_index + 1 >= len(args):
+        print(f"Error: Missing value for {name}")
+        sys.exit(1)
+    value = args[option_index + 1]
+    del args[option_index:option_index + 2]
+    return value
+
+
 def save_duplicates_to_file(duplicates: List[str], output_file: str) -> None:
     """
     Saves the list of duplicates to a file.
@@ -103,10 +1116,20 @@ def save_duplicates_to_file(duplicates: List[str], output_file: str) -> None:
 
 
 def main():
+    report_at_exit()
     if len(sys.argv) < 2:
         print("Usage:")
         print("  Validate JSON: python validate_json.py validate <json_file>")
         print("  Check duplicates: python validate_json.py duplicates <json_file1> <json_file2> [output_file]")
+        print("  Validate and check duplicates: python validate_json.py check <json_file1> <json_file2> [output_file]")
+        print("  Check duplicates across many files: python validate_json.py duplicates-all <json_file>... [--output output_file]")
+        print("  Check fingerprint conflicts: python validate_json.py fingerprints <json_file>...")
+        print("  Validate many files: python validate_json.py validate-all <glob>... [--report output_file] [--workers n]")
+        print("  Compile lookup table: python validate_json.py compile <output_file> <json_file>...")
+        print("  Look up compiled table: python validate_json.py lookup <compiled_file> <package_name> <fingerprint>")
+        print("  Canonicalize a list: python validate_json.py canonicalize <json_file> [output_file]")
+        print("  Check lists are canonical: python validate_json.py canonicalize --check <json_file>...")
+        print("  Diff two lists: python validate_json.py diff <old_json_file> <new_json_file> [--json output_file] [--markdown output_file]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -121,6 +1144,28 @@ def main():
             success = validate_json(file_path)
             sys.exit(0 if success else 1)
 
+        case "validate-all":
+            patterns = sys.argv[2:]
+            report_file = _pop_option(patterns, "--report", "validation-report.json")
+            workers = _pop_option(patterns, "--workers")
+            if not patterns:
+                print("Error: Missing JSON file glob patterns")
+                sys.exit(1)
+
+            report = validate_all(patterns, int(workers) if workers else None)
+            for result in report["files"]:
+                if result["valid"]:
+                    print(f"✅ JSON file {result['file']} is valid ({result['seconds']:.3f}s)")
+                else:
+                    print(f"❌ {result['file']}: {result['error']}")
+            print(f"Validated {len(report['files'])} files with {report['workers']} workers in {report['total_seconds']:.3f}s")
+
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report saved to {report_file}")
+
+            sys.exit(0 if report["valid"] else 1)
+
         case "duplicates":
             if len(sys.argv) < 4:
                 print("Error: Missing JSON file paths")
@@ -136,6 +1181,122 @@ def main():
 
             sys.exit(0)
 
+        case "check":
+            if len(sys.argv) < 4:
+                print("Error: Missing JSON file paths")
+                sys.exit(1)
+
+            file1_path = sys.argv[2]
+            file2_path = sys.argv[3]
+            output_file = sys.argv[4] if len(sys.argv) > 4 else "duplicates.txt"
+
+            valid, duplicates = check_files(file1_path, file2_path)
+            if duplicates:
+                save_duplicates_to_file(duplicates, output_file)
+
+            sys.exit(0 if valid else 1)
+
+        case "duplicates-all":
+            file_paths = sys.argv[2:]
+            output_file = _pop_option(file_paths, "--output", "duplicates.txt")
+
+            if not file_paths:
+                print("Error: Missing JSON file paths")
+                sys.exit(1)
+
+            duplicates = find_duplicates_multi(file_paths)
+            if duplicates:
+                save_duplicates_to_file([f"{name}: {_format_locations(locations)}" for name, locations in duplicates.items()], output_file)
+
+            sys.exit(0)
+
+        case "fingerprints":
+            if len(sys.argv) < 3:
+                print("Error: Missing JSON file paths")
+                sys.exit(1)
+
+            success = check_fingerprints(sys.argv[2:])
+            sys.exit(0 if success else 1)
+
+        case "compile":
+            if len(sys.argv) < 4:
+                print("Error: Missing output file or JSON file paths")
+                sys.exit(1)
+
+            output_file = sys.argv[2]
+            try:
+                count = compile_privileged_apps(sys.argv[3:], output_file)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON: {str(e)}")
+                sys.exit(1)
+            except Exception as e:
+                print(f"❌ Error compiling {output_file}: {str(e)}")
+                sys.exit(1)
+            print(f"✅ Compiled {count} privileged app signatures to {output_file}")
+            sys.exit(0)
+
+        case "lookup":
+            if len(sys.argv) < 5:
+                print("Error: Missing compiled file, package name or fingerprint")
+                sys.exit(1)
+
+            with PrivilegedAppTable(sys.argv[2]) as table:
+                privileged = table.is_privileged(sys.argv[3], sys.argv[4])
+            print(f"{'✅' if privileged else '❌'} {sys.argv[3]} is {'' if privileged else 'not '}privileged with {sys.argv[4]}")
+            sys.exit(0 if privileged else 1)
+
+        case "canonicalize":
+            args = sys.argv[2:]
+            check_only = "--check" in args
+            if check_only:
+                args.remove("--check")
+            if not args:
+                print("Error: Missing JSON file path")
+                sys.exit(1)
+
+            try:
+                if check_only:
+                    not_canonical = [file_path for file_path in args if not is_canonical(file_path)]
+                    for file_path in args:
+                        print(f"{'❌' if file_path in not_canonical else '✅'} {file_path} is {'not ' if file_path in not_canonical else ''}canonical")
+                    sys.exit(1 if not_canonical else 0)
+
+                output_file = args[1] if len(args) > 1 else None
+                changed = canonicalize_file(args[0], output_file)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON in {args[0]}: {str(e)}")
+                sys.exit(1)
+            except Exception as e:
+                print(f"❌ Error canonicalizing {args[0]}: {str(e)}")
+                sys.exit(1)
+            print(f"✅ {output_file or args[0]} {'written in' if changed or output_file else 'is already in'} canonical form")
+            sys.exit(0)
+
+        case "diff":
+            args = sys.argv[2:]
+            json_output_file = _pop_option(args, "--json")
+            markdown_output_file = _pop_option(args, "--markdown")
+            if len(args) < 2:
+                print("Error: Missing JSON file paths")
+                sys.exit(1)
+
+            try:
+                diff = diff_files(args[0], args[1])
+            except Exception as e:
+                print(f"❌ Error comparing {args[0]} and {args[1]}: {str(e)}")
+                sys.exit(1)
+
+            markdown = format_diff_markdown(diff)
+            print(markdown)
+            if json_output_file:
+                with open(json_output_file, 'w') as f:
+                    json.dump(diff, f, indent=2)
+            if markdown_output_file:
+                with open(markdown_output_file, 'w') as f:
+                    f.write(markdown + "\n")
+
+            sys.exit(0)
+
         case _:
             print(f"Unknown command: {command}")
             sys.exit(1)